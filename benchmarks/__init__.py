@@ -0,0 +1,15 @@
+"""Benchmark suites, run with `python3 manage.py benchmark <suite>`
+
+Each suite is a module with a `run(options)` function that returns a JSON
+serializable dictionary of results.
+"""
+
+SUITES = {
+    'endpoints': 'benchmarks.endpoints',
+    'concurrency': 'benchmarks.concurrency',
+    'contention': 'benchmarks.contention',
+    'serialization': 'benchmarks.serialization',
+    'signups': 'benchmarks.signups',
+    'live': 'benchmarks.live',
+    'sync': 'benchmarks.sync',
+}
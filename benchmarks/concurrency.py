@@ -0,0 +1,149 @@
+"""Compare how many concurrent slow clients one WSGI and one ASGI worker can serve
+
+Each client asks for the same read endpoint `--repeat` times in a row and takes
+CLIENT_DELAY seconds to read every response, like a client on a slow network.
+The requests go straight to the WSGI and ASGI application callables, so the
+numbers measure Django and not an HTTP server.
+
+- wsgi: WSGIHandler on a pool of WSGI_THREADS threads, as a threaded WSGI worker
+  runs it. A slow client keeps its thread until it has read the response.
+- asgi, sync views: ASGIHandler with levelup/urls.py, every request runs the
+  ViewSet on a thread.
+- asgi, async views: ASGIHandler with levelup/asgi_urls.py, the reads are the
+  async views from levelupapi/views/async_reads.py.
+"""
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+
+from levelupapi.models import Gamer
+from benchmarks.harness import percentile
+
+# How many clients run at once in each round
+CONCURRENCY = (1, 8, 32)
+# The threads a threaded WSGI worker serves requests with
+WSGI_THREADS = 8
+# How long a client takes to read one response
+CLIENT_DELAY = 0.05
+PATHS = ('/events', '/games')
+
+
+def run(options):
+    gamer = Gamer.objects.order_by('id').first()
+    if gamer is None:
+        raise RuntimeError('There are no gamers, run `python3 manage.py generate_data` first')
+    token, _ = Token.objects.get_or_create(user=gamer.user)
+    authorization = f'Token {token.key}'
+
+    results = {}
+    for path in PATHS:
+        for clients in CONCURRENCY:
+            round_name = f'{path}, {clients} clients'
+            results[f'wsgi: {round_name}'] = run_wsgi(path, authorization, clients, options['repeat'])
+            with override_settings(ROOT_URLCONF='levelup.urls'):
+                results[f'asgi, sync views: {round_name}'] = run_asgi(path, authorization, clients, options['repeat'])
+            with override_settings(ROOT_URLCONF='levelup.asgi_urls'):
+                results[f'asgi, async views: {round_name}'] = run_asgi(path, authorization, clients, options['repeat'])
+    return {
+        'wsgi_threads': WSGI_THREADS,
+        'client_delay_ms': CLIENT_DELAY * 1000,
+        'results': results,
+    }
+
+
+def run_wsgi(path, authorization, clients, repeat):
+    application = WSGIHandler()
+    factory = RequestFactory()
+    # A client waits for a free worker thread, and its latency includes that wait
+    workers = threading.Semaphore(WSGI_THREADS)
+
+    def request():
+        environ = factory.get(path, HTTP_AUTHORIZATION=authorization).environ
+        statuses = []
+        start = time.perf_counter()
+        with workers:
+            body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+            for _ in body:
+                pass
+            time.sleep(CLIENT_DELAY)
+            body.close()
+        return int(statuses[0].split()[0]), time.perf_counter() - start
+
+    def client():
+        return [request() for _ in range(repeat)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        per_client = list(pool.map(lambda _: client(), range(clients)))
+    outcomes = [outcome for outcomes_of_client in per_client for outcome in outcomes_of_client]
+    return summarize(outcomes, time.perf_counter() - start)
+
+
+def run_asgi(path, authorization, clients, repeat):
+    application = ASGIHandler()
+    url, _, query = path.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': url,
+        'raw_path': url.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'authorization', authorization.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+
+    async def request():
+        sent = asyncio.Event()
+        statuses = []
+
+        async def receive():
+            if not sent.is_set():
+                sent.set()
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # The client never disconnects, Django cancels this wait once the response is out
+            await asyncio.Future()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+            elif not message.get('more_body', False):
+                await asyncio.sleep(CLIENT_DELAY)
+
+        start = time.perf_counter()
+        await application(dict(scope), receive, send)
+        return statuses[0], time.perf_counter() - start
+
+    async def client():
+        return [await request() for _ in range(repeat)]
+
+    async def main():
+        start = time.perf_counter()
+        per_client = await asyncio.gather(*(client() for _ in range(clients)))
+        outcomes = [outcome for outcomes_of_client in per_client for outcome in outcomes_of_client]
+        return outcomes, time.perf_counter() - start
+
+    outcomes, elapsed = asyncio.run(main())
+    return summarize(outcomes, elapsed)
+
+
+def summarize(outcomes, elapsed):
+    timings = [seconds * 1000 for _, seconds in outcomes]
+    return {
+        'requests': len(outcomes),
+        'errors': sum(1 for status, _ in outcomes if status >= 400),
+        'requests_per_second': round(len(outcomes) / elapsed, 1),
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+    }
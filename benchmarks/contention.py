@@ -0,0 +1,96 @@
+"""Measure read and write throughput while signups run alongside list reads
+
+READERS threads page through the events list while WRITERS threads, each
+signed in as a different gamer, sign up for an event and leave it again.
+Every thread makes `--repeat` requests. Run the suite once per database
+profile to compare them:
+
+    python3 manage.py benchmark contention
+    LEVELUP_DB_PROFILE=production python3 manage.py benchmark contention
+
+WAL mode is stored in the database file, so run the development profile first
+or switch the file back with `PRAGMA journal_mode = delete`.
+"""
+import random
+import statistics
+import threading
+import time
+from django.conf import settings
+from django.db import connection, connections
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from levelupapi.models import Event, Gamer
+from benchmarks.harness import percentile
+
+READERS = 8
+WRITERS = 4
+
+
+def run(options):
+    gamers = list(Gamer.objects.select_related('user').order_by('id')[:WRITERS + 1])
+    event_ids = list(Event.objects.order_by('-id').values_list('id', flat=True)[:1000])
+    if len(gamers) <= WRITERS or not event_ids:
+        raise RuntimeError('There is not enough data, run `python3 manage.py generate_data` first')
+    tokens = [Token.objects.get_or_create(user=gamer.user)[0].key for gamer in gamers]
+
+    outcomes = {'read': [], 'write': []}
+    lock = threading.Lock()
+
+    def worker(role, token, seed):
+        client = Client(HTTP_AUTHORIZATION=f'Token {token}', raise_request_exception=False)
+        rng = random.Random(seed)
+        mine = []
+        for _ in range(options['repeat']):
+            start = time.perf_counter()
+            if role == 'read':
+                statuses = [client.get('/events?page_size=50').status_code]
+            else:
+                event_id = rng.choice(event_ids)
+                statuses = [
+                    client.post(f'/events/{event_id}/signup').status_code,
+                    client.delete(f'/events/{event_id}/leave').status_code,
+                ]
+            mine.append((max(statuses), time.perf_counter() - start))
+        # Persistent connections stay open until the thread closes them
+        connections.close_all()
+        with lock:
+            outcomes[role].extend(mine)
+
+    threads = [
+        threading.Thread(target=worker, args=('read', tokens[0], index)) for index in range(READERS)
+    ] + [
+        threading.Thread(target=worker, args=('write', tokens[index + 1], index)) for index in range(WRITERS)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    with connection.cursor() as db_cursor:
+        db_cursor.execute('PRAGMA journal_mode')
+        journal_mode = db_cursor.fetchone()[0]
+    return {
+        'profile': settings.DB_PROFILE,
+        'journal_mode': journal_mode,
+        'conn_max_age': settings.DATABASES['default'].get('CONN_MAX_AGE', 0),
+        'readers': READERS,
+        'writers': WRITERS,
+        'results': {
+            'events list reads': summarize(outcomes['read'], elapsed),
+            'signup and leave writes': summarize(outcomes['write'], elapsed),
+        },
+    }
+
+
+def summarize(outcomes, elapsed):
+    timings = [seconds * 1000 for _, seconds in outcomes]
+    return {
+        'requests': len(outcomes),
+        'errors': sum(1 for status, _ in outcomes if status >= 500),
+        'per_second': round(len(outcomes) / elapsed, 1),
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+    }
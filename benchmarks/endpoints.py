@@ -0,0 +1,69 @@
+"""Drive every API endpoint and report through the test client"""
+from levelupapi.models import Event, EventGamer, Game, GameType, Gamer
+from levelupapi.pagination import KeysetPagination
+
+from benchmarks.harness import authenticated_client, measure
+
+
+def paths():
+    """The requests to time, named so runs can be compared"""
+    game = Game.objects.order_by('id').first()
+    event = Event.objects.order_by('id').first()
+    game_type = GameType.objects.order_by('id').first()
+    # A page deep into the events list, to check it costs the same as the first one
+    last = Event.objects.order_by('-date', '-time', '-id').values('date', 'time', 'id').first()
+    requests = {
+        'games list': '/games',
+        'games list, large page': '/games?page_size=500',
+        'game types list': '/gametypes',
+        'events list': '/events',
+        'events list, large page': '/events?page_size=500',
+        'games list, sparse': '/games?fields=id,title&page_size=500',
+        'events list, sparse': '/events?fields=id,date&page_size=500',
+        'games search': '/games?q=drag',
+        'events search': '/events?q=dragon',
+        'upcoming events': '/events?upcoming=true',
+        'popular events': '/events?ordering=popular',
+        'events with 25+ attendees': '/events?min_attendees=25',
+        'events in a month': '/events?start=2023-03-01&end=2023-03-31',
+        'calendar feed': '/events/calendar',
+        'report: games by user': '/reports/usergames',
+        'report: events by user': '/reports/userevents',
+        'report: games by user as csv': '/reports/usergames?format=csv',
+        'report: events by user as ndjson': '/reports/userevents?format=ndjson',
+    }
+    if game is not None:
+        requests['game detail'] = f'/games/{game.id}'
+        requests['games list by type'] = f'/games?type={game.game_type_id}'
+        requests['events list by game'] = f'/events?game={game.id}'
+    if event is not None:
+        requests['event detail'] = f'/events/{event.id}'
+    if game_type is not None:
+        requests['game type detail'] = f'/gametypes/{game_type.id}'
+    if last is not None:
+        requests['events list, last page'] = deep_page_path(last)
+    return requests
+
+
+def deep_page_path(last):
+    """The path of the events page that starts just before the last event"""
+    cursor = KeysetPagination(ordering=('date', 'time', 'id')).encode_cursor(
+        [last['date'], last['time'], last['id'] - 1]
+    )
+    return f'/events?cursor={cursor}'
+
+
+def run(options):
+    client = authenticated_client()
+    results = {}
+    for name, path in paths().items():
+        results[name] = measure(client, path, options['repeat'])
+    return {
+        'rows': {
+            'gamers': Gamer.objects.count(),
+            'games': Game.objects.count(),
+            'events': Event.objects.count(),
+            'attendances': EventGamer.objects.count(),
+        },
+        'results': results,
+    }
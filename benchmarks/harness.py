@@ -0,0 +1,68 @@
+"""Measuring helpers shared by the benchmark suites"""
+import statistics
+import time
+import tracemalloc
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from levelupapi.models import Gamer
+
+
+def percentile(samples, fraction):
+    """The value below which `fraction` of the sorted samples fall"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def authenticated_client():
+    """A test client that sends the token of the first gamer"""
+    gamer = Gamer.objects.order_by('id').first()
+    if gamer is None:
+        raise RuntimeError('There are no gamers, run `python3 manage.py generate_data` first')
+    token, _ = Token.objects.get_or_create(user=gamer.user)
+    return Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+
+def read_body(response):
+    """Consume the whole body, streamed or not, and return its size in bytes"""
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def measure(client, path, repeat, method='get', **extra):
+    """Request `path` `repeat` times and summarize latency, queries and memory
+
+    The latency runs come first without tracing. Query count and peak memory are
+    taken from one extra request each, so their bookkeeping does not skew the timings.
+    """
+    send = getattr(client, method)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = send(path, **extra)
+        size = read_body(response)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    # The query log is capped, a full log would make every count come out as zero
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        read_body(send(path, **extra))
+
+    tracemalloc.start()
+    read_body(send(path, **extra))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'path': path,
+        'status': response.status_code,
+        'bytes': size,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'queries': len(queries),
+        'peak_memory_kib': round(peak / 1024, 1),
+    }
@@ -0,0 +1,60 @@
+"""What a change costs to announce over /events/live, next to what polling for it cost
+
+- polling: one GET /events, what every client used to send every few seconds
+  whether anything had changed or not.
+- fan_out: `--repeat` messages published from a request thread to N
+  subscriptions on one event loop, the way levelupapi/pubsub.py hands them to
+  the streams of a worker process. The latency is from publish to the
+  subscription handing the message over, and `per_second` is every delivery
+  to every subscription over the whole run.
+"""
+import asyncio
+import statistics
+import time
+
+from levelupapi.pubsub import LocalBroker
+from benchmarks.harness import authenticated_client, measure, percentile
+
+SUBSCRIBERS = (10, 100, 1000)
+
+
+def run(options):
+    client = authenticated_client()
+    return {
+        'polling': measure(client, '/events', options['repeat']),
+        'fan_out': {
+            f'{subscribers} subscribers': asyncio.run(fan_out(subscribers, options['repeat']))
+            for subscribers in SUBSCRIBERS
+        },
+    }
+
+
+async def fan_out(subscribers, messages):
+    broker = LocalBroker(queue_size=messages)
+    subscriptions = [broker.subscribe() for _ in range(subscribers)]
+
+    def publish_all():
+        for event_id in range(messages):
+            broker.publish({'type': 'signup', 'event': event_id, 'gamers': [1], 'sent': time.perf_counter()})
+            # Changes arrive one at a time, not all at once
+            time.sleep(0.001)
+
+    async def read(subscription):
+        latencies = []
+        for _ in range(messages):
+            message = await subscription.get()
+            latencies.append((time.perf_counter() - message['sent']) * 1000)
+        subscription.close()
+        return latencies
+
+    start = time.perf_counter()
+    readers = asyncio.gather(*(read(subscription) for subscription in subscriptions))
+    await asyncio.get_running_loop().run_in_executor(None, publish_all)
+    latencies = [latency for reader in await readers for latency in reader]
+    elapsed = time.perf_counter() - start
+    return {
+        'deliveries': len(latencies),
+        'per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+    }
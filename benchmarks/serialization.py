@@ -0,0 +1,70 @@
+"""Compare the renderers and response codings on the large list pages
+
+For every path the payload is fetched once through the test client, then:
+
+- renderers: the CPU time of rendering it with DRF's JSONRenderer and with
+  levelupapi.renderers.FastJSONRenderer, `--repeat` times each.
+- codings: the size of the body and the CPU time of compressing it with every
+  coding CompressionMiddleware offers, next to the uncompressed size.
+- requests: the whole request through the test client, uncompressed and with
+  the coding the middleware prefers.
+"""
+import statistics
+import time
+from rest_framework.renderers import JSONRenderer
+
+from levelupapi.middleware import available_encodings, compress_chunks
+from levelupapi.renderers import FastJSONRenderer, orjson
+from benchmarks.harness import authenticated_client, measure
+
+PATHS = {
+    'games list, large page': '/games?page_size=500',
+    'events list, large page': '/events?page_size=500',
+    'events list, sparse large page': '/events?fields=id,date&page_size=500',
+}
+
+
+def run(options):
+    client = authenticated_client()
+    results = {}
+    for name, path in PATHS.items():
+        response = client.get(path)
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} answered {response.status_code}, run `python3 manage.py generate_data` first')
+        body = JSONRenderer().render(response.data)
+        results[name] = {
+            'renderers': {
+                'json': cpu_ms(lambda: JSONRenderer().render(response.data), options['repeat']),
+                'fast': cpu_ms(lambda: FastJSONRenderer().render(response.data), options['repeat']),
+            },
+            'codings': {
+                'identity': {'bytes': len(body)},
+                **{coding: compressed(body, coding, options['repeat']) for coding in available_encodings()},
+            },
+            'requests': {
+                'identity': measure(client, path, options['repeat']),
+                available_encodings()[0]: measure(
+                    client, path, options['repeat'], HTTP_ACCEPT_ENCODING=', '.join(available_encodings())
+                ),
+            },
+        }
+    return {
+        'orjson': orjson is not None,
+        'codings': list(available_encodings()),
+        'results': results,
+    }
+
+
+def cpu_ms(work, repeat):
+    """Median and best CPU milliseconds of `repeat` runs of `work`"""
+    timings = []
+    for _ in range(repeat):
+        start = time.process_time()
+        work()
+        timings.append((time.process_time() - start) * 1000)
+    return {'p50_cpu_ms': round(statistics.median(timings), 3), 'min_cpu_ms': round(min(timings), 3)}
+
+
+def compressed(body, coding, repeat):
+    size = len(b''.join(compress_chunks([body], coding)))
+    return {'bytes': size, 'ratio': round(size / len(body), 3), **cpu_ms(lambda: b''.join(compress_chunks([body], coding)), repeat)}
@@ -0,0 +1,98 @@
+"""Hammer one event with signups from many threads, like when a popular event opens
+
+Every round creates an event with room for half of the signups it will get, then
+THREADS threads sign up `--repeat` different gamers each. The round reports the
+throughput and latency of the signups, and checks that the event was not
+over-booked: exactly `capacity` signups succeed, the rest are told the event is
+full, and attendee_count matches the memberships. The event is deleted after the round.
+
+    python3 manage.py benchmark signups
+    LEVELUP_DB_PROFILE=production python3 manage.py benchmark signups
+"""
+import threading
+import time
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from levelupapi.models import Event, EventGamer, Game, Gamer
+from benchmarks.harness import percentile
+
+# How many threads sign up at once in each round
+THREADS = (1, 8, 32)
+
+
+def run(options):
+    repeat = options['repeat']
+    gamers = list(Gamer.objects.order_by('id').values_list('id', 'user_id')[:max(THREADS) * repeat + 1])
+    game = Game.objects.order_by('id').first()
+    if len(gamers) <= max(THREADS) * repeat or game is None:
+        raise RuntimeError('There are not enough gamers, run `python3 manage.py generate_data` first')
+    organizer_id, _ = gamers.pop(0)
+    tokens = {}
+    for user_id in [user_id for _, user_id in gamers]:
+        tokens[user_id] = Token.objects.get_or_create(user_id=user_id)[0].key
+
+    results = {}
+    for threads in THREADS:
+        signups = threads * repeat
+        event = Event.objects.create(
+            game=game, organizer_id=organizer_id, description='Signup benchmark', date='2030-01-01', time='19:00',
+            capacity=signups // 2
+        )
+        try:
+            outcomes, elapsed = hammer(event.id, [tokens[user_id] for _, user_id in gamers[:signups]], threads)
+            event.refresh_from_db()
+            results[f'{threads} threads'] = summarize(event, outcomes, elapsed)
+        finally:
+            event.delete()
+    return {
+        'profile': settings.DB_PROFILE,
+        'conn_max_age': settings.DATABASES['default'].get('CONN_MAX_AGE', 0),
+        'results': results,
+    }
+
+
+def hammer(event_id, tokens, threads):
+    """Sign up the gamer of every token for the event, `threads` at a time"""
+    outcomes = []
+    lock = threading.Lock()
+
+    def worker(mine):
+        timed = []
+        for token in mine:
+            client = Client(HTTP_AUTHORIZATION=f'Token {token}', raise_request_exception=False)
+            start = time.perf_counter()
+            status = client.post(f'/events/{event_id}/signup').status_code
+            timed.append((status, time.perf_counter() - start))
+        # Persistent connections stay open until the thread closes them
+        connections.close_all()
+        with lock:
+            outcomes.extend(timed)
+
+    workers = [threading.Thread(target=worker, args=(tokens[index::threads],)) for index in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return outcomes, time.perf_counter() - start
+
+
+def summarize(event, outcomes, elapsed):
+    timings = [seconds * 1000 for _, seconds in outcomes]
+    statuses = [status for status, _ in outcomes]
+    attending = EventGamer.objects.filter(event=event).count()
+    return {
+        'signups': len(outcomes),
+        'capacity': event.capacity,
+        'added': statuses.count(201),
+        'full': statuses.count(409),
+        'errors': sum(1 for status in statuses if status >= 500),
+        'attending': attending,
+        'over_booked': attending > event.capacity or attending != event.attendee_count,
+        'per_second': round(len(outcomes) / elapsed, 1),
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+    }
@@ -0,0 +1,39 @@
+"""Compare a delta sync with downloading the games and events lists again
+
+- full: one page of 500 from /games and from /events, and how many such pages
+  a client that downloads everything fetches, with the time that adds up to.
+- first_sync: one batch of 500 changes from /sync?since=0.
+- delta: /sync after `changed` events were written since the client's cursor.
+  The events are touched by setting updated_at, like any other write does.
+"""
+from django.db.models import Max
+from django.utils import timezone
+
+from levelupapi.models import Change, Event, Game
+from benchmarks.harness import authenticated_client, measure
+
+PAGE_SIZE = 500
+CHANGED = (10, 100, 1000)
+
+
+def run(options):
+    repeat = options['repeat']
+    client = authenticated_client()
+    full = {}
+    for name, path, count in [('games', '/games', Game.objects.count()), ('events', '/events', Event.objects.count())]:
+        page = measure(client, f'{path}?page_size={PAGE_SIZE}', repeat)
+        pages = -(-count // PAGE_SIZE)
+        full[name] = {**page, 'pages': pages, 'estimated_total_ms': round(page['p50_ms'] * pages, 1)}
+
+    delta = {}
+    for changed in CHANGED:
+        cursor = Change.objects.aggregate(cursor=Max('id'))['cursor'] or 0
+        ids = list(Event.objects.order_by('?').values_list('id', flat=True)[:changed])
+        Event.objects.filter(pk__in=ids).update(updated_at=timezone.now())
+        delta[f'{changed} events changed'] = measure(client, f'/sync?since={cursor}&limit=2000', repeat)
+
+    return {
+        'full': full,
+        'first_sync': measure(client, f'/sync?since=0&limit={PAGE_SIZE}', repeat),
+        'delta': delta,
+    }
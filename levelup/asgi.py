@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'levelup.settings')
+# Serve the read endpoints with the async views, see levelup/asgi_urls.py
+os.environ.setdefault('LEVELUP_ASYNC_READS', '1')
 
 application = get_asgi_application()
@@ -0,0 +1,19 @@
+"""URL configuration used under ASGI
+
+The read endpoints are served by the async views in levelupapi/views/async_reads.py,
+and the live stream of event changes by levelupapi/views/live.py.
+Everything else falls through to levelup/urls.py.
+"""
+from django.urls import path
+from levelupapi.views import async_reads, live
+from levelup.urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('gametypes', async_reads.game_type_list),
+    path('gametypes/<int:pk>', async_reads.game_type_detail),
+    path('games', async_reads.game_list),
+    path('games/<int:pk>', async_reads.game_detail),
+    path('events', async_reads.event_list),
+    path('events/<int:pk>', async_reads.event_detail),
+    path('events/live', live.event_live),
+] + sync_urlpatterns
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 
 """
@@ -50,13 +51,29 @@ INSTALLED_APPS = [
 # THIS IS NEW
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        # TokenAuthentication with a cache of token -> user -> gamer, see levelupapi/authentication.py
+        'levelupapi.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # The list endpoints page with keyset cursors, clients can ask for up to 500 rows with ?page_size=
+    'DEFAULT_PAGINATION_CLASS': 'levelupapi.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+    # JSON is rendered with orjson when it is installed, see levelupapi/renderers.py
+    'DEFAULT_RENDERER_CLASSES': (
+        'levelupapi.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
+# How many resolved tokens CachedTokenAuthentication keeps, and for how many seconds
+# Each worker process has its own copy. A deleted token or a deactivated user is refused by every worker on its next request
+# when CACHES is shared by the workers (Redis, Memcached), which carries the revocation markers of levelupapi/authentication.py.
+# With Django's default per-process cache, workers other than the one that made the change accept the token for up to TOKEN_CACHE_SECONDS.
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_SECONDS = 300
+
 # THIS IS NEW
 CORS_ORIGIN_WHITELIST = (
     'http://localhost:3000',
@@ -64,6 +81,12 @@ CORS_ORIGIN_WHITELIST = (
 )
 
 MIDDLEWARE = [
+    # First, so it sees every query the rest of the stack runs
+    'levelupapi.middleware.QueryCountMiddleware',
+    # Compresses what the rest of the stack returns, inside QueryCountMiddleware so the time it takes shows in the total
+    'levelupapi.middleware.CompressionMiddleware',
+    # Decides whether the request may read from the replica database, see levelupapi/routers.py
+    'levelupapi.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -74,7 +97,47 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'levelup.urls'
+# QueryCountMiddleware logs a warning when a request runs more statements than this,
+# or runs the same statement shape more times than this. Set either to None to turn it off.
+SQL_WARN_QUERIES = 100
+SQL_WARN_REPEATS = 20
+
+# CompressionMiddleware sends responses smaller than this many bytes uncompressed.
+# It offers gzip, and brotli too when the brotli package is installed.
+COMPRESS_MIN_BYTES = 1024
+
+# The levelupapi.sql logger writes one JSON line per request at INFO and the warnings above at WARNING.
+# Set LEVELUP_SQL_LOG_LEVEL=INFO to see every request.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'levelupapi.sql': {
+            'handlers': ['console'],
+            'level': os.environ.get('LEVELUP_SQL_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# The broker that carries event changes to the /events/live stream, see levelupapi/pubsub.py.
+# The default reaches the clients of its own worker process. With more than one worker, install redis and set
+#   LEVELUP_LIVE_BROKER=levelupapi.pubsub.RedisBroker LEVELUP_REDIS_URL=redis://localhost:6379/0
+LIVE_BROKER = os.environ.get('LEVELUP_LIVE_BROKER', 'levelupapi.pubsub.LocalBroker')
+LIVE_REDIS_URL = os.environ.get('LEVELUP_REDIS_URL', 'redis://localhost:6379/0')
+# Seconds between the keep-alive comments of an idle stream
+LIVE_HEARTBEAT_SECONDS = 15
+# Seconds a ticket from POST /events/live/ticket opens the stream for, see levelupapi/authentication.py
+LIVE_TICKET_SECONDS = 60
+
+# levelup/asgi.py sets LEVELUP_ASYNC_READS=1, so under ASGI the read endpoints are async views (levelup/asgi_urls.py)
+ASYNC_READS = os.environ.get('LEVELUP_ASYNC_READS') == '1'
+ROOT_URLCONF = 'levelup.asgi_urls' if ASYNC_READS else 'levelup.urls'
 
 TEMPLATES = [
     {
@@ -105,6 +168,55 @@ DATABASES = {
     }
 }
 
+# tests/test_signup_stress.py needs writers on several threads to wait for each other like they do in production.
+# SQLite's shared in-memory test database fails them at once with "table is locked", so the stress tests run
+# against a test database file in the temporary directory, and only when LEVELUP_STRESS_TESTS is set:
+#   LEVELUP_STRESS_TESTS=1 python3 manage.py test tests.test_signup_stress
+STRESS_TESTS = os.environ.get('LEVELUP_STRESS_TESTS') == '1'
+if STRESS_TESTS:
+    DATABASES['default']['TEST'] = {'NAME': os.path.join(tempfile.gettempdir(), 'levelup_test.sqlite3')}
+
+# GET requests read from a replica when one is configured, see levelupapi/routers.py.
+# To try it locally with two SQLite files, copy the database and name the copy:
+#   cp db.sqlite3 replica.sqlite3
+#   LEVELUP_REPLICA_NAME=replica.sqlite3 python3 manage.py runserver
+# The tests in tests/test_routers.py that need both files run when LEVELUP_REPLICA_NAME is set:
+#   LEVELUP_REPLICA_NAME=replica.sqlite3 python3 manage.py test tests.test_routers
+if os.environ.get('LEVELUP_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['LEVELUP_REPLICA_NAME'],
+    }
+
+# LEVELUP_DB_PROFILE=production is the profile for serving concurrent traffic from SQLite:
+# WAL mode and the pragmas below on every connection (see levelupapi/sqlite.py), writes that take the lock up front,
+# and connections kept open between requests instead of opened for each one.
+DB_PROFILE = os.environ.get('LEVELUP_DB_PROFILE', 'development')
+SQLITE_PRAGMAS = {}
+if DB_PROFILE == 'production':
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        # 64 MiB of page cache, a negative size is in KiB
+        'cache_size': -65536,
+        'mmap_size': 268435456,
+        # Milliseconds a connection waits for a lock before it gives up with "database is locked"
+        'busy_timeout': 5000,
+        'temp_store': 'memory',
+    }
+    for database in DATABASES.values():
+        # BEGIN IMMEDIATE takes the write lock when a transaction starts, so busy_timeout applies
+        # instead of a read transaction failing when it tries to upgrade to a write
+        database['OPTIONS'] = {'transaction_mode': 'IMMEDIATE'}
+        # Under ASGI every request runs its queries on a different thread, and a connection kept open on each would only pile up
+        database['CONN_MAX_AGE'] = 0 if ASYNC_READS else 600
+        database['CONN_HEALTH_CHECKS'] = True
+
+DATABASE_ROUTERS = ['levelupapi.routers.ReplicaRouter']
+
+# How long a client reads from the primary after it wrote, longer than the replica ever lags behind
+REPLICA_PIN_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -3,6 +3,9 @@ from django.contrib import admin
 from django.conf.urls import include
 from django.urls import path
 from levelupapi.views import register_user, login_user, GameTypeView, GameView, EventView
+from levelupapi.views.event import calendar_feed
+from levelupapi.views.live import live_ticket, live_unavailable
+from levelupapi.views.sync import sync
 
 # The trailing_slash=False tells the router to accept /gametypes instead of /gametypes/. It’s a very annoying error to come across, when your server is not responding and the code looks right, the only issue is your fetch url is missing a / at the end.
 # The next line is what sets up the /gametypes resource. The first parameter, r'gametypes, is setting up the url. The second GameTypeView is telling the server which view to use when it sees that url. The third, gametype, is called the base name. You’ll only see the base name if you get an error in the server. It acts as a nickname for the resource and is usually the singular version of the url.
@@ -15,7 +18,13 @@ router.register(r'events', EventView, 'event')
 urlpatterns = [
     path('register', register_user),
     path('login', login_user),
+    path('sync', sync),
     path('admin/', admin.site.urls),
+    # Streamed under ASGI by levelup/asgi_urls.py, listed here so it is not taken for an event id
+    path('events/live', live_unavailable),
+    path('events/live/ticket', live_ticket),
+    # Authenticated by the secret in the path, so calendar apps can subscribe to it
+    path('events/calendar/<str:feed_token>.ics', calendar_feed),
     path('', include(router.urls)),
     path('', include('levelupreports.urls')),
 ]
\ No newline at end of file
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class LevelupapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'levelupapi'
+
+    def ready(self):
+        # Connect the receivers that keep the caches up to date, and the one that sets up SQLite connections
+        from levelupapi import signals, sqlite  # pylint: disable=unused-import,import-outside-toplevel
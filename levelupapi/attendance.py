@@ -0,0 +1,179 @@
+"""Signing gamers up for events and taking them off again, for one event or many at once"""
+from collections import Counter
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from levelupapi.models import Event, EventGamer
+
+
+# Every change to who attends an event goes through these functions, so the single and batch endpoints behave the same.
+# A batch costs a fixed number of queries: one to lock the events, one for the events, one for the memberships that already exist, one bulk INSERT or DELETE and one UPDATE of the counts, all in one transaction.
+# Only an event's organizer may sign up or remove gamers other than themselves.
+# Event.attendee_count moves with every change, by an UPDATE that adds each event's difference with an F() expression in the same transaction.
+# Memberships added or removed any other way, e.g. when a gamer is deleted, are counted again by `python3 manage.py reconcile_attendee_counts`.
+
+# An event holds at most its capacity, or Game.number_of_players when it has none. A batch that would go over it leaves that event alone and reports it as full.
+# When a popular event opens, many gamers sign up for the same row at once. Checking the count and then inserting would let all of them see a free seat.
+# So a single signup (join) takes its seat with one conditional UPDATE: attendee_count + 1 WHERE attendee_count < capacity and the gamer is not attending yet.
+# The database runs that check and the increment as one step on the locked row, so the event can never go over capacity, and the membership row is inserted in the same short transaction.
+# Batches start their transaction with a write to the events they change (_lock). That locks just those rows, so the counts and memberships they read next cannot change under them, and writers of other events are not held up.
+# SQLite has one writer at a time whatever we do. Starting with the write makes it wait for the lock (busy_timeout) instead of failing with "database is locked" when a read lock cannot be upgraded.
+
+# Outcome of each event in a batch
+OK = 'ok'
+NOT_FOUND = 'not_found'
+FORBIDDEN = 'forbidden'
+FULL = 'full'
+
+# How many events recount corrects per UPDATE
+RECOUNT_BATCH_SIZE = 500
+
+
+def capacity():
+    """How many gamers may attend the event, as an expression"""
+    return Coalesce('capacity', 'game__number_of_players')
+
+
+def join(event_id, gamer):
+    """Sign `gamer` up for one event, if it has a free seat
+
+    Returns OK when the gamer attends afterwards, whether they were added or
+    already attending, FULL when there was no seat left, or NOT_FOUND.
+    """
+    attending = EventGamer.objects.filter(event=OuterRef('pk'), gamer=gamer)
+    try:
+        with transaction.atomic():
+            taken = Event.objects.filter(pk=event_id, attendee_count__lt=capacity()).exclude(Exists(attending)).update(
+                attendee_count=F('attendee_count') + 1, updated_at=timezone.now()
+            )
+            if taken:
+                EventGamer.objects.create(event_id=event_id, gamer=gamer)
+                return OK
+    except IntegrityError:
+        # Two signups of the same gamer got past the NOT EXISTS check together, the seat of the second is given back
+        return OK
+    # No seat was taken, find out why
+    event = Event.objects.filter(pk=event_id).annotate(joined=Exists(attending)).values('joined').first()
+    if event is None:
+        return NOT_FOUND
+    return OK if event['joined'] else FULL
+
+
+def sign_up(event_ids, gamer_ids, requester):
+    """Add every gamer in `gamer_ids` to every event in `event_ids`
+
+    Gamers who already attend an event are left alone. An event without enough
+    free seats for the gamers who do not attend yet is left alone too, and
+    reported as FULL. Returns one outcome per event, in the order asked for,
+    with the gamers that were `added` and the ones that were `unchanged`.
+    """
+    with transaction.atomic():
+        _lock(event_ids)
+        events, outcomes = _allowed_events(event_ids, gamer_ids, requester)
+        existing = _memberships(events, gamer_ids)
+        added = []
+        for event_id, free in events.items():
+            absent = [gamer_id for gamer_id in gamer_ids if (event_id, gamer_id) not in existing]
+            if len(absent) > free:
+                outcomes[event_id] = FULL
+            else:
+                added.extend(EventGamer(event_id=event_id, gamer_id=gamer_id) for gamer_id in absent)
+        EventGamer.objects.bulk_create(added)
+        _count(Counter(membership.event_id for membership in added))
+    return _report(event_ids, gamer_ids, outcomes, existing, 'added', changed_when_present=False)
+
+
+def leave(event_ids, gamer_ids, requester):
+    """Remove every gamer in `gamer_ids` from every event in `event_ids`
+
+    Returns one outcome per event, in the order asked for, with the gamers that
+    were `removed` and the ones that were `unchanged` because they were not attending.
+    """
+    with transaction.atomic():
+        _lock(event_ids)
+        events, outcomes = _allowed_events(event_ids, gamer_ids, requester)
+        existing = _memberships(events, gamer_ids)
+        EventGamer.objects.filter(event_id__in=events, gamer_id__in=gamer_ids).delete()
+        _count({event_id: -removed for event_id, removed in Counter(event_id for event_id, _ in existing).items()})
+    return _report(event_ids, gamer_ids, outcomes, existing, 'removed', changed_when_present=True)
+
+
+def _lock(event_ids):
+    """Write-lock the events, so nothing else changes their attendees until the transaction ends"""
+    Event.objects.filter(pk__in=event_ids).update(attendee_count=F('attendee_count'))
+
+
+def _allowed_events(event_ids, gamer_ids, requester):
+    """Find the events that exist and that the requester may change for these gamers
+
+    Returns the free seats of each of those events, and the outcome of every event asked for.
+    """
+    rows = Event.objects.filter(pk__in=event_ids).values_list('id', 'organizer_id', 'attendee_count', capacity())
+    found = {event_id: (organizer_id, seats - count) for event_id, organizer_id, count, seats in rows}
+    only_self = set(gamer_ids) == {requester.id}
+    outcomes = {}
+    for event_id in event_ids:
+        if event_id not in found:
+            outcomes[event_id] = NOT_FOUND
+        elif not only_self and found[event_id][0] != requester.id:
+            outcomes[event_id] = FORBIDDEN
+        else:
+            outcomes[event_id] = OK
+    events = {event_id: found[event_id][1] for event_id, outcome in outcomes.items() if outcome == OK}
+    return events, outcomes
+
+
+def _memberships(events, gamer_ids):
+    """The (event_id, gamer_id) pairs that already exist"""
+    return set(
+        EventGamer.objects.filter(event_id__in=events, gamer_id__in=gamer_ids).values_list('event_id', 'gamer_id')
+    )
+
+
+def _count(changes):
+    """Add each event's change in attendees to its attendee_count with one UPDATE
+
+    updated_at is bumped too, so conditional GETs see the change.
+    """
+    if not changes:
+        return
+    difference = Case(*(When(pk=event_id, then=Value(change)) for event_id, change in changes.items()), default=Value(0))
+    Event.objects.filter(pk__in=changes).update(attendee_count=F('attendee_count') + difference, updated_at=timezone.now())
+
+
+def counted_attendees():
+    """The number of memberships of the outer event, as a subquery expression"""
+    attendees = EventGamer.objects.filter(event=OuterRef('pk')).values('event').annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(attendees), 0)
+
+
+def recount(events=None):
+    """Set attendee_count from the memberships on every event of `events` whose count is off
+
+    Returns the ids of the events that were corrected.
+    """
+    if events is None:
+        events = Event.objects.all()
+    with transaction.atomic():
+        drifted = list(
+            events.annotate(counted=counted_attendees()).exclude(attendee_count=F('counted')).values_list('id', flat=True)
+        )
+        for start in range(0, len(drifted), RECOUNT_BATCH_SIZE):
+            Event.objects.filter(pk__in=drifted[start:start + RECOUNT_BATCH_SIZE]).update(
+                attendee_count=counted_attendees(), updated_at=timezone.now()
+            )
+    return drifted
+
+
+def _report(event_ids, gamer_ids, outcomes, existing, changed_key, changed_when_present):
+    results = []
+    for event_id in dict.fromkeys(event_ids):
+        result = {'event': event_id, 'status': outcomes[event_id]}
+        if outcomes[event_id] == OK:
+            present = [gamer_id for gamer_id in gamer_ids if (event_id, gamer_id) in existing]
+            absent = [gamer_id for gamer_id in gamer_ids if (event_id, gamer_id) not in existing]
+            result[changed_key] = present if changed_when_present else absent
+            result['unchanged'] = absent if changed_when_present else present
+        results.append(result)
+    return results
@@ -0,0 +1,242 @@
+"""Token authentication that remembers who a token belongs to"""
+import copy
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import constant_time_compare
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+
+
+# TokenAuthentication looks the token and its user up on every request, and nearly every view then looked the gamer up again.
+# CachedTokenAuthentication resolves token -> user -> gamer with one query the first time a token is seen and keeps the answer in a small LRU cache.
+# The gamer is exposed to the views as request.gamer.
+# Requests on other threads share the cached entry, so every request gets its own copies of the user, token and gamer, and what a view changes on them stays in that request.
+# Entries expire after TOKEN_CACHE_SECONDS, and the receivers in levelupapi/signals.py drop them as soon as a token is deleted or its user or gamer changes.
+# The cache belongs to one worker process and the signals only reach the process that made the change, so they also leave a revocation marker in Django's cache
+# once the change commits. Every cache hit checks the token's marker and reloads the token when it changed since the entry was loaded.
+# With a cache backend shared by the workers (see CACHES in levelup/settings.py) a revoked token is refused by all of them on the next request,
+# with the default per-process cache the other workers keep accepting it for up to TOKEN_CACHE_SECONDS.
+# The async read views in levelupapi/views/async_reads.py authenticate with aauthenticate, which shares the cache and only awaits the database on a miss.
+
+class TTLCache:
+    """A thread safe, size bounded LRU mapping whose entries expire after `ttl` seconds"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_where(self, predicate):
+        """Drop every entry whose value matches `predicate`"""
+        with self._lock:
+            for key in [key for key, (_, value) in self._entries.items() if predicate(value)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TTLCache(
+    maxsize=getattr(settings, 'TOKEN_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'TOKEN_CACHE_SECONDS', 300),
+)
+
+
+def token_digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def revocation_key(key):
+    """The Django cache key of a token's revocation marker, which does not hold the token itself"""
+    return f'levelupapi:token-revoked:{token_digest(key)}'
+
+
+def forget_token(key):
+    """Drop a cached token here, and in every worker once the current transaction commits"""
+    token_cache.delete(key)
+    marker = uuid.uuid4().hex
+    # Entries older than TOKEN_CACHE_SECONDS have expired anyway, so the marker can too
+    transaction.on_commit(lambda: cache.set(revocation_key(key), marker, settings.TOKEN_CACHE_SECONDS), robust=True)
+
+
+def forget_user(user_id):
+    """Drop the cached tokens of a user, after the user or their gamer changed"""
+    token_cache.delete_where(lambda entry: entry[0][0].id == user_id)
+    for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True):
+        forget_token(key)
+
+
+def resolve_token(key):
+    """Look up the (user, token, gamer) a token key belongs to, or None if there is no such token"""
+    # The marker is read before the token, so a change that commits in between is caught by the next request
+    entry = token_cache.get(key)
+    marker = cache.get(revocation_key(key))
+    if entry is not None and entry[1] == marker:
+        return hand_out(entry[0])
+    try:
+        token = Token.objects.select_related('user__gamer').get(key=key)
+    except Token.DoesNotExist:
+        return None
+    return hand_out(remember_token(token, marker))
+
+
+async def aresolve_token(key):
+    """The async version of resolve_token"""
+    entry = token_cache.get(key)
+    marker = await cache.aget(revocation_key(key))
+    if entry is not None and entry[1] == marker:
+        return hand_out(entry[0])
+    try:
+        token = await Token.objects.select_related('user__gamer').aget(key=key)
+    except Token.DoesNotExist:
+        return None
+    return hand_out(remember_token(token, marker))
+
+
+def remember_token(token, marker=None):
+    """Cache the (user, token, gamer) of a token loaded with its user and gamer, with the revocation marker it was loaded under"""
+    user = token.user
+    resolved = (user, token, getattr(user, 'gamer', None))
+    token_cache.set(token.key, (resolved, marker))
+    return resolved
+
+
+def hand_out(resolved):
+    """Copies of a cached (user, token, gamer) for one request, linked to each other like the originals"""
+    user, token, gamer = (copy.copy(instance) for instance in resolved)
+    token.user = user
+    if gamer is not None:
+        gamer.user = user
+        user.gamer = gamer
+    return (user, token, gamer)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication backed by the token cache, which also sets request.gamer"""
+
+    def authenticate(self, request):
+        """Returns (user, token), or None when the request has no token header, and sets request.gamer"""
+        key = self.header_key(request)
+        if key is None:
+            return None
+        resolved = resolve_token(key)
+        result = self.check_resolved(resolved)
+        # DRF's Request passes unknown attributes through to the Django request, so views can read request.gamer
+        request._request.gamer = resolved[2]  # pylint: disable=protected-access
+        return result
+
+    def authenticate_credentials(self, key):
+        return self.check_resolved(resolve_token(key))
+
+    async def aauthenticate(self, request):
+        """Authenticate a Django request from an async view
+
+        Returns:
+            tuple -- (user, token), or None when the request has no token header.
+            Sets request.gamer like authenticate does.
+        """
+        key = self.header_key(request)
+        if key is None:
+            return None
+        resolved = await aresolve_token(key)
+        result = self.check_resolved(resolved)
+        request.gamer = resolved[2]
+        return result
+
+    def header_key(self, request):
+        """The token key of the Authorization header, or None when it has no token, with TokenAuthentication's errors"""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed('Invalid token header. No credentials provided.')
+        if len(auth) > 2:
+            raise exceptions.AuthenticationFailed('Invalid token header. Token string should not contain spaces.')
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid token header. Token string should not contain invalid characters.')
+        return key
+
+    @staticmethod
+    def check_resolved(resolved):
+        if resolved is None:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        user, token, _ = resolved
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return (user, token)
+
+
+# EventSource, the browser API for Server-Sent Events, cannot send an Authorization header, so it cannot open /events/live with a token.
+# Instead the client POSTs to /events/live/ticket with its token, and opens the stream with the ticket it gets back: /events/live?ticket=...
+# A ticket is the user id and a digest of their token, signed with SECRET_KEY. It holds no secret, so it may end up in URLs and access logs.
+# It is accepted for LIVE_TICKET_SECONDS after it was made and stops working as soon as the token is deleted. An open stream is not cut when it expires.
+# When EventSource reconnects with an expired ticket it gets a 401 and gives up, so the client asks for a new ticket and opens the stream again,
+# passing the id of the last message it got as ?last_event_id= because a new EventSource does not send Last-Event-ID.
+
+TICKET_SALT = 'levelupapi.authentication.live-ticket'
+
+
+def make_ticket(token):
+    """A signed ticket that authenticates the owner of `token` to the live stream"""
+    return signing.dumps({'user': token.user_id, 'token': token_digest(token.key)}, salt=TICKET_SALT)
+
+
+class TicketAuthentication(BaseAuthentication):
+    """Authenticates the live stream from a ?ticket= made by make_ticket, which also sets request.gamer"""
+
+    async def aauthenticate(self, request):
+        """Returns (user, token), or None when the request has no ticket"""
+        ticket = request.GET.get('ticket')
+        if not ticket:
+            return None
+        try:
+            payload = signing.loads(ticket, salt=TICKET_SALT, max_age=settings.LIVE_TICKET_SECONDS)
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed('Ticket expired.')
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed('Invalid ticket.')
+        key = await Token.objects.filter(user_id=payload['user']).values_list('key', flat=True).afirst()
+        if key is None or not constant_time_compare(token_digest(key), payload['token']):
+            raise exceptions.AuthenticationFailed('Invalid ticket.')
+        resolved = await aresolve_token(key)
+        result = CachedTokenAuthentication.check_resolved(resolved)
+        request.gamer = resolved[2]
+        return result
+
+    def authenticate_header(self, request):
+        return 'Ticket'
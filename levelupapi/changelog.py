@@ -0,0 +1,43 @@
+"""Reading the change log for GET /sync and keeping it small"""
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from levelupapi.models import Change, ChangeHorizon
+
+
+# The triggers keep one row per object (see levelupapi/models/change.py), so the log grows with the number of objects and not with the number of writes.
+# What is left to grow is the tombstones, one per deleted game, event or membership, and gamers leave events all the time.
+# compact() drops the tombstones older than TOMBSTONE_DAYS and moves the ChangeHorizon up to the newest of them.
+# A client that has not synced for that long gets `reset` from GET /sync and starts over, every other client has already seen those deletions.
+# Run `python3 manage.py compact_changes` daily, from cron or the like.
+
+# How long deleted objects stay in the log
+TOMBSTONE_DAYS = 30
+
+
+def horizon():
+    """The cursor below which deletions may be missing from the log"""
+    return ChangeHorizon.objects.values_list('cursor', flat=True).first() or 0
+
+
+def changes_since(cursor, limit):
+    """The (id, model, object_id) of up to `limit` changes after `cursor`, oldest first, and whether more follow"""
+    changes = list(Change.objects.filter(id__gt=cursor).order_by('id').values_list('id', 'model', 'object_id')[:limit + 1])
+    return changes[:limit], len(changes) > limit
+
+
+def compact(older_than=timedelta(days=TOMBSTONE_DAYS)):
+    """Drop the tombstones of objects deleted more than `older_than` ago
+
+    Returns how many were dropped.
+    """
+    with transaction.atomic():
+        tombstones = Change.objects.filter(deleted=True, changed_at__lt=timezone.now() - older_than)
+        newest = tombstones.aggregate(newest=Max('id'))['newest']
+        if newest is None:
+            return 0
+        if newest > horizon():
+            ChangeHorizon.objects.update_or_create(pk=1, defaults={'cursor': newest})
+        dropped, _ = Change.objects.filter(deleted=True, id__lte=newest).delete()
+    return dropped
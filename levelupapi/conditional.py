@@ -0,0 +1,79 @@
+"""Helpers for answering conditional GET requests"""
+import hashlib
+from calendar import timegm
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def not_modified(request, etag=None, last_modified=None):
+    """Return a 304 response if the client's copy is still current, otherwise None
+
+    Compares the If-None-Match and If-Modified-Since request headers with the
+    validators of the resource, so a view can bail out before it loads or
+    serializes anything. `last_modified` is an aware datetime.
+    """
+    timestamp = timegm(last_modified.utctimetuple()) if last_modified is not None else None
+    if get_conditional_response(request, etag=etag, last_modified=timestamp) is None:
+        return None
+    return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+
+
+def set_validators(response, etag=None, last_modified=None):
+    """Add the validators of the resource to the response headers
+
+    The body depends on who is asking, so caches must key on the Authorization header too.
+    """
+    patch_vary_headers(response, ['Authorization'])
+    if etag is not None:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(timegm(last_modified.utctimetuple()))
+    return response
+
+
+def make_etag(*parts):
+    """A strong entity tag built from everything the response body depends on"""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def queryset_validators(queryset, timestamps, *extra, collection=False):
+    """Compute an ETag and Last-Modified for the rows of `queryset` with one aggregate query
+
+    The ETag changes when any row is saved (a newer timestamp) or when a row is
+    deleted or leaves the filtered set (a smaller count), without loading or
+    serializing the rows. Last-Modified is the newest timestamp, which only
+    follows saves, so it is left out (None) for a `collection`: a client asking
+    If-Modified-Since after a row was deleted would be told nothing changed.
+
+    Arguments:
+    queryset -- The filtered, unannotated queryset the response is built from
+    timestamps -- The auto_now fields to take the latest value of, may follow relations
+    extra -- Anything else the body depends on, such as the request path or the current gamer
+    collection -- True for list responses, whose rows may disappear
+    """
+    aggregates = queryset.aggregate(**validator_aggregates(timestamps))
+    return validators_from(aggregates, timestamps, extra, collection)
+
+
+async def aqueryset_validators(queryset, timestamps, *extra, collection=False):
+    """The async version of queryset_validators"""
+    aggregates = await queryset.aaggregate(**validator_aggregates(timestamps))
+    return validators_from(aggregates, timestamps, extra, collection)
+
+
+def validator_aggregates(timestamps):
+    return {
+        'count': Count('pk'),
+        **{f'latest_{index}': Max(field) for index, field in enumerate(timestamps)}
+    }
+
+
+def validators_from(aggregates, timestamps, extra, collection):
+    latest = [aggregates[f'latest_{index}'] for index in range(len(timestamps))]
+    present = [value for value in latest if value is not None]
+    last_modified = max(present) if present and not collection else None
+    return make_etag(aggregates['count'], *latest, *extra), last_modified
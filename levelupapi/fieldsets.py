@@ -0,0 +1,44 @@
+"""Sparse fieldsets: ?fields= picks the fields a response carries"""
+from rest_framework import serializers
+
+
+# Mobile clients only need a few fields from the lists, e.g. /games?fields=id,title or /events?fields=id,date.
+# The fields they leave out are not serialized, and the query skips them too: only() drops their columns and the views leave out the joins and prefetches behind them.
+
+def requested_fields(request, serializer_class):
+    """The fields asked for with ?fields=, in the serializer's order, or None for every field
+
+    Raises a ValidationError (400) for names the serializer does not have.
+    """
+    value = request.query_params.get('fields', '')
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    if not names:
+        return None
+    available = serializer_class.Meta.fields
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise serializers.ValidationError({'fields': [f'Unknown field "{name}".' for name in unknown]})
+    return [name for name in available if name in names]
+
+
+def narrow(queryset, fields, ordering=()):
+    """Load only the columns of `fields`, and of the `ordering` the page is cut by
+
+    Relations in `fields` load their foreign key column, the view decides whether to join them.
+    Fields that are not columns, like annotations and reverse relations, are skipped.
+    """
+    if fields is None:
+        return queryset
+    columns = {field.name for field in queryset.model._meta.concrete_fields}  # pylint: disable=protected-access
+    wanted = [name for name in [*fields, *(name.lstrip('-') for name in ordering)] if name in columns]
+    return queryset.only(*wanted)
+
+
+class SparseFieldsMixin:
+    """Lets a serializer be built with `fields=[...]` to drop every other field"""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
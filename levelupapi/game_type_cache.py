@@ -0,0 +1,80 @@
+"""In-process lookup table of game types"""
+import hashlib
+import json
+import threading
+import time
+from asgiref.sync import sync_to_async
+from levelupapi.models import GameType
+
+
+# Game types almost never change, but every game rendered with its type used to cost a query.
+# The table below is loaded once per process and reused until a game type is saved or deleted, which bumps the version and forces a reload on the next read.
+# The receivers that bump the version live in levelupapi/signals.py.
+# Other worker processes notice the change when their own copy expires, so a change made elsewhere shows up within GAME_TYPE_CACHE_SECONDS.
+
+GAME_TYPE_CACHE_SECONDS = 60
+
+
+class GameTypeCache:
+    """Versioned table of game type id -> serialized game type"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._loaded_version = None
+        self._loaded_at = 0
+        self._table = {}
+        self._etag = None
+
+    @property
+    def version(self):
+        return self._version
+
+    def bump(self):
+        """Mark the table as stale after a game type was written"""
+        with self._lock:
+            self._version += 1
+
+    def all(self):
+        """Every game type as a list of dictionaries, ordered by id"""
+        return list(self._current()[0].values())
+
+    def get(self, pk):
+        """A single game type as a dictionary, or None if it does not exist"""
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            return None
+        return self._current()[0].get(pk)
+
+    @property
+    def etag(self):
+        """An entity tag that changes whenever any game type changes
+
+        It is a hash of the table contents rather than the version, so every
+        worker process hands out the same tag for the same data.
+        """
+        return self._current()[1]
+
+    async def asnapshot(self):
+        """The table and its entity tag, loading them on a thread if they are stale
+
+        Async views read from the returned table, the sync accessors may query the database.
+        """
+        return await sync_to_async(self._current)()
+
+    def _current(self):
+        with self._lock:
+            expired = time.monotonic() - self._loaded_at > GAME_TYPE_CACHE_SECONDS
+            if self._loaded_version != self._version or expired:
+                version = self._version
+                rows = GameType.objects.order_by('id').values('id', 'label')
+                self._table = {row['id']: row for row in rows}
+                payload = json.dumps(list(self._table.values()), separators=(',', ':'))
+                self._etag = f'"gt-{hashlib.sha1(payload.encode()).hexdigest()}"'
+                self._loaded_version = version
+                self._loaded_at = time.monotonic()
+            return self._table, self._etag
+
+
+game_types = GameTypeCache()
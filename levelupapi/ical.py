@@ -0,0 +1,68 @@
+"""Writing events as an iCalendar (RFC 5545) feed"""
+
+
+# The feed is written one line at a time from a queryset iterator, so a gamer with years of events never has them all in memory.
+# Events have a date and a wall clock time but no time zone and no end, so DTSTART is a floating local time and there is no DTEND.
+
+PRODUCT_ID = '-//Level Up//Events//EN'
+# Longest line in octets before it has to be folded onto a continuation line
+LINE_LIMIT = 75
+
+
+def escape(text):
+    """Escape the characters that have a meaning in an iCalendar text value"""
+    return (
+        text.replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    """Split a content line into chunks of at most LINE_LIMIT octets, without breaking a UTF-8 character"""
+    chunks = []
+    chunk = ''
+    size = 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > LINE_LIMIT:
+            chunks.append(chunk)
+            # Continuation lines start with a space, which counts towards the limit
+            chunk = ''
+            size = 1
+        chunk += char
+        size += width
+    chunks.append(chunk)
+    return '\r\n '.join(chunks) + '\r\n'
+
+
+def event_lines(event, gamer):
+    """The VEVENT of one event, loaded with its game"""
+    start = f'{event.date:%Y%m%d}T{event.time:%H%M%S}'
+    yield fold('BEGIN:VEVENT')
+    yield fold(f'UID:event-{event.id}@levelup')
+    yield fold(f'DTSTAMP:{event.updated_at:%Y%m%dT%H%M%SZ}')
+    yield fold(f'DTSTART:{start}')
+    yield fold(f'SUMMARY:{escape(event.game.title)}')
+    yield fold(f'DESCRIPTION:{escape(event.description)}')
+    yield fold(f"CATEGORIES:{'Organizer' if event.organizer_id == gamer.id else 'Attendee'}")
+    yield fold('END:VEVENT')
+
+
+def calendar_lines(events, gamer):
+    """The whole VCALENDAR of `events` for `gamer`, one line at a time
+
+    Arguments:
+    events -- An iterable of events with their game loaded, usually a queryset iterator
+    gamer -- The gamer the feed is for
+    """
+    yield fold('BEGIN:VCALENDAR')
+    yield fold('VERSION:2.0')
+    yield fold(f'PRODID:{PRODUCT_ID}')
+    yield fold('CALSCALE:GREGORIAN')
+    yield fold('X-WR-CALNAME:Level Up')
+    for event in events:
+        yield from event_lines(event, gamer)
+    yield fold('END:VCALENDAR')
@@ -0,0 +1,53 @@
+"""Management command to run a benchmark suite and save the results as JSON"""
+import importlib
+import json
+import platform
+import subprocess
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from benchmarks import SUITES
+
+
+class Command(BaseCommand):
+    help = 'Run a benchmark suite against the configured database and write the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('suite', choices=sorted(SUITES), help='Which suite to run')
+        parser.add_argument('--repeat', type=int, default=20, help='How many times to time each request')
+        parser.add_argument('--output', help='File to write the JSON results to, defaults to stdout')
+
+    def handle(self, *args, **options):
+        suite = importlib.import_module(SUITES[options['suite']])
+        started = timezone.now()
+        # The test client talks to the app in-process as "testserver"
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            results = suite.run(options)
+
+        report = {
+            'suite': options['suite'],
+            'started': started,
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'options': {'repeat': options['repeat']},
+            **results,
+        }
+        output = json.dumps(report, cls=DjangoJSONEncoder, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as results_file:
+                results_file.write(output + '\n')
+            self.stdout.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(output)
+
+
+def git_commit():
+    """The commit being benchmarked, so runs can be compared over time"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,16 @@
+"""Management command to drop old tombstones from the change log"""
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+
+from levelupapi.changelog import TOMBSTONE_DAYS, compact
+
+
+class Command(BaseCommand):
+    help = 'Drop the tombstones of games, events and memberships deleted long ago from the change log GET /sync reads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=TOMBSTONE_DAYS, help='Keep the tombstones of the last this many days')
+
+    def handle(self, *args, **options):
+        dropped = compact(timedelta(days=options['days']))
+        self.stdout.write(f'Dropped {dropped} tombstones older than {options["days"]} days')
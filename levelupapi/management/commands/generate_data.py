@@ -0,0 +1,150 @@
+"""Management command to fill the database with realistic synthetic data"""
+import random
+from datetime import date, time, timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from rest_framework.authtoken.models import Token
+
+from levelupapi.attendance import capacity, recount
+from levelupapi.models import Event, EventGamer, Game, GameType, Gamer
+from levelupapi.signals import events_bulk_saved, games_bulk_saved
+
+
+# Row counts at --scale 1. Attendances are spread over the events, so each event gets about 20 attendees, fewer when it has fewer seats.
+# Most events get a capacity of CAPACITIES, the rest have none and seat their game's number of players.
+GAMERS = 10000
+GAMES = 100000
+EVENTS = 50000
+ATTENDANCES = 1000000
+
+BATCH_SIZE = 5000
+CAPACITIES = (10, 40)
+# The share of events without a capacity of their own
+UNLIMITED_SHARE = 0.2
+
+GAME_TYPES = ['Board game', 'Role-playing game', 'MMO game', 'Card game', 'Party game', 'Strategy game']
+WORDS = [
+    'Dragon', 'Castle', 'Space', 'Quest', 'Kart', 'Legends', 'Empire', 'Island', 'Dungeon', 'Galaxy',
+    'Ticket', 'Train', 'Catan', 'Pandemic', 'Forest', 'Ocean', 'Shadow', 'Crown', 'Rising', 'Heroes',
+]
+MAKERS = ['Hasbro', 'Nintendo', 'Mattel', 'Milton Bradley', 'Asmodee', 'Z-Man', 'Days of Wonder', 'Sega']
+FIRST_NAMES = ['Carrie', 'Sam', 'Alex', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery']
+LAST_NAMES = ['Belk', 'Smith', 'Lee', 'Garcia', 'Nguyen', 'Patel', 'Kim', 'Brown', 'Lopez', 'Khan']
+# Events fall within two years of this date
+FIRST_EVENT_DATE = date(2022, 1, 1)
+
+
+class Command(BaseCommand):
+    help = 'Generate gamers, games, events and attendances. --scale 1 is 10k gamers, 100k games and 1M attendances'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0, help='Multiplier for every row count')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the random generator, the same seed gives the same data')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        scale = options['scale']
+        counts = {
+            'gamers': max(1, int(GAMERS * scale)),
+            'games': max(1, int(GAMES * scale)),
+            'events': max(1, int(EVENTS * scale)),
+            'attendances': int(ATTENDANCES * scale),
+        }
+
+        with transaction.atomic():
+            game_type_ids = self.game_types()
+            gamer_ids = self.gamers(rng, counts['gamers'])
+            game_ids = self.games(rng, counts['games'], gamer_ids, game_type_ids)
+            event_ids = self.events(rng, counts['events'], gamer_ids, game_ids)
+            attendances = self.attendances(rng, counts['attendances'], gamer_ids, event_ids)
+
+        self.stdout.write(
+            f"Created {len(gamer_ids)} gamers, {len(game_ids)} games, {len(event_ids)} events "
+            f"and {attendances} attendances (seed {options['seed']})"
+        )
+
+    def game_types(self):
+        existing = set(GameType.objects.values_list('label', flat=True))
+        for label in GAME_TYPES:
+            if label not in existing:
+                GameType.objects.create(label=label)
+        return list(GameType.objects.values_list('id', flat=True))
+
+    def gamers(self, rng, count):
+        # Hashing a password per user would dominate the run time, every generated user shares one
+        password = make_password('levelup')
+        # Numbering from the current highest user id keeps usernames unique when the command runs again
+        first = (User.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+        users = User.objects.bulk_create([
+            User(
+                username=f'generated{first + i}',
+                password=password,
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+            )
+            for i in range(count)
+        ], batch_size=BATCH_SIZE)
+        # Token keys are secrets, so they come from the system random source rather than the seed
+        Token.objects.bulk_create([
+            Token(key=Token.generate_key(), user=user) for user in users
+        ], batch_size=BATCH_SIZE)
+        gamers = Gamer.objects.bulk_create([
+            Gamer(user=user, bio=f'Generated gamer {i}') for i, user in enumerate(users)
+        ], batch_size=BATCH_SIZE)
+        return [gamer.id for gamer in gamers]
+
+    def games(self, rng, count, gamer_ids, game_type_ids):
+        games = Game.objects.bulk_create([
+            Game(
+                title=f'{rng.choice(WORDS)} {rng.choice(WORDS)} {i}',
+                maker=rng.choice(MAKERS),
+                gamer_id=rng.choice(gamer_ids),
+                game_type_id=rng.choice(game_type_ids),
+                number_of_players=rng.randint(1, 8),
+                skill_level=rng.randint(1, 5),
+            )
+            for i in range(count)
+        ], batch_size=BATCH_SIZE)
+        ids = [game.id for game in games]
+        games_bulk_saved.send(sender=Game, ids=ids)
+        return ids
+
+    def events(self, rng, count, gamer_ids, game_ids):
+        events = Event.objects.bulk_create([
+            Event(
+                game_id=rng.choice(game_ids),
+                organizer_id=rng.choice(gamer_ids),
+                description=f'Come play {rng.choice(WORDS).lower()} night #{i}',
+                date=FIRST_EVENT_DATE + timedelta(days=rng.randrange(730)),
+                time=time(rng.randint(9, 22), rng.choice([0, 15, 30, 45])),
+                capacity=None if rng.random() < UNLIMITED_SHARE else rng.randint(*CAPACITIES),
+            )
+            for i in range(count)
+        ], batch_size=BATCH_SIZE)
+        ids = [event.id for event in events]
+        events_bulk_saved.send(sender=Event, ids=ids)
+        return ids
+
+    def attendances(self, rng, count, gamer_ids, event_ids):
+        """Sign random gamers up for random events, at most once per pair and never past an event's seats"""
+        per_event = min(len(gamer_ids), max(1, count // len(event_ids)))
+        events = Event.objects.filter(id__range=(min(event_ids), max(event_ids))).annotate(seats=capacity())
+        seats = dict(events.values_list('id', 'seats'))
+        created = 0
+        batch = []
+        for event_id in event_ids:
+            if created + len(batch) >= count:
+                break
+            for gamer_id in rng.sample(gamer_ids, min(per_event, seats[event_id])):
+                batch.append(EventGamer(event_id=event_id, gamer_id=gamer_id))
+            if len(batch) >= BATCH_SIZE:
+                EventGamer.objects.bulk_create(batch, ignore_conflicts=True)
+                created += len(batch)
+                batch = []
+        EventGamer.objects.bulk_create(batch, ignore_conflicts=True)
+        # The bulk inserts bypass levelupapi/attendance.py, so the new events are counted in one pass at the end
+        recount(Event.objects.filter(id__range=(min(event_ids), max(event_ids))))
+        return created + len(batch)
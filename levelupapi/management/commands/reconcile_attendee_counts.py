@@ -0,0 +1,23 @@
+"""Management command to correct Event.attendee_count from the memberships"""
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from levelupapi.attendance import counted_attendees, recount
+from levelupapi.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Count the attendees of every event again and correct the events whose attendee_count is off'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report the events that are off without changing them')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            drifted = Event.objects.annotate(counted=counted_attendees()).exclude(attendee_count=F('counted'))
+            for event_id, stored, counted in drifted.values_list('id', 'attendee_count', 'counted').order_by('id'):
+                self.stdout.write(f'Event {event_id}: attendee_count is {stored}, {counted} attend')
+            self.stdout.write(f'{drifted.count()} events are off')
+            return
+        corrected = recount()
+        self.stdout.write(f'Corrected the attendee count of {len(corrected)} events')
@@ -0,0 +1,303 @@
+"""Middleware for the levelup project"""
+import json
+import logging
+import re
+import time
+import zlib
+from collections import Counter
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from levelupapi.routers import SAFE_METHODS, pin_key, replica_allowed
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip is offered on its own
+    brotli = None
+
+logger = logging.getLogger('levelupapi.sql')
+
+
+# The N+1 in EventView.list went unnoticed because nothing showed how many queries a request ran.
+# QueryCountMiddleware wraps every database connection for the length of a request, counts the statements, adds up their time and groups them by shape.
+# The totals go back to the client in a Server-Timing header (browser dev tools show it next to the request) and into one JSON log line on the levelupapi.sql logger.
+# A warning is logged when a request runs more than SQL_WARN_QUERIES statements, or the same statement shape more than SQL_WARN_REPEATS times.
+# Statements run while a streaming response is being sent are not counted, the response has already left the middleware by then.
+# Under ASGI the middleware runs async, so it does not push the async read views back onto a thread.
+# Database connections belong to a thread, and the queries of an async request run on its sync_to_async thread, so the wrappers are installed there.
+
+# Literals and parameter lists that differ between otherwise identical statements
+NUMBER = re.compile(r'\b\d+\b')
+STRING = re.compile(r"'(?:[^']|'')*'")
+PARAMETER_LIST = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+WHITESPACE = re.compile(r'\s+')
+
+
+def statement_shape(sql):
+    """The statement with literals and parameter lists collapsed, so repeats of one query compare equal"""
+    shape = STRING.sub('?', sql)
+    shape = NUMBER.sub('?', shape)
+    shape = PARAMETER_LIST.sub('(...)', shape)
+    return WHITESPACE.sub(' ', shape).strip()
+
+
+class QueryStats:
+    """A connection execute wrapper that records every statement run through it"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[statement_shape(sql)] += 1
+
+    def most_repeated(self):
+        """The statement shape run most often and how many times, or (None, 0)"""
+        if not self.shapes:
+            return None, 0
+        return self.shapes.most_common(1)[0]
+
+
+class QueryCountMiddleware:
+    """Count and time the SQL each request runs, and report it in a Server-Timing header and a log line"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = QueryStats()
+        start = time.perf_counter()
+        with self.wrap_connections(stats):
+            response = self.get_response(request)
+        return self.finish(request, response, stats, start)
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        start = time.perf_counter()
+        wrappers = await sync_to_async(self.wrap_connections)(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(wrappers.close)()
+        return self.finish(request, response, stats, start)
+
+    @staticmethod
+    def wrap_connections(stats):
+        """Install `stats` on every connection of the current thread, undone by closing the returned stack"""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        return stack
+
+    def finish(self, request, response, stats, start):
+        total = time.perf_counter() - start
+        response['Server-Timing'] = (
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", total;dur={total * 1000:.1f}'
+        )
+        self.log(request, response, stats, total)
+        return response
+
+    @staticmethod
+    def log(request, response, stats, total):
+        shape, repeats = stats.most_repeated()
+        line = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': stats.count,
+            'db_ms': round(stats.duration * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+            'most_repeated': repeats,
+        }
+        logger.info(json.dumps(line))
+
+        warn_queries = getattr(settings, 'SQL_WARN_QUERIES', None)
+        warn_repeats = getattr(settings, 'SQL_WARN_REPEATS', None)
+        if warn_queries is not None and stats.count > warn_queries:
+            logger.warning(json.dumps({**line, 'warning': f'more than {warn_queries} queries'}))
+        if warn_repeats is not None and repeats > warn_repeats:
+            logger.warning(json.dumps({**line, 'warning': f'statement repeated more than {warn_repeats} times', 'sql': shape}))
+
+
+class ReplicaMiddleware:
+    """Let safe requests read from the replica, unless their client wrote a moment ago
+
+    See levelupapi/routers.py.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        key = pin_key(request)
+        safe = request.method in SAFE_METHODS
+        allowed = replica_allowed.set(safe and not (key and cache.get(key)))
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_allowed.reset(allowed)
+        if self.wrote(request, response) and key:
+            cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        key = pin_key(request)
+        safe = request.method in SAFE_METHODS
+        allowed = replica_allowed.set(safe and not (key and await cache.aget(key)))
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica_allowed.reset(allowed)
+        if self.wrote(request, response) and key:
+            await cache.aset(key, True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    @staticmethod
+    def wrote(request, response):
+        return request.method not in SAFE_METHODS and response.status_code < 400
+
+
+# A page of 500 events is about half a megabyte of JSON, which repeats the same keys in every row and shrinks to a tenth of that compressed.
+# CompressionMiddleware compresses the responses of at least COMPRESS_MIN_BYTES with the coding the client's Accept-Encoding prefers.
+# It offers brotli when the brotli package is installed and gzip always, and brotli wins a tie.
+# Small responses are sent as they are, compressing them costs more than it saves. That also keeps the small login and register responses, which carry a token, out of reach of BREACH-style attacks.
+# Streamed responses, like the calendar feed, are compressed as they go out, except text/event-stream, whose events would sit in the compressor's buffer.
+# Unlike Django's GZipMiddleware, it negotiates more than one coding, honours q-values and takes its threshold from the settings.
+
+# Compression levels that suit responses compressed on every request, the maxima are several times slower for a few percent
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def available_encodings():
+    """The codings the server can produce, the preferred one first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding, available):
+    """The coding of `available` the Accept-Encoding header `accept_encoding` rates highest, or None
+
+    A coding the header does not name gets the q-value of `*`, and a q-value of 0 refuses it.
+    On a tie the coding that comes first in `available` wins.
+    """
+    qualities = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        name, _, value = params.partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = qualities.get(coding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compressor(coding):
+    """The (compress, finish) functions of a new compression stream in `coding`"""
+    if coding == 'br':
+        stream = brotli.Compressor(quality=BROTLI_QUALITY)
+        return stream.process, stream.finish
+    stream = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    return stream.compress, stream.flush
+
+
+def compress_chunks(chunks, coding):
+    compress, finish = compressor(coding)
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+async def acompress_chunks(chunks, coding):
+    compress, finish = compressor(coding)
+    async for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware:
+    """Compress large responses with brotli or gzip, whichever the client prefers"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    @staticmethod
+    def compress(request, response):
+        if response.has_header('Content-Encoding') or response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESS_MIN_BYTES:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), available_encodings())
+        if coding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_chunks(response.streaming_content, coding)
+            else:
+                response.streaming_content = compress_chunks(response.streaming_content, coding)
+            response.headers.pop('Content-Length', None)
+        else:
+            compressed = b''.join(compress_chunks([response.content], coding))
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # The bytes differ from the uncompressed ones, so the ETag can only promise the same content, like GZipMiddleware does
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        response['Content-Encoding'] = coding
+        return response
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:10
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_attendees(apps, schema_editor):
+    """Keep the first row of every (event, gamer) pair so the unique constraint can be added"""
+    EventGamer = apps.get_model('levelupapi', 'EventGamer')
+    keep = EventGamer.objects.values('event', 'gamer').annotate(first=Min('id')).values('first')
+    EventGamer.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('levelupapi', '0005_game_updated_at_event_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['date', 'time', 'id'], name='event_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['game', 'date', 'time'], name='event_game_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventgamer',
+            index=models.Index(fields=['gamer', 'event'], name='eventgamer_gamer_event_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['game_type', 'id'], name='game_type_id_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_attendees, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='eventgamer',
+            constraint=models.UniqueConstraint(fields=('event', 'gamer'), name='eventgamer_event_gamer_uniq'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:31
+
+import django.db.models.deletion
+import levelupapi.models.search
+from django.db import migrations, models
+from levelupapi.migrations._fts import fts_table
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('levelupapi', '0006_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventSearch',
+            fields=[
+                ('event', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='levelupapi.event')),
+                ('document', levelupapi.models.search.SearchDocumentField(db_column='levelupapi_event_fts')),
+                ('description', models.TextField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'levelupapi_event_fts',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='GameSearch',
+            fields=[
+                ('game', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='levelupapi.game')),
+                ('document', levelupapi.models.search.SearchDocumentField(db_column='levelupapi_game_fts')),
+                ('title', models.TextField()),
+                ('maker', models.TextField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'levelupapi_game_fts',
+                'managed': False,
+            },
+        ),
+        fts_table('levelupapi_game', ['title', 'maker']),
+        fts_table('levelupapi_event', ['description']),
+    ]
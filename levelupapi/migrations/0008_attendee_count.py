@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:46
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from levelupapi.migrations._fts import fts_triggers
+
+
+def count_attendees(apps, schema_editor):
+    """Fill attendee_count from the existing memberships"""
+    Event = apps.get_model('levelupapi', 'Event')
+    EventGamer = apps.get_model('levelupapi', 'EventGamer')
+    attendees = EventGamer.objects.filter(event=OuterRef('pk')).values('event').annotate(count=Count('pk')).values('count')
+    Event.objects.update(attendee_count=Coalesce(Subquery(attendees), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('levelupapi', '0007_search'),
+    ]
+
+    operations = [
+        # Adding the column copies levelupapi_event into a new table, which drops the full-text index triggers
+        fts_triggers('levelupapi_event', ['description'], forwards=False),
+        migrations.AddField(
+            model_name='event',
+            name='attendee_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        fts_triggers('levelupapi_event', ['description']),
+        migrations.RunPython(count_attendees, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['attendee_count', 'id'], name='event_attendee_count_idx'),
+        ),
+    ]
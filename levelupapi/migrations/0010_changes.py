@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:03
+
+from django.db import migrations, models
+from levelupapi.migrations._changes import change_log
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('levelupapi', '0009_event_capacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeHorizon',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cursor', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(choices=[('game', 'Game'), ('event', 'Event'), ('attendance', 'EventGamer')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('model', 'object_id'), name='change_model_object_uniq')],
+            },
+        ),
+        change_log('levelupapi_game', 'game', 'updated_at'),
+        change_log('levelupapi_event', 'event', 'updated_at'),
+        change_log('levelupapi_eventgamer', 'attendance'),
+    ]
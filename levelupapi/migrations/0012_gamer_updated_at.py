@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('levelupapi', '0011_gamer_calendar_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamer',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,70 @@
+"""The SQL of the change log triggers, shared by the migrations that create and keep them
+
+The migration loader skips modules whose name starts with an underscore.
+"""
+from django.db import migrations
+
+
+# INSERT OR REPLACE deletes the object's earlier row and inserts one with the next AUTOINCREMENT id, so the log compacts itself as it is written.
+# Updates are logged when they set updated_at. Memberships are never updated, their update trigger is only there for completeness.
+# The backfill logs the rows that already exist, so a first sync from cursor 0 returns everything.
+CHANGE_TRIGGERS_SQL = """
+    CREATE TRIGGER {table}_change_insert AFTER INSERT ON {table} BEGIN
+        INSERT OR REPLACE INTO levelupapi_change(model, object_id, deleted, changed_at) VALUES ('{model}', new.id, 0, {now});
+    END;
+    CREATE TRIGGER {table}_change_update AFTER UPDATE{of} ON {table} BEGIN
+        INSERT OR REPLACE INTO levelupapi_change(model, object_id, deleted, changed_at) VALUES ('{model}', new.id, 0, {now});
+    END;
+    CREATE TRIGGER {table}_change_delete AFTER DELETE ON {table} BEGIN
+        INSERT OR REPLACE INTO levelupapi_change(model, object_id, deleted, changed_at) VALUES ('{model}', old.id, 1, {now});
+    END;
+"""
+
+BACKFILL_SQL = """
+    INSERT OR REPLACE INTO levelupapi_change(model, object_id, deleted, changed_at) SELECT '{model}', id, 0, {now} FROM {table} ORDER BY id;
+"""
+
+DROP_CHANGE_TRIGGERS_SQL = """
+    DROP TRIGGER IF EXISTS {table}_change_insert;
+    DROP TRIGGER IF EXISTS {table}_change_update;
+    DROP TRIGGER IF EXISTS {table}_change_delete;
+"""
+
+# The format Django stores DateTimeField in on SQLite, in UTC
+NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+def names_for(table, model, timestamp):
+    return {
+        'table': table,
+        'model': model,
+        'of': f' OF {timestamp}' if timestamp else '',
+        'now': NOW,
+    }
+
+
+def change_log(table, model, timestamp=None):
+    """RunSQL that logs the rows of `table` that exist and creates the triggers that log every later write
+
+    `timestamp` is the column every update of a row sets, when the table has one.
+    """
+    names = names_for(table, model, timestamp)
+    return migrations.RunSQL(
+        (CHANGE_TRIGGERS_SQL + BACKFILL_SQL).format(**names),
+        DROP_CHANGE_TRIGGERS_SQL.format(**names),
+    )
+
+
+# Like the full-text index triggers (see _fts.py), these go when Django copies a table to add a NOT NULL column or change one.
+# A migration that changes the columns of a logged table puts change_triggers() on both sides of the change.
+
+def change_triggers(table, model, timestamp=None, forwards=True):
+    """RunSQL that recreates the change log triggers of `table`
+
+    With forwards=False it only does so when the migration is unapplied.
+    """
+    names = names_for(table, model, timestamp)
+    sql = (DROP_CHANGE_TRIGGERS_SQL + CHANGE_TRIGGERS_SQL).format(**names)
+    if forwards:
+        return migrations.RunSQL(sql, migrations.RunSQL.noop)
+    return migrations.RunSQL(migrations.RunSQL.noop, sql)
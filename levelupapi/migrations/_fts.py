@@ -0,0 +1,77 @@
+"""The SQL of the full-text indexes, shared by the migrations that create and keep them
+
+The migration loader skips modules whose name starts with an underscore.
+"""
+from django.db import migrations
+
+
+# External content FTS5 tables: the text stays in levelupapi_game and levelupapi_event, the tables hold only the index.
+# The triggers update the index in the same statement as the row, so bulk_create, bulk_update and raw SQL writes are covered too.
+# 'rebuild' indexes the rows that already exist.
+FTS_TABLE_SQL = """
+    CREATE VIRTUAL TABLE {fts} USING fts5(
+        {columns},
+        content='{table}',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    );
+"""
+
+FTS_TRIGGERS_SQL = """
+    CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_columns});
+    END;
+    CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN
+        INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_columns});
+    END;
+    CREATE TRIGGER {fts}_update AFTER UPDATE OF {columns} ON {table} BEGIN
+        INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_columns});
+        INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_columns});
+    END;
+    INSERT INTO {fts}({fts}) VALUES ('rebuild');
+"""
+
+DROP_FTS_TRIGGERS_SQL = """
+    DROP TRIGGER IF EXISTS {fts}_insert;
+    DROP TRIGGER IF EXISTS {fts}_delete;
+    DROP TRIGGER IF EXISTS {fts}_update;
+"""
+
+DROP_FTS_TABLE_SQL = """
+    DROP TABLE {fts};
+"""
+
+
+def names_for(table, columns):
+    fts = f'{table}_fts'
+    return {
+        'fts': fts,
+        'table': table,
+        'columns': ', '.join(columns),
+        'new_columns': ', '.join(f'new.{column}' for column in columns),
+        'old_columns': ', '.join(f'old.{column}' for column in columns),
+    }
+
+
+def fts_table(table, columns):
+    """RunSQL that creates the full-text index over `columns` of `table` and the triggers that maintain it"""
+    names = names_for(table, columns)
+    return migrations.RunSQL(
+        (FTS_TABLE_SQL + FTS_TRIGGERS_SQL).format(**names),
+        (DROP_FTS_TRIGGERS_SQL + DROP_FTS_TABLE_SQL).format(**names),
+    )
+
+
+# SQLite cannot add a NOT NULL column or change one in place, so Django copies the table into a new one and drops the old one, and the triggers go with it.
+# A migration that changes the columns of an indexed table puts fts_triggers() on both sides of the change, so the triggers come back whichever way it runs.
+
+def fts_triggers(table, columns, forwards=True):
+    """RunSQL that recreates the triggers of the full-text index over `columns` of `table` and rebuilds it
+
+    With forwards=False it only does so when the migration is unapplied.
+    """
+    sql = (DROP_FTS_TRIGGERS_SQL + FTS_TRIGGERS_SQL).format(**names_for(table, columns))
+    if forwards:
+        return migrations.RunSQL(sql, migrations.RunSQL.noop)
+    return migrations.RunSQL(migrations.RunSQL.noop, sql)
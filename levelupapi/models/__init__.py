@@ -2,4 +2,6 @@ from .gamer import Gamer
 from .game import Game
 from .game_type import GameType
 from .event_gamer import EventGamer
-from .event import Event
\ No newline at end of file
+from .event import Event
+from .search import GameSearch, EventSearch
+from .change import Change, ChangeHorizon
@@ -0,0 +1,37 @@
+from django.db import models
+
+
+# Every insert, update and delete of a game, event or membership leaves a row in levelupapi_change, written by the triggers of migration 0010_changes.
+# Like the full-text index triggers, they run in the same statement as the write, so bulk_create, bulk_update, QuerySet.update and cascades are logged too.
+# An update is logged when it sets updated_at, which every write that changes what the API returns does for the conditional GETs already.
+# The triggers replace the earlier row of the same object, so the log holds one row per object and the id of that row says when it last changed.
+# GET /sync (levelupapi/views/sync.py) sends a client the objects whose row is newer than its cursor.
+# Tombstones of deleted objects would still pile up, `python3 manage.py compact_changes` drops the old ones (see levelupapi/changelog.py).
+
+class Change(models.Model):
+    GAME = 'game'
+    EVENT = 'event'
+    ATTENDANCE = 'attendance'
+    MODELS = [(GAME, 'Game'), (EVENT, 'Event'), (ATTENDANCE, 'EventGamer')]
+
+    # The cursor of GET /sync. SQLite hands out AUTOINCREMENT ids in commit order, as it has one writer at a time.
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=10, choices=MODELS)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            # The one row of each object, the triggers INSERT OR REPLACE on it
+            models.UniqueConstraint(fields=['model', 'object_id'], name='change_model_object_uniq'),
+        ]
+
+
+class ChangeHorizon(models.Model):
+    """The newest change whose tombstone was dropped from the log
+
+    A client whose cursor is older may have missed a deletion, so it syncs from scratch.
+    There is at most one row.
+    """
+    cursor = models.BigIntegerField(default=0)
@@ -8,6 +8,21 @@ class Event(models.Model):
     time = models.TimeField()
     organizer = models.ForeignKey("gamer", on_delete=models.CASCADE)
     attendees = models.ManyToManyField("gamer", through="eventGamer", related_name="events")
+    # Bumped on every save and whenever someone signs up or leaves, the views use it to answer conditional GETs
+    updated_at = models.DateTimeField(auto_now=True)
+    # How many gamers attend, kept in step by levelupapi/attendance.py so lists never count the attendees per event
+    attendee_count = models.PositiveIntegerField(default=0)
+    # How many gamers may attend, None means as many as the game is for (Game.number_of_players)
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The events list pages through (date, time, id), with or without the ?game= filter
+            models.Index(fields=['date', 'time', 'id'], name='event_date_time_idx'),
+            models.Index(fields=['game', 'date', 'time'], name='event_game_date_time_idx'),
+            # ?ordering=popular pages through (-attendee_count, -id), and ?min_attendees= is a range on the same index
+            models.Index(fields=['attendee_count', 'id'], name='event_attendee_count_idx'),
+        ]
     
     @property
     def joined(self):
@@ -2,4 +2,14 @@ from django.db import models
 
 class EventGamer(models.Model):
     gamer = models.ForeignKey("gamer", on_delete=models.CASCADE)
-    event = models.ForeignKey("event", on_delete=models.CASCADE)
\ No newline at end of file
+    event = models.ForeignKey("event", on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            # A gamer attends an event once, this also serves the "has this gamer joined" lookups
+            models.UniqueConstraint(fields=['event', 'gamer'], name='eventgamer_event_gamer_uniq'),
+        ]
+        indexes = [
+            # The events a gamer attends
+            models.Index(fields=['gamer', 'event'], name='eventgamer_gamer_event_idx'),
+        ]
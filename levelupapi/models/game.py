@@ -8,4 +8,12 @@ class Game(models.Model):
     maker = models.CharField(max_length=55)
     gamer = models.ForeignKey("gamer", on_delete=models.CASCADE)
     number_of_players = models.IntegerField()
-    skill_level = models.IntegerField()
\ No newline at end of file
+    skill_level = models.IntegerField()
+    # Bumped on every save, the list and detail views use it to answer conditional GETs
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # The games list pages through ids, with or without the ?type= filter
+            models.Index(fields=['game_type', 'id'], name='game_type_id_idx'),
+        ]
@@ -4,4 +4,8 @@ from django.contrib.auth.models import User
 
 class Gamer(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    bio = models.CharField(max_length=50)
\ No newline at end of file
+    bio = models.CharField(max_length=50)
+    # The secret in the gamer's calendar feed URL, see EventView.calendar_feed. None until they ask for one
+    calendar_token = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    # Games embed their gamer, so the game validators fold this in, see GAME_TIMESTAMPS in levelupapi/views/game.py
+    updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,43 @@
+from django.db import models
+
+
+# The full-text indexes over games and events are SQLite FTS5 tables, created and kept up to date by triggers in migration 0007_search.
+# They store no text of their own (content=...), only the index, and each index row has the rowid of the game or event it was built from.
+# These unmanaged models let the ORM join them: Game.objects.filter(search__document__match='"castle"*').
+
+class SearchDocumentField(models.TextField):
+    """The hidden column named after an FTS5 table, the left side of a MATCH over every indexed column"""
+
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class GameSearch(models.Model):
+    game = models.OneToOneField('game', on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search')
+    document = SearchDocumentField(db_column='levelupapi_game_fts')
+    title = models.TextField()
+    maker = models.TextField()
+    # bm25 relevance of the row to the MATCH in the same query, lower is better
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'levelupapi_game_fts'
+
+
+class EventSearch(models.Model):
+    event = models.OneToOneField('event', on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search')
+    document = SearchDocumentField(db_column='levelupapi_event_fts')
+    description = models.TextField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'levelupapi_event_fts'
@@ -0,0 +1,153 @@
+"""Keyset (cursor) pagination for the list endpoints"""
+import base64
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import IntegerField, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+# OFFSET paging makes the database walk past every skipped row, so page 1000 is far slower than page 1, and rows inserted while a client pages shift everything after them.
+# Keyset paging remembers the ordering values of the last row it sent and asks for the rows that sort after it: WHERE (date, time, id) > (last date, last time, last id).
+# With an index on the ordering columns every page is a short index range scan, and new rows can never make a client skip or repeat a row.
+# The last field of the ordering must be unique (we always end with id) so that the position in the list is exact.
+
+class KeysetPagination(BasePagination):
+    """Paginate a queryset by the values of its ordering fields
+
+    The cursor is an opaque, url-safe token. Clients should only ever pass back the `next` link they were given.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def __init__(self, ordering=('id',), page_size=None):
+        self.ordering = tuple(ordering)
+        self.page_size = page_size or api_settings.PAGE_SIZE
+        self.limit = self.page_size
+        self.has_next = False
+        self.request = None
+        self.last_position = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return a single page of `queryset` as a list"""
+        return self.keep_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        """The async version of paginate_queryset"""
+        return self.keep_page([obj async for obj in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        """The rows of the requested page, plus one"""
+        self.request = request
+        self.limit = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(self.clean_position(queryset, position)))
+
+        # Ask for one extra row to learn whether there is a next page without a COUNT query
+        return queryset[:self.limit + 1]
+
+    def keep_page(self, results):
+        """Drop the extra row and remember where the page ended"""
+        self.has_next = len(results) > self.limit
+        results = results[:self.limit]
+        if results:
+            self.last_position = [self.field_value(results[-1], field) for field in self.ordering]
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last_position))
+
+    def after(self, position):
+        """Build the row-value comparison (a, b, c) > (x, y, z) as a chain of ORs
+
+        A '-' prefixed field sorts descending, so "after" means less than for that column.
+        The chain is ANDed with a >= bound on the first column, which is redundant
+        but lets the database seek straight to the cursor in the ordering index.
+        """
+        condition = Q()
+        equal_so_far = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal_so_far & Q(**{f'{name}__{lookup}': value})
+            equal_so_far &= Q(**{name: value})
+        first = self.ordering[0]
+        bound = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{bound}': position[0]}) & condition
+
+    def clean_position(self, queryset, position):
+        """Convert every value of a decoded cursor to the type of its ordering field
+
+        A cursor is only base64 JSON, so a client can send any values in it. One that
+        does not fit its column would fail in the database instead of here, and so would
+        an integer outside the range the database stores.
+        """
+        operations = connections[queryset.db].ops
+        cleaned = []
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            try:
+                model_field = queryset.model._meta.get_field(name)  # pylint: disable=protected-access
+            except FieldDoesNotExist:
+                # An annotation, such as the search rank
+                model_field = queryset.query.annotations[name].output_field
+            if value is None or isinstance(value, (list, dict)):
+                raise NotFound('Invalid cursor')
+            try:
+                value = model_field.to_python(value)
+            except (TypeError, ValueError, ValidationError) as ex:
+                raise NotFound('Invalid cursor') from ex
+            if isinstance(model_field, IntegerField):
+                low, high = operations.integer_field_range(model_field.get_internal_type())
+                if (low is not None and value < low) or (high is not None and value > high):
+                    raise NotFound('Invalid cursor')
+            cleaned.append(value)
+        return cleaned
+
+    @staticmethod
+    def field_value(obj, field):
+        return getattr(obj, field.lstrip('-'))
+
+    def encode_cursor(self, position):
+        payload = json.dumps(position, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padding = '=' * (-len(encoded) % 4)
+            position = json.loads(base64.urlsafe_b64decode(encoded + padding))
+        except (TypeError, ValueError) as ex:
+            raise NotFound('Invalid cursor') from ex
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound('Invalid cursor')
+        return position
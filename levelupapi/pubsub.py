@@ -0,0 +1,218 @@
+"""Announcing event changes to the clients of the /events/live stream"""
+import asyncio
+import json
+import logging
+import threading
+import weakref
+from collections import deque
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+try:
+    import redis
+    import redis.asyncio
+except ImportError:  # pragma: no cover - the in-process broker works without it
+    redis = None
+
+logger = logging.getLogger('levelupapi.pubsub')
+
+
+# The front end used to poll GET /events every few seconds to see who joined what, rerunning the whole list each time.
+# Now EventView announces every change it makes, and levelupapi/views/live.py streams the announcements to the clients that want them.
+# A message is a small dictionary: its `id`, its `type` (created, updated, deleted, signup or leave), the `event` it is about, and the `gamers` who signed up or left.
+# Messages go out when the transaction that made the change commits, so a client that fetches the event when it hears about it sees the change.
+# The broker that carries them is settings.LIVE_BROKER. LocalBroker reaches the clients of its own worker process only, RedisBroker shares messages between workers.
+# Each broker remembers the last REPLAY_SIZE messages, so a client that reconnects with Last-Event-ID is sent what it missed.
+# When the messages it missed are no longer remembered it is sent a `reset` message instead, and should fetch what it shows again.
+
+# How many recent messages a broker remembers for clients that reconnect
+REPLAY_SIZE = 1000
+# How many messages may wait for a client. A client that falls further behind is disconnected, and catches up when it reconnects.
+QUEUE_SIZE = 256
+
+RESET = 'reset'
+
+
+def publish(kind, event_id, gamers=None):
+    """Announce a change to an event once the current transaction commits
+
+    A broker that cannot be reached is logged and does not fail the request.
+    """
+    message = {'type': kind, 'event': event_id}
+    if gamers is not None:
+        message['gamers'] = list(gamers)
+    transaction.on_commit(lambda: broker().publish(message), robust=True)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def broker():
+    """The broker of this process, built from settings.LIVE_BROKER on first use"""
+    global _broker  # pylint: disable=global-statement
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.LIVE_BROKER)()
+        return _broker
+
+
+class Subscription:
+    """The messages published after a client subscribed, read with `await subscription.get()`
+
+    Belongs to the event loop it was created on. Messages are handed to it from any thread.
+    """
+
+    def __init__(self, broker_, loop, size):
+        self._broker = broker_
+        self._loop = loop
+        self._queue = asyncio.Queue(size)
+        self.closed = False
+
+    async def get(self):
+        """The next message, or None once the subscription is closed and drained"""
+        if self.closed and self._queue.empty():
+            return None
+        return await self._queue.get()
+
+    def close(self):
+        """Stop the subscription, on its event loop"""
+        if self.closed:
+            return
+        self.closed = True
+        self._broker.unsubscribe(self)
+        if not self._queue.full():
+            # Wakes a reader waiting on an empty queue
+            self._queue.put_nowait(None)
+
+    def send(self, message):
+        """Hand `message` to the subscription from any thread, False when its event loop is gone"""
+        try:
+            self._loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            return False
+        return True
+
+    def _put(self, message):
+        if self.closed:
+            return
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # The client reads the messages it has queued and then reconnects, the replay fills in the rest
+            self.close()
+
+
+class LocalBroker:
+    """Hands every message published in this process to the subscriptions of this process"""
+
+    def __init__(self, replay_size=REPLAY_SIZE, queue_size=QUEUE_SIZE):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=replay_size)
+        self._subscriptions = set()
+        self._queue_size = queue_size
+        self.last_id = 0
+
+    def publish(self, message):
+        """Number `message` and deliver it, from any thread"""
+        with self._lock:
+            self._deliver({'id': self.last_id + 1, **message})
+
+    def deliver(self, message):
+        """Remember a numbered message and hand it to every subscription"""
+        with self._lock:
+            self._deliver(message)
+
+    def _deliver(self, message):
+        # Under the lock, so every subscription is handed the messages in the same order
+        self.last_id = max(self.last_id, message['id'])
+        self._recent.append(message)
+        for subscription in list(self._subscriptions):
+            if not subscription.send(message):
+                self._subscriptions.discard(subscription)
+
+    def subscribe(self, last_id=None):
+        """A subscription to the messages published from now on, on the running event loop
+
+        With `last_id`, the remembered messages after it come first, or a `reset`
+        message when some of the ones after it are no longer remembered.
+        """
+        subscription = Subscription(self, asyncio.get_running_loop(), self._queue_size)
+        with self._lock:
+            missed = [] if last_id is None else self._missed(last_id)
+            self._subscriptions.add(subscription)
+        # Messages published from here on reach the subscription through its event loop, after these
+        for message in missed:
+            subscription._put(message)  # pylint: disable=protected-access
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def since(self, last_id):
+        """The remembered messages published after `last_id`, oldest first"""
+        with self._lock:
+            return [message for message in self._recent if message['id'] > last_id]
+
+    def _missed(self, last_id):
+        if last_id >= self.last_id:
+            return []
+        missed = [message for message in self._recent if message['id'] > last_id]
+        if not missed or min(message['id'] for message in missed) > last_id + 1 or len(missed) > self._queue_size:
+            return [{'id': self.last_id, 'type': RESET}]
+        return missed
+
+
+class RedisBroker(LocalBroker):
+    """Shares the messages of every worker process through a Redis channel
+
+    Publishing numbers the message with a Redis counter and sends it to the
+    channel. Each worker listens on the channel with one connection per event
+    loop, and hands what it hears to its own subscriptions, so ids are the same
+    in every worker and a client may reconnect to any of them.
+    Needs the redis package, and settings.LIVE_REDIS_URL.
+    """
+
+    CHANNEL = 'levelup:live'
+    COUNTER = 'levelup:live:id'
+
+    def __init__(self, replay_size=REPLAY_SIZE, queue_size=QUEUE_SIZE):
+        if redis is None:
+            raise ImproperlyConfigured('RedisBroker needs the redis package, pip install redis')
+        super().__init__(replay_size, queue_size)
+        self._url = settings.LIVE_REDIS_URL
+        self._client = redis.Redis.from_url(self._url)
+        self._listeners = weakref.WeakKeyDictionary()
+
+    def publish(self, message):
+        message = {'id': self._client.incr(self.COUNTER), **message}
+        self._client.publish(self.CHANNEL, json.dumps(message))
+
+    def subscribe(self, last_id=None):
+        loop = asyncio.get_running_loop()
+        listener = self._listeners.get(loop)
+        if listener is None or listener.done():
+            self._listeners[loop] = loop.create_task(self._listen(loop))
+        return super().subscribe(last_id)
+
+    async def _listen(self, loop):
+        client = redis.asyncio.Redis.from_url(self._url)
+        try:
+            async with client.pubsub() as channel:
+                await channel.subscribe(self.CHANNEL)
+                async for item in channel.listen():
+                    if item['type'] == 'message':
+                        self.deliver(json.loads(item['data']))
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('Lost the connection to %s', self.CHANNEL)
+        finally:
+            await client.aclose()
+            # Without a listener the subscriptions of this loop hear nothing more, their clients reconnect and start a new one
+            with self._lock:
+                orphans = [subscription for subscription in self._subscriptions if subscription._loop is loop]  # pylint: disable=protected-access
+            for subscription in orphans:
+                # After the messages already on their way to it
+                loop.call_soon(subscription.close)
@@ -0,0 +1,52 @@
+"""Database routing between the primary and a read replica"""
+import contextvars
+import hashlib
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+# Report queries and list endpoints used to compete with signup writes for the one database.
+# ReplicaRouter sends the reads of GET requests to the `replica` alias, when settings.DATABASES has one, and everything else to `default`.
+# Only reads made while a GET, HEAD or OPTIONS request is being served go to the replica. Write requests, management commands and signal receivers always read from the primary, so they never act on stale rows.
+# A replica lags behind the primary, so a client that just wrote would not see its own change on the next read.
+# ReplicaMiddleware pins a client to the primary for REPLICA_PIN_SECONDS after a successful write, keyed by its Authorization header.
+# The pins live in Django's cache, so with a shared cache backend they hold across worker processes.
+# Tokens, users and sessions are always read from the primary, a token that was just created or deleted must be seen at once.
+
+REPLICA_DB_ALIAS = 'replica'
+# Apps whose models may be read from the replica
+REPLICA_APPS = {'levelupapi', 'levelupreports'}
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+replica_allowed = contextvars.ContextVar('replica_allowed', default=False)
+
+
+def read_database():
+    """The alias the current request reads from"""
+    if replica_allowed.get() and REPLICA_DB_ALIAS in settings.DATABASES:
+        return REPLICA_DB_ALIAS
+    return DEFAULT_DB_ALIAS
+
+
+def pin_key(request):
+    """The cache key that pins the client of `request` to the primary, or None for anonymous clients"""
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    return f'replica-pin:{hashlib.sha256(authorization.encode()).hexdigest()}'
+
+
+class ReplicaRouter:
+    """Read from the replica while a safe request is being served, write to the primary"""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in REPLICA_APPS:  # pylint: disable=protected-access
+            return read_database()
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
@@ -0,0 +1,42 @@
+"""Full-text search over games and events with the FTS5 indexes"""
+import re
+from django.db.models import F, FloatField, Value
+
+
+# ?q= on the games and events lists runs the search inside the database and pages through the matches best first, so nothing loads a whole table.
+# The indexes are the FTS5 tables behind GameSearch and EventSearch (levelupapi/models/search.py).
+# The text a client types is not passed to FTS5 as is, its query syntax would turn a stray quote or a word like NOT into an error or a different question.
+# Every word becomes a quoted prefix term, so "drag cas" finds "Dragon Castle", and all the words must match.
+
+WORD = re.compile(r'\w+')
+
+# The keyset ordering of search results, best match first. id breaks ties between equally ranked rows.
+SEARCH_ORDERING = ('rank', 'id')
+
+
+def match_query(text):
+    """The FTS5 query for what a client typed, or None if it has no words"""
+    words = WORD.findall(text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search(queryset, text):
+    """Narrow a Game or Event queryset to the rows matching `text`
+
+    Returns:
+        tuple -- (matching, ranked). `matching` holds the rows that match, for
+        counting and conditional GETs. `ranked` holds the same rows annotated
+        with their bm25 `rank`, for paging by SEARCH_ORDERING.
+    """
+    query = match_query(text)
+    if query is None:
+        nothing = queryset.none()
+        return nothing, nothing.annotate(rank=Value(0.0, output_field=FloatField()))
+    index = queryset.model.search.related.related_model
+    # Joined to another filter, the match can end up probed once per row of that filter, which is slow.
+    # As a subquery it runs once, and only the ranked page query needs the join.
+    matching = queryset.filter(pk__in=index.objects.filter(document__match=query).values('pk'))
+    ranked = matching.filter(search__document__match=query).annotate(rank=F('search__rank'))
+    return matching, ranked
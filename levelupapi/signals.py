@@ -0,0 +1,54 @@
+"""Receivers that keep the levelupapi caches in step with the database"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from rest_framework.authtoken.models import Token
+
+from levelupapi.attendance import counted_attendees
+from levelupapi.authentication import forget_token, forget_user
+from levelupapi.game_type_cache import game_types
+from levelupapi.models import Event, EventGamer, GameType, Gamer
+
+
+# bulk_create and bulk_update skip post_save, so the bulk write paths send these instead.
+# Receivers get `ids`, the primary keys of every row that was written.
+games_bulk_saved = Signal()
+events_bulk_saved = Signal()
+
+
+@receiver(post_save, sender=GameType)
+@receiver(post_delete, sender=GameType)
+def game_type_changed(sender, **kwargs):
+    # Bumped now for the reads of this transaction, and again once it commits: a reader on another thread
+    # may have reloaded the old rows in between and tagged them with the first bump's version
+    game_types.bump()
+    transaction.on_commit(game_types.bump, robust=True)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    forget_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    forget_user(instance.id)
+
+
+@receiver(post_save, sender=Gamer)
+@receiver(post_delete, sender=Gamer)
+def gamer_changed(sender, instance, **kwargs):
+    forget_user(instance.user_id)
+
+
+# loaddata saves rows raw, past levelupapi/attendance.py, and fixtures hold events and their memberships in separate files.
+# So attendee_count is counted from the memberships whenever loaddata writes an event or one of its memberships, in whichever order they come.
+
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=EventGamer)
+def attendance_loaded(sender, instance, raw, **kwargs):
+    if raw:
+        event_id = instance.pk if sender is Event else instance.event_id
+        Event.objects.filter(pk=event_id).update(attendee_count=counted_attendees())
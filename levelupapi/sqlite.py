@@ -0,0 +1,20 @@
+"""Connection setup for the SQLite database"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+# Under concurrent load the default SQLite setup fails writers with "database is locked" as soon as one other connection holds the lock, and readers block behind writers.
+# WAL mode lets readers carry on while one writer commits, and busy_timeout makes a writer wait for the lock instead of failing at once.
+# synchronous=NORMAL is safe in WAL mode and skips an fsync per commit, cache_size and mmap_size keep the hot pages in memory.
+# journal_mode is stored in the database file, the other pragmas only last as long as the connection, so every new connection runs them all.
+# The pragmas come from settings.SQLITE_PRAGMAS, which the production profile in levelup/settings.py fills in.
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    """Run settings.SQLITE_PRAGMAS on every new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        # Straight on the driver connection, so the pragmas do not show up in the query counts of a request
+        connection.connection.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,163 @@
+"""View module for serving the read endpoints natively under ASGI"""
+from asgiref.sync import sync_to_async
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from levelupapi.authentication import CachedTokenAuthentication
+from levelupapi.conditional import aqueryset_validators, not_modified, set_validators
+from levelupapi.fieldsets import requested_fields
+from levelupapi.game_type_cache import game_types
+from levelupapi.models import Event, Game
+from levelupapi.pagination import KeysetPagination
+from levelupapi.renderers import FastJSONRenderer
+from levelupapi.views.event import EventSerializer, EventView, aevent_validators, event_queryset, filter_events
+from levelupapi.views.game import GAME_TIMESTAMPS, GameSerializer, GameView, filter_games, game_queryset
+from levelupapi.views.game_type import GameTypeSerializer, GameTypeView
+
+
+# The ViewSets are synchronous, so under ASGI every request holds a thread from the moment it arrives until a slow client has read the last byte.
+# The views below serve GET for the list and retrieve routes of games, game types and events with the async ORM instead, so one worker process can keep many slow clients waiting on the event loop.
+# They answer exactly like the ViewSets: same authentication, same ETags, same cursors and same JSON. Every other method is handed to the ViewSet on a thread.
+# levelup/asgi_urls.py puts them in front of levelup/urls.py, and levelup/asgi.py turns that URL configuration on.
+# Django's async ORM still runs each query on a thread, what the async views save is the thread held while nothing is happening.
+
+authentication = CachedTokenAuthentication()
+
+
+def read_view(read, fallback, authenticators=(authentication,)):
+    """An async view that serves GET with `read` and passes every other method to the sync view `fallback`
+
+    The first of `authenticators` that finds credentials in the request authenticates it.
+    """
+    write = sync_to_async(fallback)
+
+    @csrf_exempt
+    async def view(request, **kwargs):
+        if request.method != 'GET':
+            return await write(request, **kwargs)
+        request = Request(request)
+        try:
+            user_auth = None
+            for authenticator in authenticators:
+                user_auth = await authenticator.aauthenticate(request._request)  # pylint: disable=protected-access
+                if user_auth is not None:
+                    break
+            if user_auth is None:
+                raise exceptions.NotAuthenticated()
+            response = await read(request, **kwargs)
+        except exceptions.APIException as ex:
+            # Shaped like DRF's exception handler: validation errors are the body, everything else is wrapped in `detail`
+            data = ex.detail if isinstance(ex.detail, (list, dict)) else {'detail': ex.detail}
+            response = Response(data, status=ex.status_code)
+            if isinstance(ex, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                response.status_code = status.HTTP_401_UNAUTHORIZED
+                response['WWW-Authenticate'] = authenticators[0].authenticate_header(request)
+        # The ViewSets get this from APIView, the response is rendered by the handler after the middleware has run
+        response.accepted_renderer = FastJSONRenderer()
+        response.accepted_media_type = FastJSONRenderer.media_type
+        response.renderer_context = {'request': request}
+        return response
+
+    return view
+
+
+async def list_game_types(request):
+    table, etag = await game_types.asnapshot()
+    cached = not_modified(request, etag=etag)
+    if cached is not None:
+        return cached
+    serializer = GameTypeSerializer(list(table.values()), many=True)
+    return set_validators(Response(serializer.data), etag=etag)
+
+
+async def retrieve_game_type(request, pk):
+    table, etag = await game_types.asnapshot()
+    cached = not_modified(request, etag=etag)
+    if cached is not None:
+        return cached
+    game_type = table.get(pk)
+    if game_type is None:
+        return Response({'message': 'GameType matching query does not exist.'}, status=status.HTTP_404_NOT_FOUND)
+    serializer = GameTypeSerializer(game_type)
+    return set_validators(Response(serializer.data), etag=etag)
+
+
+async def list_games(request):
+    fields = requested_fields(request, GameSerializer)
+    games, ranked, ordering = filter_games(Game.objects.all(), request)
+    table, types_etag = await game_types.asnapshot()
+    etag, last_modified = await aqueryset_validators(
+        games, GAME_TIMESTAMPS, request.get_full_path(), types_etag, collection=True
+    )
+    cached = not_modified(request, etag, last_modified)
+    if cached is not None:
+        return cached
+    paginator = KeysetPagination(ordering=ordering)
+    # The async ORM cannot load the gamer lazily while the serializer runs, so game_queryset joins it
+    page = await paginator.apaginate_queryset(game_queryset(ranked, fields, ordering), request)
+    serializer = GameSerializer(page, many=True, fields=fields, context={'game_types': table})
+    return set_validators(paginator.get_paginated_response(serializer.data), etag, last_modified)
+
+
+async def retrieve_game(request, pk):
+    fields = requested_fields(request, GameSerializer)
+    games = Game.objects.filter(pk=pk)
+    table, types_etag = await game_types.asnapshot()
+    etag, last_modified = await aqueryset_validators(games, GAME_TIMESTAMPS, request.get_full_path(), types_etag)
+    cached = not_modified(request, etag, last_modified)
+    if cached is not None:
+        return cached
+    try:
+        game = await game_queryset(games, fields).aget()
+    except Game.DoesNotExist as ex:
+        return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
+    serializer = GameSerializer(game, fields=fields, context={'game_types': table})
+    return set_validators(Response(serializer.data), etag, last_modified)
+
+
+async def list_events(request):
+    gamer = request.gamer
+    fields = requested_fields(request, EventSerializer)
+    events, ranked, ordering = filter_events(Event.objects.all(), request)
+    etag, last_modified = await aevent_validators(events, request, gamer, collection=True)
+    cached = not_modified(request, etag, last_modified)
+    if cached is not None:
+        return cached
+    paginator = KeysetPagination(ordering=ordering)
+    page = await paginator.apaginate_queryset(event_queryset(gamer, ranked, fields, ordering), request)
+    serializer = EventSerializer(page, many=True, fields=fields)
+    return set_validators(paginator.get_paginated_response(serializer.data), etag, last_modified)
+
+
+async def retrieve_event(request, pk):
+    gamer = request.gamer
+    fields = requested_fields(request, EventSerializer)
+    events = Event.objects.filter(pk=pk)
+    etag, last_modified = await aevent_validators(events, request, gamer)
+    cached = not_modified(request, etag, last_modified)
+    if cached is not None:
+        return cached
+    try:
+        event = await event_queryset(gamer, events, fields).aget()
+    except Event.DoesNotExist as ex:
+        return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
+    serializer = EventSerializer(event, fields=fields)
+    return set_validators(Response(serializer.data), etag, last_modified)
+
+
+# The method -> action maps the router gives each ViewSet, limited to the actions it has
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+
+
+def viewset_view(viewset, actions):
+    return viewset.as_view({method: action for method, action in actions.items() if hasattr(viewset, action)})
+
+
+game_type_list = read_view(list_game_types, viewset_view(GameTypeView, LIST_ACTIONS))
+game_type_detail = read_view(retrieve_game_type, viewset_view(GameTypeView, DETAIL_ACTIONS))
+game_list = read_view(list_games, viewset_view(GameView, LIST_ACTIONS))
+game_detail = read_view(retrieve_game, viewset_view(GameView, DETAIL_ACTIONS))
+event_list = read_view(list_events, viewset_view(EventView, LIST_ACTIONS))
+event_detail = read_view(retrieve_event, viewset_view(EventView, DETAIL_ACTIONS))
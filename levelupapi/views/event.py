@@ -1,12 +1,22 @@
 """View module for handling requests about game types"""
-from django.http import HttpResponseServerError
+import secrets
+from django.http import HttpResponseServerError, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+from django.utils import timezone
 from rest_framework.viewsets import ViewSet
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import serializers, status
-from levelupapi.models import Event
+from django.db.models import Exists, OuterRef, Prefetch, Q
+from levelupapi.models import Event, EventGamer
 from levelupapi.models.game import Game
 from levelupapi.models.gamer import Gamer
+from levelupapi import attendance, ical, pubsub
+from levelupapi.conditional import aqueryset_validators, not_modified, queryset_validators, set_validators
+from levelupapi.fieldsets import SparseFieldsMixin, narrow, requested_fields
+from levelupapi.pagination import KeysetPagination
+from levelupapi.search import SEARCH_ORDERING, search
 
 
 # The ViewSet has all of the logic for handling an incoming request from a client, determining what action is needed (i.e. create data, get data, update data, or delete data), interacting with the database to do what the client asked, and then constructing a response to the client.
@@ -21,6 +31,12 @@ from levelupapi.models.gamer import Gamer
 # Workflow:
 # Any time that you want to allow a client to access data in your database, there's a series of steps you have to follow in order to accomplish it with Django REST Framework. So far we’ve only written the models. The next step is writing the views and serializers so the client can access and manipulate the data in the database.
 
+# How many events the calendar feed reads from the database at a time
+CALENDAR_CHUNK_SIZE = 500
+# The largest id the database can store. Larger numbers sent as ids would overflow in SQLite instead of failing validation
+MAX_ID = 2**63 - 1
+
+
 class EventView(ViewSet):
     """Level up game types view"""
 
@@ -31,9 +47,17 @@ class EventView(ViewSet):
             Response -- JSON serialized game type
         """
         try:
-            event = Event.objects.get(pk=pk)
-            serializer = EventSerializer(event)
-            return Response(serializer.data)
+            gamer = request.gamer
+            fields = requested_fields(request, EventSerializer)
+            # Answer clients that already have the current version before loading the event
+            events = Event.objects.filter(pk=pk)
+            etag, last_modified = event_validators(events, request, gamer)
+            cached = not_modified(request, etag, last_modified)
+            if cached is not None:
+                return cached
+            event = event_queryset(gamer, events, fields).get()
+            serializer = EventSerializer(event, fields=fields)
+            return set_validators(Response(serializer.data), etag, last_modified)
         except Event.DoesNotExist as ex:
                 return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
 
@@ -43,17 +67,17 @@ class EventView(ViewSet):
         Returns:
             Response -- JSON serialized list of game types
         """
-        events = Event.objects.all()
-        game = request.query_params.get('game', None)
-        if game is not None:
-            events = events.filter(game_id=game)
-        # Set the `joined` property on every event
-        for event in events:
-            # Check to see if the gamer is in the attendees list on the event
-            gamer = Gamer.objects.get(user=request.auth.user) 
-            event.joined = gamer in event.attendees.all()   
-        serializer = EventSerializer(events, many=True)
-        return Response(serializer.data)
+        gamer = request.gamer
+        fields = requested_fields(request, EventSerializer)
+        events, ranked, ordering = filter_events(Event.objects.all(), request)
+        etag, last_modified = event_validators(events, request, gamer, collection=True)
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+        paginator = KeysetPagination(ordering=ordering)
+        page = paginator.paginate_queryset(event_queryset(gamer, ranked, fields, ordering), request)
+        serializer = EventSerializer(page, many=True, fields=fields)
+        return set_validators(paginator.get_paginated_response(serializer.data), etag, last_modified)
     
     
     def create(self, request):
@@ -61,10 +85,11 @@ class EventView(ViewSet):
         Returns
             Response -- JSON serialized game instance
         """
-        gamer = Gamer.objects.get(user=request.auth.user)
+        gamer = request.gamer
         serializer = CreateEventSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save(organizer=gamer)
+        event = serializer.save(organizer=gamer)
+        pubsub.publish('created', event.id)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
@@ -102,6 +127,7 @@ class EventView(ViewSet):
         serializer = CreateEventSerializer(event, data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        pubsub.publish('updated', event.id)
         return Response(None, status=status.HTTP_204_NO_CONTENT)   
     
     
@@ -111,6 +137,7 @@ class EventView(ViewSet):
     def destroy(self, request, pk):
         event = Event.objects.get(pk=pk)
         event.delete()
+        pubsub.publish('deleted', int(pk))
         return Response(None, status=status.HTTP_204_NO_CONTENT) 
     
     
@@ -125,9 +152,13 @@ class EventView(ViewSet):
     def signup(self, request, pk):
         """Post request for a user to sign up for an event"""
     
-        gamer = Gamer.objects.get(user=request.auth.user)
-        event = Event.objects.get(pk=pk)
-        event.attendees.add(gamer)
+        gamer = request.gamer
+        outcome = attendance.join(int(pk), gamer)
+        if outcome == attendance.NOT_FOUND:
+            return Response({'message': 'Event matching query does not exist.'}, status=status.HTTP_404_NOT_FOUND)
+        if outcome == attendance.FULL:
+            return Response({'message': 'Event is full'}, status=status.HTTP_409_CONFLICT)
+        pubsub.publish('signup', int(pk), [gamer.id])
         return Response({'message': 'Gamer added'}, status=status.HTTP_201_CREATED)
     
     
@@ -135,26 +166,276 @@ class EventView(ViewSet):
     def leave(self, request, pk):
         """Post request for a user to sign up for an event"""
 
-        gamer = Gamer.objects.get(user=request.auth.user)
-        event = Event.objects.get(pk=pk)
-        event.attendees.remove(gamer)
+        gamer = request.gamer
+        result = attendance.leave([int(pk)], [gamer.id], gamer)[0]
+        if result['status'] == attendance.NOT_FOUND:
+            return Response({'message': 'Event matching query does not exist.'}, status=status.HTTP_404_NOT_FOUND)
+        if result['removed']:
+            pubsub.publish('leave', int(pk), result['removed'])
         return Response({'message': 'Gamer left'}, status=status.HTTP_204_NO_CONTENT)    
+
+
+    # The batch versions take a list of event ids, so joining a whole tournament series is one request to http://localhost:8000/events/bulk_signup
+    # An organizer can also pass a list of gamers to sign up or remove from their own events.
+    # The response has one entry per event: its status (ok, not_found, forbidden or full) and which gamers changed.
+    # Every change, here and in the other write methods, is announced to the clients of /events/live, see levelupapi/pubsub.py.
+
+    @action(methods=['post'], detail=False)
+    def bulk_signup(self, request):
+        """Post request to sign up for many events at once"""
+        return self.change_attendance(request, attendance.sign_up)
+
+
+    @action(methods=['post'], detail=False)
+    def bulk_leave(self, request):
+        """Post request to leave many events at once"""
+        return self.change_attendance(request, attendance.leave)
+
+
+    # GET http://localhost:8000/events/calendar is the gamer's events as an iCalendar feed, for clients that send the token.
+    # The feed holds every event the gamer organizes or attends. It is streamed from a queryset iterator, so its size does not matter.
+    # Calendar apps subscribe to a URL and cannot send the token, so they use the gamer's feed URL instead: POST /events/calendar/feed
+    # returns http://localhost:8000/events/calendar/<feed token>.ics, which serves the same feed to anyone who has it (see calendar_feed below).
+    # Posting again gives a new URL and the old one stops working, DELETE /events/calendar/feed turns the feed URL off.
+
+    @action(methods=['get'], detail=False)
+    def calendar(self, request):
+        """Handle GET requests for the gamer's events as an iCalendar feed
+        Returns:
+            StreamingHttpResponse -- text/calendar with one VEVENT per event
+        """
+        return calendar_response(request.gamer)
+
+
+    @action(methods=['post', 'delete'], detail=False, url_path='calendar/feed')
+    def calendar_feed_url(self, request):
+        """Handle POST requests for a new secret calendar feed URL, and DELETE requests to turn it off
+        Returns:
+            Response -- JSON with the feed URL, or an empty body with a 204 status code
+        """
+        gamer = request.gamer
+        if request.method == 'DELETE':
+            Gamer.objects.filter(pk=gamer.pk).update(calendar_token=None)
+            return Response(None, status=status.HTTP_204_NO_CONTENT)
+        feed_token = secrets.token_urlsafe(32)
+        Gamer.objects.filter(pk=gamer.pk).update(calendar_token=feed_token)
+        return Response({'url': request.build_absolute_uri(f'/events/calendar/{feed_token}.ics')})
+
+
+    def change_attendance(self, request, change):
+        serializer = BatchAttendanceSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        gamer = request.gamer
+        gamer_ids = list(dict.fromkeys(serializer.validated_data.get('gamers') or [gamer.id]))
+        unknown = set(gamer_ids) - set(Gamer.objects.filter(pk__in=gamer_ids).values_list('id', flat=True))
+        if unknown:
+            return Response({'gamers': [f'Invalid pk "{pk}" - object does not exist.' for pk in sorted(unknown)]},
+                            status=status.HTTP_400_BAD_REQUEST)
+        results = change(serializer.validated_data['events'], gamer_ids, gamer)
+        for result in results:
+            if result.get('added'):
+                pubsub.publish('signup', result['event'], result['added'])
+            elif result.get('removed'):
+                pubsub.publish('leave', result['event'], result['removed'])
+        return Response(results)
         
     
 
-class EventSerializer(serializers.ModelSerializer):
-    """JSON serializer for game types
+# Most attended first, newest first among equals, read backwards from event_attendee_count_idx
+POPULAR_ORDERING = ('-attendee_count', '-id')
+
+
+def filter_events(events, request):
+    """Apply the ?game=, ?start=, ?end=, ?upcoming=, ?min_attendees=, ?q= and ?ordering= parameters of the events list
+
+    Returns:
+        tuple -- the filtered queryset for the validators, the same rows to
+        page through, and the ordering to page them by. Searches
+        are ordered by relevance (see levelupapi/search.py), everything else by date and time,
+        unless ?ordering=popular asks for the most attended first.
+    """
+    filters = EventFilterSerializer(data=request.query_params)
+    filters.is_valid(raise_exception=True)
+    params = filters.validated_data
+    if 'game' in params:
+        events = events.filter(game_id=params['game'])
+    # The date filters are ranges on the leading column of the (date, time, id) index, or of (game, date, time) with ?game=
+    if 'start' in params:
+        events = events.filter(date__gte=params['start'])
+    if 'end' in params:
+        events = events.filter(date__lte=params['end'])
+    if params.get('upcoming'):
+        now = timezone.localtime()
+        events = events.filter(date__gte=now.date()).exclude(date=now.date(), time__lt=now.time())
+    # attendee_count is kept up to date on the row, so popularity is an index range and not a COUNT per event
+    if 'min_attendees' in params:
+        events = events.filter(attendee_count__gte=params['min_attendees'])
+    text = params.get('q', None)
+    if text is not None:
+        matching, ranked = search(events, text)
+        if params.get('ordering') == 'popular':
+            return matching, matching, POPULAR_ORDERING
+        return matching, ranked, SEARCH_ORDERING
+    if params.get('ordering') == 'popular':
+        return events, events, POPULAR_ORDERING
+    return events, events, ('date', 'time', 'id')
+
+
+# The joins behind the EventSerializer fields that render a related row
+EVENT_JOINS = {'game': 'game', 'organizer': 'organizer__user'}
+
+
+def event_queryset(gamer, events=None, fields=None, ordering=()):
+    """Events with everything EventSerializer renders loaded up front
+
+    The game and organizer come from one joined query and the attendees from
+    one prefetch query, however many events are in the queryset. The `joined`
+    flag for `gamer` is an EXISTS subquery, so it costs no extra round trips.
+    Pass `events` to start from an already filtered queryset.
+    With `fields` from ?fields= only their columns, and the `ordering` columns
+    the page is cut by, are loaded, and the joins, the prefetch and the
+    subquery behind the other fields are left out.
+    """
+    if events is None:
+        events = Event.objects.all()
+    wanted = set(EventSerializer.Meta.fields if fields is None else fields)
+    if 'joined' in wanted:
+        events = events.annotate(joined=Exists(EventGamer.objects.filter(event=OuterRef('pk'), gamer=gamer)))
+    if 'capacity' in wanted:
+        events = events.annotate(seats=attendance.capacity())
+    related = [path for name, path in EVENT_JOINS.items() if name in wanted]
+    if related:
+        events = events.select_related(*related)
+    if 'attendees' in wanted:
+        events = events.prefetch_related(Prefetch('attendees', queryset=Gamer.objects.select_related('user')))
+    return narrow(events, fields, ordering)
+
+
+EVENT_TIMESTAMPS = ('updated_at', 'game__updated_at')
+
+
+def event_validators(events, request, gamer, collection=False):
+    """ETag and Last-Modified for a response built from `events`
+
+    An event's payload changes when the event or its game is saved, and when
+    someone signs up or leaves (see levelupapi/attendance.py). The `joined` flag differs per
+    gamer, so the gamer is part of the tag. Lists pass `collection` and get no Last-Modified.
+    """
+    return queryset_validators(events, EVENT_TIMESTAMPS, request.get_full_path(), gamer.id, collection=collection)
+
+
+async def aevent_validators(events, request, gamer, collection=False):
+    """The async version of event_validators"""
+    return await aqueryset_validators(events, EVENT_TIMESTAMPS, request.get_full_path(), gamer.id, collection=collection)
+
+
+@require_GET
+def calendar_feed(request, feed_token):
+    """Handle GET requests for a gamer's events at their secret feed URL
+    Returns:
+        StreamingHttpResponse -- text/calendar with one VEVENT per event
+    """
+    # A plain Django view: the path authenticates the request, and calendar apps send Accept headers DRF would refuse
+    gamer = get_object_or_404(Gamer, calendar_token=feed_token)
+    return calendar_response(gamer)
+
+
+def calendar_events(gamer):
+    """The events the gamer organizes or attends, in the order of the calendar feed"""
+    attending = EventGamer.objects.filter(gamer=gamer).values('event_id')
+    return Event.objects.filter(
+        Q(organizer=gamer) | Q(pk__in=attending)
+    ).select_related('game').order_by('date', 'time', 'id')
+
+
+def calendar_response(gamer):
+    """The iCalendar feed of the events the gamer organizes or attends"""
+    events = calendar_events(gamer)
+    response = StreamingHttpResponse(
+        ical.calendar_lines(events.iterator(chunk_size=CALENDAR_CHUNK_SIZE), gamer),
+        content_type='text/calendar; charset=utf-8'
+    )
+    response['Content-Disposition'] = 'attachment; filename="levelup.ics"'
+    return response
+
+
+def gamer_summary(gamer):
+    """The public bits of a gamer, without the nested auth user row"""
+    return {
+        'id': gamer.id,
+        'full_name': f'{gamer.user.first_name} {gamer.user.last_name}',
+    }
+
+
+class EventGameSerializer(serializers.ModelSerializer):
+    """JSON serializer for the game an event is for
     """
+    class Meta:
+        model = Game
+        fields = ('id', 'title', 'maker', 'number_of_players', 'skill_level', 'game_type')
+
+
+# The organizer and attendees are plain dictionaries built from the prefetched rows.
+# That skips building a nested serializer per gamer and keeps the user's password hash, email and permissions out of the payload.
+class EventSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """JSON serializer for events
+    """
+    game = EventGameSerializer(read_only=True)
+    organizer = serializers.SerializerMethodField()
+    attendees = serializers.SerializerMethodField()
+    # The event's own capacity, or the game's number of players when it has none
+    capacity = serializers.IntegerField(source='seats', read_only=True)
+    joined = serializers.BooleanField(read_only=True)
+
     class Meta:
         model = Event
-        fields = ('id', 'description', 'date', 'organizer', 'time', 'game', 'attendees', 'joined')
-        depth = 2
-        
-        
+        fields = ('id', 'description', 'date', 'organizer', 'time', 'game', 'attendees', 'attendee_count', 'capacity', 'joined')
+
+    def get_organizer(self, event):
+        return gamer_summary(event.organizer)
+
+    def get_attendees(self, event):
+        return [gamer_summary(gamer) for gamer in event.attendees.all()]
+
+
+class EventFilterSerializer(serializers.Serializer):
+    """The query parameters of the events list
+
+    start and end are dates in YYYY-MM-DD format and both are inclusive.
+    upcoming=true keeps the events that have not started yet.
+    min_attendees keeps the events with at least that many attendees, and
+    ordering=popular lists the events with the most attendees first.
+    """
+    game = serializers.IntegerField(required=False, min_value=1, max_value=MAX_ID)
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    upcoming = serializers.BooleanField(required=False)
+    q = serializers.CharField(required=False, allow_blank=True, trim_whitespace=False)
+    min_attendees = serializers.IntegerField(required=False, min_value=0)
+    ordering = serializers.ChoiceField(choices=('date', 'popular'), required=False)
+
+    def validate(self, attrs):
+        if 'start' in attrs and 'end' in attrs and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'end': ['The end date is before the start date.']})
+        return attrs
+
+
+class BatchAttendanceSerializer(serializers.Serializer):
+    """The body of a batch signup or leave request"""
+    events = serializers.ListField(child=serializers.IntegerField(min_value=1, max_value=MAX_ID), allow_empty=False, max_length=1000)
+    gamers = serializers.ListField(child=serializers.IntegerField(min_value=1, max_value=MAX_ID), required=False, max_length=1000)
+
+
 class CreateEventSerializer(serializers.ModelSerializer):
     class Meta:
         model = Event
-        fields = ['id', 'description', 'date', 'game', 'time']      
+        fields = ['id', 'description', 'date', 'game', 'time', 'capacity']
+
+    def validate_capacity(self, value):
+        # Setting it to the current attendance closes signups, going lower would leave the event over capacity
+        if value is not None and self.instance is not None and value < self.instance.attendee_count:
+            raise serializers.ValidationError(f'{self.instance.attendee_count} gamers already attend.')
+        return value      
         
 
 # The Meta class inside the serializer holds the configuration info to use for the serializer. It always needs to know:
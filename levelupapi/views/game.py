@@ -1,12 +1,28 @@
 """View module for handling requests about game types"""
-from django.http import HttpResponseServerError
-from django.core.exceptions import ValidationError
+from collections import Counter
+from django.db import transaction
+from django.utils import timezone
 from rest_framework.viewsets import ViewSet
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import serializers, status
 from levelupapi.models import Game
 from levelupapi.models.game_type import GameType
 from levelupapi.models.gamer import Gamer
+from levelupapi.conditional import not_modified, queryset_validators, set_validators
+from levelupapi.fieldsets import SparseFieldsMixin, narrow, requested_fields
+from levelupapi.game_type_cache import game_types
+from levelupapi.pagination import KeysetPagination
+from levelupapi.search import SEARCH_ORDERING, search
+from levelupapi.signals import games_bulk_saved
+from levelupapi.views.game_type import CachedGameTypeField
+
+# The most games one bulk request may carry, and how many rows go into each INSERT/UPDATE statement
+BULK_MAX_GAMES = 50000
+BULK_BATCH_SIZE = 500
+BULK_UPDATE_FIELDS = ['title', 'maker', 'number_of_players', 'skill_level', 'game_type', 'updated_at']
+# A game response embeds the gamer who added it, so editing the gamer changes the game's validators too
+GAME_TIMESTAMPS = ('updated_at', 'gamer__updated_at')
 
 
 class GameView(ViewSet):
@@ -18,9 +34,17 @@ class GameView(ViewSet):
             Response -- JSON serialized game type
         """
         try:
-            game = Game.objects.get(pk=pk)
-            serializer = GameSerializer(game)
-            return Response(serializer.data)
+            fields = requested_fields(request, GameSerializer)
+            # Answer clients that already have the current version before loading the game
+            etag, last_modified = queryset_validators(
+                Game.objects.filter(pk=pk), GAME_TIMESTAMPS, request.get_full_path(), game_types.etag
+            )
+            cached = not_modified(request, etag, last_modified)
+            if cached is not None:
+                return cached
+            game = game_queryset(Game.objects.filter(pk=pk), fields).get()
+            serializer = GameSerializer(game, fields=fields)
+            return set_validators(Response(serializer.data), etag, last_modified)
         except Game.DoesNotExist as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
 
@@ -30,14 +54,20 @@ class GameView(ViewSet):
         Returns:
             Response -- JSON serialized list of game types
         """
+        fields = requested_fields(request, GameSerializer)
         games = Game.objects.all()
         # What if we wanted to pass in a query string parameter?
         # The request from the method parameters holds all the information for the request from the client. The request.query_params is a dictionary of any query parameters that were in the url. Using the .get method on a dictionary is a safe way to find if a key is present on the dictionary. If the 'type' key is not present on the dictionary it will return None.
-        game_type = request.query_params.get('type', None)
-        if game_type is not None:
-            games = games.filter(game_type_id=game_type)
-        serializer = GameSerializer(games, many=True)
-        return Response(serializer.data)
+        games, ranked, ordering = filter_games(games, request)
+        # The validators cover every game the filters match, and the path covers the page being asked for
+        etag, last_modified = queryset_validators(games, GAME_TIMESTAMPS, request.get_full_path(), game_types.etag, collection=True)
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+        paginator = KeysetPagination(ordering=ordering)
+        page = paginator.paginate_queryset(game_queryset(ranked, fields, ordering), request)
+        serializer = GameSerializer(page, many=True, fields=fields)
+        return set_validators(paginator.get_paginated_response(serializer.data), etag, last_modified)
     
     '''
     def create(self, request):
@@ -67,6 +97,7 @@ class GameView(ViewSet):
         # from levelupapi_gamer
         # where user = ?
         # """, (user,))
+    # CachedTokenAuthentication (levelupapi/authentication.py) now does that lookup once per token and hands the gamer to every view as request.gamer.
     
     def create(self, request):
         """Handle POST operations
@@ -74,7 +105,7 @@ class GameView(ViewSet):
         Returns:
             Response -- JSON serialized game instance
         """
-        gamer = Gamer.objects.get(user=request.auth.user)
+        gamer = request.gamer
         serializer = CreateGameSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save(gamer=gamer)
@@ -106,17 +137,151 @@ class GameView(ViewSet):
         game = Game.objects.get(pk=pk)
         game.delete()
         return Response(None, status=status.HTTP_204_NO_CONTENT)
-                
+
+
+    # Catalog imports send thousands of games at once to http://localhost:8000/games/bulk instead of one POST per game.
+    # Items with an id update that game, items without one create a new game for the current gamer. An id may appear once per request.
+    # Everything is validated first and nothing is written unless every item is valid, then the rows go in with bulk_create/bulk_update in one transaction.
+
+    @action(methods=['post'], detail=False)
+    def bulk(self, request):
+        """Handle POST requests to create or update many games at once
+        Returns:
+            Response -- The ids of the written games, or the errors of each item with a 400 status code
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({'message': 'Expected a non-empty list of games'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > BULK_MAX_GAMES:
+            return Response(
+                {'message': f'At most {BULK_MAX_GAMES} games can be sent at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        valid, existing, errors = validate_bulk_games(items)
+        if any(errors):
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        created, updated, games = build_bulk_games(valid, existing, request.gamer)
+        with transaction.atomic():
+            Game.objects.bulk_create(created, batch_size=BULK_BATCH_SIZE)
+            Game.objects.bulk_update(updated, BULK_UPDATE_FIELDS, batch_size=BULK_BATCH_SIZE)
+            games_bulk_saved.send(sender=Game, ids=[game.id for game in games])
+
+        return Response({
+            'created': len(created),
+            'updated': len(updated),
+            'ids': [game.id for game in games],
+        }, status=status.HTTP_201_CREATED)
+
+
+def validate_bulk_games(items):
+    """Check every item of a bulk request
+
+    Returns:
+        tuple -- the validated data of each item (None for the invalid ones),
+        the games being updated by id, and the errors of each item ({} when it is valid)
+    """
+    errors = []
+    valid = []
+    for item in items:
+        serializer = BulkGameSerializer(data=item)
+        if serializer.is_valid():
+            valid.append(serializer.validated_data)
+            errors.append({})
+        else:
+            valid.append(None)
+            errors.append(serializer.errors)
+
+    # One query each for the game types and the games being updated, instead of one per item
+    type_ids = {data['game_type_id'] for data in valid if data is not None}
+    known_types = set(GameType.objects.filter(id__in=type_ids).values_list('id', flat=True))
+    update_ids = Counter(data['id'] for data in valid if data is not None and 'id' in data)
+    existing = Game.objects.in_bulk(update_ids)
+
+    for index, data in enumerate(valid):
+        if data is None:
+            continue
+        if data['game_type_id'] not in known_types:
+            errors[index]['game_type'] = [f'Invalid pk "{data["game_type_id"]}" - object does not exist.']
+        if 'id' in data and data['id'] not in existing:
+            errors[index]['id'] = [f'Invalid pk "{data["id"]}" - object does not exist.']
+        elif 'id' in data and update_ids[data['id']] > 1:
+            errors[index]['id'] = [f'Duplicate pk "{data["id"]}" - a game can only be sent once per request.']
+    return valid, existing, errors
+
+
+def build_bulk_games(valid, existing, gamer):
+    """The new games to insert, the changed games to update, and all of them in the order of the items"""
+    now = timezone.now()
+    created = []
+    updated = []
+    games = []
+    for data in valid:
+        if 'id' in data:
+            game = existing[data['id']]
+            for field, value in data.items():
+                setattr(game, field, value)
+            # bulk_update does not run auto_now
+            game.updated_at = now
+            updated.append(game)
+        else:
+            game = Game(gamer=gamer, **data)
+            created.append(game)
+        games.append(game)
+    return created, updated, games
+
+
+def filter_games(games, request):
+    """Apply the ?type= and ?q= filters of the games list
+
+    Returns:
+        tuple -- the filtered queryset for the validators, the same rows to
+        page through, and the ordering to page them by. Searches
+        are ordered by relevance (see levelupapi/search.py), everything else by id.
+    """
+    game_type = request.query_params.get('type', None)
+    if game_type is not None:
+        games = games.filter(game_type_id=game_type)
+    text = request.query_params.get('q', None)
+    if text is not None:
+        matching, ranked = search(games, text)
+        return matching, ranked, SEARCH_ORDERING
+    return games, games, ('id',)
+
+
+def game_queryset(games, fields=None, ordering=()):
+    """Games with what GameSerializer renders for `fields` loaded up front
+
+    The gamer comes from one joined query instead of one query per game, and is
+    left out when ?fields= does not ask for it. With `fields` only their columns
+    and the `ordering` columns the page is cut by are loaded.
+    """
+    if fields is None or 'gamer' in fields:
+        games = games.select_related('gamer')
+    return narrow(games, fields, ordering)
+
+
+class GameGamerSerializer(serializers.ModelSerializer):
+    """JSON serializer for the gamer who added a game, with only their public fields
+    """
+    class Meta:
+        model = Gamer
+        fields = ('id', 'bio', 'user')
 
 
 # Right now the GET methods do not include any nested data, only the foreign key. Embedding that data is only 1 line of code! Take a look at the response for getting all the games. Notice that game_type is just the id of the type. Back in the GameSerializer add this to the end of Meta class tabbed to the same level as the fields property
-class GameSerializer(serializers.ModelSerializer):
+class GameSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """JSON serializer for game types
     """
+    # depth = 1 would fetch the game type row for every game, they come from the game type cache instead
+    game_type = CachedGameTypeField()
+    # depth = 1 would render every column of the gamer, their secret calendar feed token included
+    gamer = GameGamerSerializer(read_only=True)
+
     class Meta:
         model = Game
         fields = ('id', 'title', 'maker', 'gamer', 'number_of_players', 'skill_level', 'game_type')
-        depth = 1
         
         
         
@@ -125,4 +290,15 @@ class GameSerializer(serializers.ModelSerializer):
 class CreateGameSerializer(serializers.ModelSerializer):
     class Meta:
         model = Game
-        fields = ['id', 'title', 'maker', 'number_of_players', 'skill_level', 'game_type']        
\ No newline at end of file
+        fields = ['id', 'title', 'maker', 'number_of_players', 'skill_level', 'game_type']
+
+
+# Validates one item of a bulk request without touching the database.
+# game_type is read as a plain id so the view can check all of them with one query.
+class BulkGameSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+    game_type = serializers.IntegerField(source='game_type_id')
+
+    class Meta:
+        model = Game
+        fields = ['id', 'title', 'maker', 'number_of_players', 'skill_level', 'game_type']
@@ -4,6 +4,8 @@ from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework import serializers, status
 from levelupapi.models import GameType
+from levelupapi.conditional import not_modified, set_validators
+from levelupapi.game_type_cache import game_types
 
 
 class GameTypeView(ViewSet):
@@ -24,12 +26,15 @@ class GameTypeView(ViewSet):
             Response -- JSON serialized game type
         """
         #After getting the game_type, it is passed to the serializer. Lastly, the serializer.data is passed to the Response as the response body. Using Response combines what we were doing with the _set_headers and wfile.write functions.
-        try:
-            game_type = GameType.objects.get(pk=pk)
-            serializer = GameTypeSerializer(game_type)
-            return Response(serializer.data)
-        except GameType.DoesNotExist as ex:
-            return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
+        # Game types come from the in-process cache, and clients holding the current ETag get a 304 without a body.
+        cached = not_modified(request, etag=game_types.etag)
+        if cached is not None:
+            return cached
+        game_type = game_types.get(pk)
+        if game_type is None:
+            return Response({'message': 'GameType matching query does not exist.'}, status=status.HTTP_404_NOT_FOUND)
+        serializer = GameTypeSerializer(game_type)
+        return set_validators(Response(serializer.data), etag=game_types.etag)
 
 #The list method is responsible for getting the whole collection of objects from the database. The ORM method for this one is all. Here’s the code to add to the method:
     def list(self, request):
@@ -40,10 +45,13 @@ class GameTypeView(ViewSet):
         #When using the allmethod this is the sql that runs:
         # select *
         # from levelupapi_gametype
-        game_types = GameType.objects.all()
+        # They are served from the in-process cache instead, see levelupapi/game_type_cache.py
+        cached = not_modified(request, etag=game_types.etag)
+        if cached is not None:
+            return cached
         # adding many=True to let the serializer know that a list vs. a single object is to be serialized.
-        serializer = GameTypeSerializer(game_types, many=True)
-        return Response(serializer.data)
+        serializer = GameTypeSerializer(game_types.all(), many=True)
+        return set_validators(Response(serializer.data), etag=game_types.etag)
 
 
 # The serializer class determines how the Python data should be serialized to be sent back to the client. Put the following code at the bottom of the same module as above. Make sure it is outside of the view class.
@@ -54,4 +62,22 @@ class GameTypeSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = GameType
-        fields = ('id', 'label')
\ No newline at end of file
+        fields = ('id', 'label')
+
+
+class CachedGameTypeField(serializers.Field):
+    """Renders a game's type from the in-process cache instead of fetching the row
+
+    Async views pass the table they already loaded as the `game_types` context entry.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = 'game_type_id'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        table = self.context.get('game_types')
+        if table is not None:
+            return table.get(value)
+        return game_types.get(value)
\ No newline at end of file
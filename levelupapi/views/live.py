@@ -0,0 +1,93 @@
+"""View module for streaming event changes to clients as Server-Sent Events"""
+import asyncio
+import json
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework import exceptions, status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from levelupapi import pubsub
+from levelupapi.authentication import TicketAuthentication, make_ticket
+from levelupapi.views.async_reads import authentication, read_view
+
+
+# Instead of polling GET /events, a client opens http://localhost:8000/events/live and hears about every change as it happens.
+# ?events=1,2,3 narrows the stream to those events, without it the client hears about all of them, new ones included.
+# Every message is one Server-Sent Event: its id, its type as the event name, and the message as JSON (see levelupapi/pubsub.py).
+# EventSource reconnects by itself and sends the id of the last message it got as Last-Event-ID, so nothing is lost in between.
+# EventSource cannot send the token either, so a browser first POSTs to /events/live/ticket with it and opens /events/live?ticket=<ticket>.
+# The ticket is short lived (see levelupapi/authentication.py): when the stream stops for good, the client gets a new ticket and
+# opens /events/live?ticket=<new ticket>&last_event_id=<id of the last message it got>, which resumes like Last-Event-ID does.
+# Clients that can set headers, like fetch based SSE clients, send the token as usual and need no ticket.
+# An idle stream gets a comment every LIVE_HEARTBEAT_SECONDS, so proxies do not close it and a client that has gone away is noticed.
+# The stream holds a connection for as long as the client stays, which only the event loop under ASGI can afford, so WSGI answers 501.
+
+# Milliseconds EventSource waits before it reconnects
+RETRY_MS = 3000
+
+
+async def stream_events(request):
+    events = subscribed_events(request)
+    last_id = request.headers.get('Last-Event-ID', request.query_params.get('last_event_id'))
+    try:
+        last_id = int(last_id) if last_id is not None else None
+    except ValueError:
+        last_id = None
+    subscription = pubsub.broker().subscribe(last_id)
+    response = StreamingHttpResponse(event_stream(subscription, events), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stops nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def subscribed_events(request):
+    """The event ids of ?events=, or None for every event"""
+    value = request.query_params.get('events')
+    if not value:
+        return None
+    try:
+        return {int(pk) for pk in value.split(',')}
+    except ValueError as ex:
+        raise exceptions.ValidationError({'events': ['A comma separated list of event ids is required.']}) from ex
+
+
+async def event_stream(subscription, events):
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.get(), settings.LIVE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            if message is None:
+                return
+            if events is None or message.get('event', None) is None or message['event'] in events:
+                yield server_sent_event(message)
+    finally:
+        subscription.close()
+
+
+def server_sent_event(message):
+    data = json.dumps(message, separators=(',', ':'))
+    return f'id: {message["id"]}\nevent: {message["type"]}\ndata: {data}\n\n'
+
+
+@api_view(['GET'])
+def live_unavailable(request):
+    """Handle GET requests for the live stream when the server is not running under ASGI"""
+    return Response({'message': 'The live stream needs the ASGI server, see levelup/asgi.py'},
+                    status=status.HTTP_501_NOT_IMPLEMENTED)
+
+
+@api_view(['POST'])
+def live_ticket(request):
+    """Handle POST requests for a ticket that opens the live stream without a token
+    Returns:
+        Response -- JSON with the ticket and the seconds it is accepted for
+    """
+    return Response({'ticket': make_ticket(request.auth), 'expires_in': settings.LIVE_TICKET_SECONDS})
+
+
+event_live = read_view(stream_events, live_unavailable, authenticators=(authentication, TicketAuthentication()))
@@ -0,0 +1,76 @@
+"""View module for handling requests for what changed since a client last synced"""
+from rest_framework import serializers
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from levelupapi import changelog
+from levelupapi.models import Change, Event, EventGamer, Game
+from levelupapi.views.event import MAX_ID, EventSerializer, event_queryset
+from levelupapi.views.game import GameSerializer, game_queryset
+
+
+# Offline clients used to download all of /games and /events every time they started.
+# GET http://localhost:8000/sync?since=<cursor> answers with what changed after the cursor instead: the current version of every game, event and membership
+# that was created or changed, and the ids of the ones that were deleted. Games and events are rendered like their list endpoints render them.
+# A first sync passes since=0. Every response has the `cursor` to pass next time, and `more` when changes are left after it, which the client asks for right away.
+# A response covers at most ?limit= changes, SYNC_BATCH_SIZE by default, so even the first sync of a large database comes in pieces of a bounded size.
+# The changes come from the change log, see levelupapi/models/change.py. An object that changed twice since the cursor is sent once.
+# When the cursor is older than the deletions the log still remembers (see levelupapi/changelog.py), the response has `reset` and starts from the beginning:
+# the client drops what it has before it applies it.
+
+# How many changes one response covers, by default and at most
+SYNC_BATCH_SIZE = 500
+MAX_SYNC_BATCH_SIZE = 2000
+
+
+@api_view(['GET'])
+def sync(request):
+    """Handle GET requests for the changes after a cursor
+    Returns:
+        Response -- JSON with the upserts and deletions of games, events and attendance
+    """
+    params = SyncSerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    since = params.validated_data['since']
+    reset = 0 < since < changelog.horizon()
+    if reset:
+        since = 0
+    changes, more = changelog.changes_since(since, params.validated_data['limit'])
+
+    changed = {model: [] for model, _ in Change.MODELS}
+    for _, model, object_id in changes:
+        changed[model].append(object_id)
+    games = game_queryset(Game.objects.filter(pk__in=changed[Change.GAME])).order_by('id')
+    events = event_queryset(request.gamer, Event.objects.filter(pk__in=changed[Change.EVENT])).order_by('id')
+    attendance = EventGamer.objects.filter(pk__in=changed[Change.ATTENDANCE]).order_by('id')
+
+    return Response({
+        'cursor': changes[-1][0] if changes else since,
+        'more': more,
+        'reset': reset,
+        'games': upserts_and_deletions(GameSerializer(games, many=True).data, changed[Change.GAME]),
+        'events': upserts_and_deletions(EventSerializer(events, many=True).data, changed[Change.EVENT]),
+        'attendance': upserts_and_deletions(AttendanceSerializer(attendance, many=True).data, changed[Change.ATTENDANCE]),
+    })
+
+
+def upserts_and_deletions(rows, changed_ids):
+    """The rows that exist, and the changed ids that have no row because the object is gone"""
+    found = {row['id'] for row in rows}
+    return {
+        'upserts': rows,
+        'deleted': sorted(set(changed_ids) - found),
+    }
+
+
+class SyncSerializer(serializers.Serializer):
+    """The query parameters of GET /sync"""
+    # A cursor is a change id, so it fits the same range as any other id
+    since = serializers.IntegerField(required=False, min_value=0, max_value=MAX_ID, default=0)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=MAX_SYNC_BATCH_SIZE, default=SYNC_BATCH_SIZE)
+
+
+class AttendanceSerializer(serializers.ModelSerializer):
+    """JSON serializer for a gamer attending an event"""
+    class Meta:
+        model = EventGamer
+        fields = ('id', 'event', 'gamer')
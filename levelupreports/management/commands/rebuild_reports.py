@@ -0,0 +1,28 @@
+"""Management command to rebuild the materialized report tables"""
+from django.core.management.base import BaseCommand, CommandError
+
+from levelupreports import materialize
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized report tables from scratch, or check them for drift with --check'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only compare the report tables with the source tables, and fail if they differ',
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            materialize.rebuild()
+            self.stdout.write('Rebuilt the report tables')
+
+        drifted = False
+        for report, (missing, stale) in materialize.drift().items():
+            self.stdout.write(f'{report}: {missing} missing, {stale} stale')
+            drifted = drifted or missing or stale
+
+        if drifted:
+            raise CommandError('The report tables have drifted from the source tables')
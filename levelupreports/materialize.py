@@ -0,0 +1,115 @@
+"""Keep the materialized report tables in step with the levelupapi tables"""
+from django.db import connection, transaction
+
+
+# Each report table is filled from the same join the report used to run on every request.
+# `{where}` narrows the join to the rows being refreshed, or is left empty to rebuild everything.
+GAME_ROWS_SQL = """
+    SELECT
+        g.id,
+        g.gamer_id,
+        u.first_name || ' ' || u.last_name AS full_name,
+        g.title,
+        g.maker,
+        g.skill_level,
+        g.number_of_players,
+        g.game_type_id
+    FROM levelupapi_game g
+    JOIN levelupapi_gamer gr
+        ON gr.id = g.gamer_id
+    JOIN auth_user u
+        ON u.id = gr.user_id
+    {where}
+"""
+
+EVENT_ROWS_SQL = """
+    SELECT
+        e.id,
+        e.organizer_id,
+        u.first_name || ' ' || u.last_name AS full_name,
+        e.game_id,
+        g.title,
+        e.description,
+        e.date,
+        e.time
+    FROM levelupapi_event e
+    JOIN levelupapi_gamer gr
+        ON gr.id = e.organizer_id
+    JOIN auth_user u
+        ON u.id = gr.user_id
+    JOIN levelupapi_game g
+        ON g.id = e.game_id
+    {where}
+"""
+
+GAME_COLUMNS = 'id, gamer_id, full_name, title, maker, skill_level, number_of_players, game_type_id'
+EVENT_COLUMNS = 'id, organizer_id, full_name, game_id, title, description, date, time'
+
+# table, columns and source query for each report
+REPORTS = {
+    'games': ('levelupreports_usergamerow', GAME_COLUMNS, GAME_ROWS_SQL),
+    'events': ('levelupreports_usereventrow', EVENT_COLUMNS, EVENT_ROWS_SQL),
+}
+
+# Keeps IN (...) lists under SQLite's limit on query parameters when bulk writes refresh many rows
+CHUNK_SIZE = 500
+
+
+def chunks(ids):
+    """Split a list of ids into lists of at most CHUNK_SIZE"""
+    return [ids[start:start + CHUNK_SIZE] for start in range(0, len(ids), CHUNK_SIZE)]
+
+
+def refresh_rows(report, column, ids):
+    """Re-copy the report rows whose `column` is in `ids` from the source tables
+
+    `column` is a column name shared by the report table and its source query,
+    e.g. refresh_rows('games', 'gamer_id', [1]) refreshes every game of gamer 1.
+    Rows whose source row no longer exists are removed.
+    """
+    ids = list(ids)
+    table, columns, source_sql = REPORTS[report]
+    # Every column we refresh by has the same name on the first table of the source query
+    alias = 'g' if report == 'games' else 'e'
+    with transaction.atomic(), connection.cursor() as db_cursor:
+        for chunk in chunks(ids):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            where = f'WHERE {alias}.{column} IN ({placeholders})'
+            db_cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({placeholders})', chunk)
+            db_cursor.execute(f'INSERT INTO {table} ({columns}) {source_sql.format(where=where)}', chunk)
+
+
+def delete_rows(report, ids):
+    """Remove the report rows for the given game or event ids"""
+    table = REPORTS[report][0]
+    with connection.cursor() as db_cursor:
+        for chunk in chunks(list(ids)):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            db_cursor.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', chunk)
+
+
+def rebuild():
+    """Throw away the report tables and fill them again from the source tables"""
+    with transaction.atomic(), connection.cursor() as db_cursor:
+        for table, columns, source_sql in REPORTS.values():
+            db_cursor.execute(f'DELETE FROM {table}')
+            db_cursor.execute(f'INSERT INTO {table} ({columns}) {source_sql.format(where="")}')
+
+
+def drift():
+    """Count the rows that differ between each report table and its source
+
+    Returns a dictionary of report name to (missing, stale) counts. Missing rows
+    are in the source query but not in the report table, stale rows are in the
+    report table but no longer match the source.
+    """
+    counts = {}
+    with connection.cursor() as db_cursor:
+        for report, (table, columns, source_sql) in REPORTS.items():
+            source = source_sql.format(where='')
+            db_cursor.execute(f'SELECT COUNT(*) FROM ({source} EXCEPT SELECT {columns} FROM {table})')
+            missing = db_cursor.fetchone()[0]
+            db_cursor.execute(f'SELECT COUNT(*) FROM (SELECT {columns} FROM {table} EXCEPT {source})')
+            stale = db_cursor.fetchone()[0]
+            counts[report] = (missing, stale)
+    return counts
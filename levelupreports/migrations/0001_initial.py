@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('levelupapi', '0004_event_attendees'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserEventRow',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('organizer_id', models.BigIntegerField()),
+                ('full_name', models.CharField(max_length=301)),
+                ('game_id', models.BigIntegerField(db_index=True)),
+                ('title', models.CharField(max_length=55)),
+                ('description', models.TextField()),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['organizer_id', 'id'], name='usereventrow_organizer_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserGameRow',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('gamer_id', models.BigIntegerField()),
+                ('full_name', models.CharField(max_length=301)),
+                ('title', models.CharField(max_length=55)),
+                ('maker', models.CharField(max_length=55)),
+                ('skill_level', models.IntegerField()),
+                ('number_of_players', models.IntegerField()),
+                ('game_type_id', models.BigIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['gamer_id', 'id'], name='usergamerow_gamer_idx')],
+            },
+        ),
+        # Fill the new tables from the rows that already exist
+        migrations.RunSQL(
+            sql=[
+                """
+                INSERT INTO levelupreports_usergamerow
+                    (id, gamer_id, full_name, title, maker, skill_level, number_of_players, game_type_id)
+                SELECT g.id, g.gamer_id, u.first_name || ' ' || u.last_name,
+                    g.title, g.maker, g.skill_level, g.number_of_players, g.game_type_id
+                FROM levelupapi_game g
+                JOIN levelupapi_gamer gr ON gr.id = g.gamer_id
+                JOIN auth_user u ON u.id = gr.user_id
+                """,
+                """
+                INSERT INTO levelupreports_usereventrow
+                    (id, organizer_id, full_name, game_id, title, description, date, time)
+                SELECT e.id, e.organizer_id, u.first_name || ' ' || u.last_name,
+                    e.game_id, g.title, e.description, e.date, e.time
+                FROM levelupapi_event e
+                JOIN levelupapi_gamer gr ON gr.id = e.organizer_id
+                JOIN auth_user u ON u.id = gr.user_id
+                JOIN levelupapi_game g ON g.id = e.game_id
+                """,
+            ],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import models
+
+
+# The reports used to join games and events to gamers and users on every request.
+# These tables hold the already joined rows, one per game or event, and are kept in step with the levelupapi tables by the receivers in levelupreports/signals.py.
+# The column names match the rows the old queries returned, so the report views read them exactly like before.
+# Run `python3 manage.py rebuild_reports` to rebuild them from scratch, or `python3 manage.py rebuild_reports --check` to look for drift.
+
+class UserGameRow(models.Model):
+    """One row of the games by user report, keyed by the game id"""
+    id = models.BigIntegerField(primary_key=True)
+    gamer_id = models.BigIntegerField()
+    full_name = models.CharField(max_length=301)
+    title = models.CharField(max_length=55)
+    maker = models.CharField(max_length=55)
+    skill_level = models.IntegerField()
+    number_of_players = models.IntegerField()
+    game_type_id = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['gamer_id', 'id'], name='usergamerow_gamer_idx'),
+        ]
+
+
+class UserEventRow(models.Model):
+    """One row of the events by user report, keyed by the event id"""
+    id = models.BigIntegerField(primary_key=True)
+    organizer_id = models.BigIntegerField()
+    full_name = models.CharField(max_length=301)
+    game_id = models.BigIntegerField(db_index=True)
+    title = models.CharField(max_length=55)
+    description = models.TextField()
+    date = models.DateField()
+    time = models.TimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organizer_id', 'id'], name='usereventrow_organizer_idx'),
+        ]
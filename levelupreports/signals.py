@@ -0,0 +1,64 @@
+"""Receivers that keep the materialized report tables up to date"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from levelupapi.models import Event, Game, Gamer
+from levelupapi.signals import events_bulk_saved, games_bulk_saved
+from levelupreports import materialize
+
+
+@receiver(post_save, sender=Game)
+def game_saved(sender, instance, **kwargs):
+    materialize.refresh_rows('games', 'id', [instance.id])
+    # Events show the title of their game
+    materialize.refresh_rows('events', 'game_id', [instance.id])
+
+
+@receiver(post_delete, sender=Game)
+def game_deleted(sender, instance, **kwargs):
+    materialize.delete_rows('games', [instance.id])
+
+
+@receiver(games_bulk_saved)
+def games_bulk_written(sender, ids, **kwargs):
+    materialize.refresh_rows('games', 'id', ids)
+    materialize.refresh_rows('events', 'game_id', ids)
+
+
+@receiver(post_save, sender=Event)
+def event_saved(sender, instance, **kwargs):
+    materialize.refresh_rows('events', 'id', [instance.id])
+
+
+@receiver(events_bulk_saved)
+def events_bulk_written(sender, ids, **kwargs):
+    materialize.refresh_rows('events', 'id', ids)
+
+
+@receiver(post_delete, sender=Event)
+def event_deleted(sender, instance, **kwargs):
+    materialize.delete_rows('events', [instance.id])
+
+
+@receiver(post_save, sender=Gamer)
+def gamer_saved(sender, instance, created, **kwargs):
+    if not created:
+        refresh_gamer(instance.id)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Copy a changed first or last name onto every report row of the user's gamer"""
+    if created:
+        return
+    if update_fields is not None and not {'first_name', 'last_name'} & set(update_fields):
+        return
+    gamer = Gamer.objects.filter(user=instance).first()
+    if gamer is not None:
+        refresh_gamer(gamer.id)
+
+
+def refresh_gamer(gamer_id):
+    materialize.refresh_rows('games', 'gamer_id', [gamer_id])
+    materialize.refresh_rows('events', 'organizer_id', [gamer_id])
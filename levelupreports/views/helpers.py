@@ -1,3 +1,21 @@
+"""Helpers shared by the report views"""
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.http import StreamingHttpResponse
+from levelupapi.routers import read_database
+
+# How many rows to pull from the database cursor at a time when streaming a report
+STREAM_CHUNK_SIZE = 2000
+
+# The export formats a report can be streamed in, and their content types
+STREAM_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
 def dict_fetch_all(cursor):
     """Return all rows from a cursor as a list of dictionaries"""
     columns = [col[0] for col in cursor.description]
@@ -5,3 +23,99 @@ def dict_fetch_all(cursor):
         dict(zip(columns, row))
         for row in cursor.fetchall()
     ]
+
+
+def group_rows(rows, key, build_group, build_item, items_key):
+    """Group flat report rows into one dictionary per `key` value in a single pass
+
+    The groups are indexed by key, so each row is placed in O(1) instead of
+    rescanning the groups built so far. Groups keep the order in which their
+    key first appears in `rows`.
+
+    Arguments:
+    rows -- Iterable of row dictionaries
+    key -- Name of the column to group on
+    build_group -- Function that builds the group dictionary from its first row
+    build_item -- Function that builds one list entry from a row
+    items_key -- Key of the list each group collects its entries in
+    """
+    groups = {}
+    for row in rows:
+        group = groups.get(row[key])
+        if group is None:
+            group = build_group(row)
+            group[items_key] = []
+            groups[row[key]] = group
+        group[items_key].append(build_item(row))
+    return list(groups.values())
+
+
+def dict_fetch_iter(cursor, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the rows from a cursor as dictionaries, `chunk_size` rows at a time
+
+    Unlike dict_fetch_all, only one chunk of rows is held in memory at once.
+    """
+    columns = [col[0] for col in cursor.description]
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        for row in rows:
+            yield dict(zip(columns, row))
+
+
+class Echo:
+    """A file-like object whose write returns the value instead of storing it
+
+    Lets csv.writer produce one line at a time for a streaming response.
+    """
+    def write(self, value):
+        return value
+
+
+def stream_report(sql, build_row, export_format, filename):
+    """Stream the rows of a report query to the client as CSV or NDJSON
+
+    The query runs when the client starts reading the response, and rows are
+    read from the cursor in chunks, so memory use stays flat however large the
+    report is.
+
+    Arguments:
+    sql -- The report query
+    build_row -- Function that turns a row dictionary into the exported dictionary
+    export_format -- 'csv' or 'ndjson'
+    filename -- Name the client should save the file as, without extension
+    """
+    # Chosen now, the rows are read after the response has left the middleware that allows the replica
+    alias = read_database()
+
+    def rows():
+        with connections[alias].cursor() as db_cursor:
+            db_cursor.execute(sql)
+            for row in dict_fetch_iter(db_cursor):
+                yield build_row(row)
+
+    if export_format == 'csv':
+        content = csv_lines(rows())
+    else:
+        content = ndjson_lines(rows())
+
+    response = StreamingHttpResponse(content, content_type=STREAM_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
+
+
+def csv_lines(rows):
+    """Yield a header line and then one CSV line per row dictionary"""
+    writer = None
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(Echo(), fieldnames=list(row))
+            yield writer.writeheader()
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows):
+    """Yield one JSON document per line for each row dictionary"""
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
@@ -1,64 +1,60 @@
 """Module for generating events by user report"""
 from django.shortcuts import render
-from django.db import connection
+from django.db import connections
 from django.views import View
 
-from levelupreports.views.helpers import dict_fetch_all
+from levelupapi.routers import read_database
+from levelupreports.views.helpers import STREAM_FORMATS, dict_fetch_all, group_rows, stream_report
+
+
+# All events along with the gamer first name, last name, and id, read from the precomputed report table (see levelupreports/models.py)
+USER_EVENTS_SQL = """
+    SELECT *
+    FROM levelupreports_usereventrow
+    ORDER BY organizer_id, id
+"""
+
+
+def build_event(row):
+    """Build the event entry of a report row"""
+    return {
+        "id": row['id'],
+        "date": row['date'],
+        "time": row['time'],
+        "game_name": row['title'],
+        "description": row['description']
+    }
+
+
+def build_user(row):
+    """Build the gamer group of a report row"""
+    return {
+        "gamer_id": row['organizer_id'],
+        "full_name": row['full_name'],
+    }
+
+
+def build_export_row(row):
+    """Build one flat row of the exported report"""
+    return {**build_user(row), **build_event(row)}
 
 
 class UserEventList(View):
     def get(self, request):
-        with connection.cursor() as db_cursor:
+        # ?format=csv or ?format=ndjson streams the flat rows instead of rendering the HTML report
+        export_format = request.GET.get('format')
+        if export_format in STREAM_FORMATS:
+            return stream_report(USER_EVENTS_SQL, build_export_row, export_format, 'user_events')
 
-            # TODO: Write a query to get all events along with the gamer first name, last name, and id
-            db_cursor.execute("""
-                SELECT
-                    e.*,
-                    g.title,
-                    u.first_name || " " || u.last_name AS full_name
-                FROM levelupapi_event e
-                JOIN levelupapi_gamer gr
-                    ON gr.id = e.organizer_id
-                JOIN auth_user u
-                    ON u.id = gr.id
-                JOIN levelupapi_game g
-                    ON g.id = e.game_id
-            """)
+        # Reads the replica when the request may, see levelupapi/routers.py
+        with connections[read_database()].cursor() as db_cursor:
+            db_cursor.execute(USER_EVENTS_SQL)
             # Pass the db_cursor to the dict_fetch_all function to turn the fetch_all() response into a dictionary
             dataset = dict_fetch_all(db_cursor)
 
-            events_by_user = []
+            # Group the rows by gamer in one pass over the dataset
+            events_by_user = group_rows(dataset, 'organizer_id', build_user, build_event, 'events')
 
-            for row in dataset:
-                # TODO: Create a dictionary called game that includes 
-                # the name, description, number_of_players, maker,
-                # game_type_id, and skill_level from the row dictionary
-                event = {
-                    "id": row['id'],
-                    "date": row['date'],
-                    "time": row['time'],
-                    "game_name": row['title'],
-                    "description": row['description']
-                }
-                
-                # See if the gamer has been added to the events_by_user list already
-                user_dict = None
-                for user_event in events_by_user:
-                     if user_event['gamer_id'] == row['organizer_id']:
-                         user_dict = user_event
-                
-                
-                if user_dict:
-                    # If the user_dict is already in the events_by_user list, append the game to the events list
-                    user_dict['events'].append(event)
-                else:
-                    # If the user is not on the events_by_user list, create and add the user to the list
-                    events_by_user.append({
-                        "gamer_id": row['organizer_id'],
-                        "full_name": row['full_name'],
-                        "events": [event]
-                    })
-        
         # The template string must match the file name of the html template
         template = 'users/list_with_events.html'
         
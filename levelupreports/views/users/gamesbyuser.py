@@ -1,26 +1,55 @@
 """Module for generating games by user report"""
 from django.shortcuts import render
-from django.db import connection
+from django.db import connections
 from django.views import View
 
-from levelupreports.views.helpers import dict_fetch_all
+from levelupapi.routers import read_database
+from levelupreports.views.helpers import STREAM_FORMATS, dict_fetch_all, group_rows, stream_report
+
+
+# All games along with the gamer first name, last name, and id, read from the precomputed report table (see levelupreports/models.py)
+USER_GAMES_SQL = """
+    SELECT *
+    FROM levelupreports_usergamerow
+    ORDER BY gamer_id, id
+"""
+
+
+def build_game(row):
+    """Build the game entry of a report row"""
+    return {
+        "id": row['id'],
+        "title": row['title'],
+        "maker": row['maker'],
+        "skill_level": row['skill_level'],
+        "number_of_players": row['number_of_players'],
+        "game_type_id": row['game_type_id'],
+    }
+
+
+def build_user(row):
+    """Build the gamer group of a report row"""
+    return {
+        "gamer_id": row['gamer_id'],
+        "full_name": row['full_name'],
+    }
+
+
+def build_export_row(row):
+    """Build one flat row of the exported report"""
+    return {**build_user(row), **build_game(row)}
 
 
 class UserGameList(View):
     def get(self, request):
-        with connection.cursor() as db_cursor:
-
-            # TODO: Write a query to get all games along with the gamer first name, last name, and id
-            db_cursor.execute("""
-                SELECT
-                    g.*,
-                    u.first_name || " " || u.last_name AS full_name
-                FROM levelupapi_game g
-                JOIN levelupapi_gamer gr
-                    ON gr.id = g.gamer_id
-                JOIN auth_user u
-                    ON u.id = gr.id
-            """)
+        # ?format=csv or ?format=ndjson streams the flat rows instead of rendering the HTML report
+        export_format = request.GET.get('format')
+        if export_format in STREAM_FORMATS:
+            return stream_report(USER_GAMES_SQL, build_export_row, export_format, 'user_games')
+
+        # Reads the replica when the request may, see levelupapi/routers.py
+        with connections[read_database()].cursor() as db_cursor:
+            db_cursor.execute(USER_GAMES_SQL)
             # Pass the db_cursor to the dict_fetch_all function to turn the fetch_all() response into a dictionary
             dataset = dict_fetch_all(db_cursor)
 
@@ -53,39 +82,9 @@ class UserGameList(View):
             #   },
             # ]
 
-            games_by_user = []
-
-            for row in dataset:
-                # TODO: Create a dictionary called game that includes 
-                # the name, description, number_of_players, maker,
-                # game_type_id, and skill_level from the row dictionary
-                game = {
-                    "id": row['id'],
-                    "title": row['title'],
-                    "maker": row['maker'],
-                    "skill_level": row['skill_level'],
-                    "number_of_players": row['number_of_players'],
-                    "game_type_id": row['game_type_id'],
-                }
-                
-                # See if the gamer has been added to the games_by_user list already
-                user_dict = None
-                for user_game in games_by_user:
-                     if user_game['gamer_id'] == row['gamer_id']:
-                         user_dict = user_game
-                
-                
-                if user_dict:
-                    # If the user_dict is already in the games_by_user list, append the game to the games list
-                    user_dict['games'].append(game)
-                else:
-                    # If the user is not on the games_by_user list, create and add the user to the list
-                    games_by_user.append({
-                        "gamer_id": row['gamer_id'],
-                        "full_name": row['full_name'],
-                        "games": [game]
-                    })
-        
+            # Group the rows by gamer in one pass over the dataset
+            games_by_user = group_rows(dataset, 'gamer_id', build_user, build_game, 'games')
+
         # The template string must match the file name of the html template
         template = 'users/list_with_games.html'
         
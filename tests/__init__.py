@@ -1 +1,18 @@
-from .test_game_view import GameTests
\ No newline at end of file
+from .test_game_view import GameTests
+from .test_event_view import EventTests
+from .test_reports import ReportTests
+from .test_game_type_view import GameTypeTests
+from .test_authentication import AuthenticationTests
+from .test_query_plans import QueryPlanTests
+from .test_generate_data import GenerateDataTests
+from .test_middleware import QueryCountMiddlewareTests
+from .test_async_views import AsyncViewTests
+from .test_routers import ReplicaRouterTests, TwoDatabaseTests
+from .test_sqlite import SQLitePragmaTests
+from .test_search import SearchTests
+from .test_renderers import RendererTests
+from .test_compression import CompressionTests
+from .test_reconcile_attendee_counts import ReconcileAttendeeCountsTests
+from .test_signup_stress import SignupStressTests
+from .test_live import LiveTests
+from .test_sync import SyncTests
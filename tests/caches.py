@@ -0,0 +1,19 @@
+from django.core.cache import cache
+from levelupapi.authentication import token_cache
+from levelupapi.game_type_cache import game_types
+
+
+class CacheResetMixin:
+    """Drop what the caches loaded from a test's rows when the test ends
+
+    A test's rows are rolled back or flushed without any signal, so the cached
+    tokens, the game type table and the revocation markers would otherwise outlive
+    the rows they came from and leak into the next test. List it before the
+    TestCase class.
+    """
+
+    def tearDown(self):
+        super().tearDown()
+        token_cache.clear()
+        game_types.bump()
+        cache.clear()
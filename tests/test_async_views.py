@@ -0,0 +1,106 @@
+import json
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from django.test import override_settings
+from levelupapi.models import Event, Game, Gamer
+from tests.caches import CacheResetMixin
+
+
+@override_settings(ROOT_URLCONF='levelup.asgi_urls')
+class AsyncViewTests(CacheResetMixin, APITestCase):
+    """The async read views answer exactly like the ViewSets they stand in for"""
+
+    # Add any fixtures you want to run to build the test database
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'event', 'event_gamer']
+
+    def setUp(self):
+        # Grab the first Gamer object from the database and add their token to the headers
+        self.gamer = Gamer.objects.first()
+        token = Token.objects.get(user=self.gamer.user)
+        self.headers = {'Authorization': f'Token {token.key}'}
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    async def assert_same_as_viewset(self, path):
+        response = await self.async_client.get(path, headers=self.headers)
+        with self.settings(ROOT_URLCONF='levelup.urls'):
+            expected = await self.async_client.get(path, headers=self.headers)
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(json.loads(expected.content), json.loads(response.content))
+        self.assertEqual(expected['ETag'], response['ETag'])
+        return response
+
+    async def test_read_endpoints(self):
+        """Every async read endpoint returns the ViewSet's body and ETag"""
+        game = await Game.objects.afirst()
+        event = await Event.objects.afirst()
+        for path in ['/gametypes', '/gametypes/1', '/games', f'/games/{game.id}', '/games?type=1',
+                     '/events', f'/events/{event.id}', f'/events?game={game.id}', '/events?page_size=1',
+                     '/games?q=cand', '/events?q=rainbow', '/games?fields=id,title', '/events?fields=id,date,joined',
+                     '/events?ordering=popular&min_attendees=1']:
+            with self.subTest(path=path):
+                await self.assert_same_as_viewset(path)
+
+    async def test_query_count_header(self):
+        """QueryCountMiddleware counts the queries of async requests too"""
+        response = await self.async_client.get('/events', headers=self.headers)
+
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+
+    async def test_next_page(self):
+        """The next link of a page leads to the rest of the list"""
+        response = await self.async_client.get('/events?page_size=1', headers=self.headers)
+        next_page = await self.async_client.get(json.loads(response.content)['next'], headers=self.headers)
+
+        self.assertEqual(status.HTTP_200_OK, next_page.status_code)
+        self.assertNotEqual(json.loads(response.content)['results'], json.loads(next_page.content)['results'])
+
+    async def test_not_modified(self):
+        """A client with the current ETag gets a 304 without a body"""
+        response = await self.async_client.get('/events', headers=self.headers)
+        cached = await self.async_client.get('/events', headers={**self.headers, 'If-None-Match': response['ETag']})
+
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, cached.status_code)
+        self.assertEqual(b'', cached.content)
+
+    async def test_missing(self):
+        """Missing rows and bad cursors are 404s"""
+        for path in ['/games/9999', '/events/9999', '/gametypes/9999', '/events?cursor=nonsense']:
+            with self.subTest(path=path):
+                response = await self.async_client.get(path, headers=self.headers)
+                self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    async def test_bad_parameters(self):
+        """Bad query parameters are 400s with the ViewSet's error body"""
+        for path in ['/games?fields=password', '/events?fields=id,secret', '/events?start=never']:
+            with self.subTest(path=path):
+                response = await self.async_client.get(path, headers=self.headers)
+                with self.settings(ROOT_URLCONF='levelup.urls'):
+                    expected = await self.async_client.get(path, headers=self.headers)
+                self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+                self.assertEqual(json.loads(expected.content), json.loads(response.content))
+
+    async def test_authentication(self):
+        """Requests without a valid token are turned away like the ViewSets do"""
+        missing = await self.async_client.get('/games')
+        invalid = await self.async_client.get('/games', headers={'Authorization': 'Token nope'})
+
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, missing.status_code)
+        self.assertEqual('Token', missing['WWW-Authenticate'])
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, invalid.status_code)
+        self.assertEqual({'detail': 'Invalid token.'}, json.loads(invalid.content))
+
+    def test_writes_use_viewset(self):
+        """Methods other than GET are handled by the ViewSet"""
+        data = {
+            "game_type": 1,
+            "skill_level": 5,
+            "title": "Clue",
+            "maker": "Milton Bradley",
+            "number_of_players": 6,
+        }
+        response = self.client.post('/games', data, format='json')
+
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertEqual("Clue", json.loads(response.content)["title"])
@@ -0,0 +1,120 @@
+from unittest import mock
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from levelupapi import authentication
+from levelupapi.authentication import TTLCache, token_cache
+from levelupapi.models import Gamer
+from tests.caches import CacheResetMixin
+
+
+class AuthenticationTests(CacheResetMixin, APITestCase):
+
+    # Add any fixtures you want to run to build the test database
+    fixtures = ['users', 'tokens', 'gamers', 'game_types']
+
+    def setUp(self):
+        # Grab the first Gamer object from the database and add their token to the headers
+        token_cache.clear()
+        self.gamer = Gamer.objects.first()
+        self.token = Token.objects.get(user=self.gamer.user)
+        # The key is the primary key, which delete() clears
+        self.key = self.token.key
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_token_resolved_once(self):
+        """After the first request, the token, user and gamer come from the cache"""
+        self.client.get('/gametypes')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/gametypes')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(0, len(queries))
+
+    def test_deleted_token_rejected(self):
+        """Deleting a token drops it from the cache straight away"""
+        self.client.get('/gametypes')
+        self.token.delete()
+
+        response = self.client.get('/gametypes')
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+
+    def test_revoked_in_another_worker(self):
+        """A token deleted by another worker is refused once the marker it left in Django's cache is seen"""
+        self.client.get('/gametypes')
+        # This worker's entry, which another worker's signal would not have dropped
+        stale = token_cache.get(self.key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        token_cache.set(self.key, stale)
+
+        response = self.client.get('/gametypes')
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+
+    def test_user_changed_in_another_worker(self):
+        """Deactivating a user in another worker reloads their token everywhere"""
+        self.client.get('/gametypes')
+        stale = token_cache.get(self.key)
+        user = self.gamer.user
+        user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        token_cache.set(self.key, stale)
+
+        response = self.client.get('/gametypes')
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+
+    def test_inactive_user_rejected(self):
+        """Deactivating a user drops their cached tokens"""
+        self.client.get('/gametypes')
+        user = self.gamer.user
+        user.is_active = False
+        user.save()
+
+        response = self.client.get('/gametypes')
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+
+    def test_token_resolved_once_per_request(self):
+        """One request looks its token up once"""
+        with mock.patch.object(authentication, 'resolve_token', wraps=authentication.resolve_token) as resolve:
+            response = self.client.get('/gametypes')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(1, resolve.call_count)
+
+    def test_requests_get_their_own_instances(self):
+        """What one request changes on its user or gamer does not reach the cache or other requests"""
+        user, token, gamer = authentication.resolve_token(self.key)
+        user.first_name = "Changed"
+        gamer.bio = "Changed"
+
+        again, _, gamer_again = authentication.resolve_token(self.key)
+        self.assertIsNot(user, again)
+        self.assertEqual(self.gamer.user.first_name, again.first_name)
+        self.assertEqual(self.gamer.bio, gamer_again.bio)
+        # The copies still point at each other
+        self.assertIs(again, gamer_again.user)
+        self.assertIs(gamer_again, again.gamer)
+        self.assertEqual(token.key, self.key)
+
+    def test_cache_is_bounded(self):
+        """The least recently used entry is evicted once the cache is full"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(1, cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(3, cache.get('c'))
+
+    def test_cache_entries_expire(self):
+        """Entries are not served after their time to live"""
+        cache = TTLCache(maxsize=2, ttl=-1)
+        cache.set('a', 1)
+
+        self.assertIsNone(cache.get('a'))
@@ -0,0 +1,93 @@
+import gzip
+import json
+from unittest import mock
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from django.test import override_settings
+from levelupapi import middleware
+from levelupapi.middleware import negotiate_encoding
+from levelupapi.models import Event, Game, Gamer
+
+
+class CompressionTests(APITestCase):
+
+    # Add any fixtures you want to run to build the test database
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'event', 'event_gamer']
+
+    def setUp(self):
+        # Grab the first Gamer object from the database and add their token to the headers
+        self.gamer = Gamer.objects.first()
+        token = Token.objects.get(user=self.gamer.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        game = Game.objects.first()
+        Event.objects.bulk_create([
+            Event(game=game, description=f"Event {i}", date="2022-05-01", time="19:00", organizer=self.gamer)
+            for i in range(30)
+        ])
+
+    def test_negotiate_encoding(self):
+        """The coding with the highest q-value wins, the preferred one on a tie"""
+        for header, expected in [
+            ('gzip, deflate, br', 'br'),
+            ('gzip;q=1.0, br;q=0.5', 'gzip'),
+            ('br;q=0, gzip', 'gzip'),
+            ('*', 'br'),
+            ('*;q=0.5, br;q=0', 'gzip'),
+            ('identity', None),
+            ('gzip;q=0', None),
+            ('', None),
+        ]:
+            with self.subTest(header=header):
+                self.assertEqual(expected, negotiate_encoding(header, ('br', 'gzip')))
+
+    def test_gzip_list(self):
+        """A large list is gzipped for clients that accept it, with a weak ETag"""
+        plain = self.client.get('/events')
+        response = self.client.get('/events', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('gzip', response['Content-Encoding'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(json.loads(plain.content), json.loads(gzip.decompress(response.content)))
+        self.assertEqual(f'W/{plain["ETag"]}', response['ETag'])
+
+        # The weak ETag still gets a 304
+        cached = self.client.get('/events', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, cached.status_code)
+
+    def test_identity(self):
+        """Clients that do not ask for compression get the plain body"""
+        for header in ['', 'identity', 'gzip;q=0']:
+            with self.subTest(header=header):
+                response = self.client.get('/events', HTTP_ACCEPT_ENCODING=header)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                json.loads(response.content)
+
+    @override_settings(COMPRESS_MIN_BYTES=1000000)
+    def test_threshold(self):
+        """Responses below COMPRESS_MIN_BYTES are sent as they are"""
+        response = self.client.get('/events', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertNotIn('Accept-Encoding', response.get('Vary', ''))
+
+    def test_streamed_calendar(self):
+        """The calendar feed is compressed as it streams"""
+        plain = b''.join(self.client.get('/events/calendar').streaming_content)
+        response = self.client.get('/events/calendar', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual('gzip', response['Content-Encoding'])
+        self.assertEqual(plain, gzip.decompress(b''.join(response.streaming_content)))
+
+    def test_brotli(self):
+        """Brotli is preferred when the brotli package is installed"""
+        brotli = mock.Mock()
+        brotli.Compressor.return_value.process.side_effect = lambda data: b'B' + data[:10]
+        brotli.Compressor.return_value.finish.return_value = b''
+        with mock.patch.object(middleware, 'brotli', brotli):
+            response = self.client.get('/events', HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual('br', response['Content-Encoding'])
+        brotli.Compressor.assert_called_once_with(quality=middleware.BROTLI_QUALITY)
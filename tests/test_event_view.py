@@ -0,0 +1,388 @@
+import base64
+import json
+from datetime import timedelta
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.utils import timezone
+from levelupapi.models import Event, EventGamer, Game, Gamer
+
+
+class EventTests(APITestCase):
+
+    # Add any fixtures you want to run to build the test database
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'event', 'event_gamer']
+
+    def setUp(self):
+        # Grab the first Gamer object from the database and add their token to the headers
+        self.gamer = Gamer.objects.first()
+        token = Token.objects.get(user=self.gamer.user)
+        self.authorization = f"Token {token.key}"
+        self.client.credentials(HTTP_AUTHORIZATION=self.authorization)
+
+    def add_events(self, count):
+        """Create `count` extra events for the first game, all organized by the test gamer"""
+        game = Game.objects.first()
+        Event.objects.bulk_create([
+            Event(game=game, description=f"Event {i}", date="2022-05-01", time="19:00", organizer=self.gamer)
+            for i in range(count)
+        ])
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/events')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return len(queries)
+
+    def test_list_events_joined(self):
+        """The joined flag reflects the authenticated gamer's attendance"""
+        response = self.client.get('/events')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        joined = {event['id']: event['joined'] for event in response.data['results']}
+        # The event_gamer fixture signs the gamer up for event 1 only
+        self.assertEqual({1: True, 2: False}, joined)
+
+    def test_list_events_query_count_is_flat(self):
+        """Listing events costs the same number of queries no matter how many events exist"""
+        small = self.count_list_queries()
+
+        self.add_events(50)
+        large = self.count_list_queries()
+
+        self.assertEqual(small, large)
+
+    def test_list_events_pages(self):
+        """Paging with the next links visits every event once, in date order"""
+        self.add_events(5)
+        url = '/events?page_size=2'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            seen.extend(event['id'] for event in response.data['results'])
+            url = response.data['next']
+            if len(seen) == 2:
+                # An event inserted before the cursor must not shift the later pages
+                Event.objects.create(
+                    game=Game.objects.first(), description="Early", date="2022-01-01", time="09:00", organizer=self.gamer
+                )
+
+        expected = Event.objects.exclude(description="Early").order_by('date', 'time', 'id')
+        self.assertEqual(list(expected.values_list('id', flat=True)), seen)
+
+    def test_list_events_bad_cursor(self):
+        """Well-formed cursors whose values do not fit the ordering columns are rejected"""
+        for path, position in [
+            ('/events', ["x", "y", 1]),
+            ('/events', [None, None, 1]),
+            ('/events', ["2022-05-01", "25:99", 1]),
+            ('/events', ["2022-05-01", "19:00", 2**63]),
+            ('/events?ordering=popular', ["many", 1]),
+            ('/events?ordering=popular', [10**20, 1]),
+        ]:
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+            with self.subTest(path=path, position=position):
+                response = self.client.get(f"{path}{'&' if '?' in path else '?'}cursor={cursor}")
+                self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+                self.assertEqual('Invalid cursor', response.data['detail'])
+
+    def test_list_events_not_modified(self):
+        """A client holding the current ETag gets a 304 until someone signs up"""
+        etag = self.client.get('/events')['ETag']
+
+        response = self.client.get('/events', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+
+        self.client.post('/events/2/signup')
+        response = self.client.get('/events', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertNotEqual(etag, response['ETag'])
+
+    def test_get_event(self):
+        """Get event test"""
+        response = self.client.get('/events/1')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertTrue(response.data['joined'])
+        self.assertEqual(2, response.data['game']['id'])
+
+    def test_event_payload_is_flat(self):
+        """Organizer and attendees are summaries, not nested auth users"""
+        response = self.client.get('/events/1')
+
+        expected_gamer = {'id': self.gamer.id, 'full_name': 'Carrie Belk'}
+        self.assertEqual(expected_gamer, response.data['organizer'])
+        self.assertEqual([expected_gamer], response.data['attendees'])
+
+    def test_list_events_sparse_fields(self):
+        """?fields= returns only the fields asked for, with one query for the page"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/events?fields=id,date')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([{'id', 'date'}], list({frozenset(event) for event in response.data['results']}))
+        # No join for the game or organizer, no attendee prefetch and no joined subquery
+        page_query = queries.captured_queries[-1]['sql']
+        self.assertNotIn('JOIN', page_query)
+        self.assertNotIn('EXISTS', page_query)
+        self.assertNotIn('"description"', page_query)
+
+    def test_get_event_sparse_fields(self):
+        """?fields= works on a single event too"""
+        response = self.client.get('/events/1?fields=joined,game')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual({'joined', 'game'}, set(response.data))
+        self.assertTrue(response.data['joined'])
+
+    def test_signup_and_leave(self):
+        """Signing up and leaving a single event"""
+        response = self.client.post('/events/2/signup')
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertTrue(EventGamer.objects.filter(event_id=2, gamer=self.gamer).exists())
+
+        response = self.client.delete('/events/2/leave')
+        self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
+        self.assertFalse(EventGamer.objects.filter(event_id=2, gamer=self.gamer).exists())
+
+        response = self.client.post('/events/99/signup')
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_bulk_signup(self):
+        """Signing up for many events reports what happened to each one"""
+        response = self.client.post('/events/bulk_signup', {'events': [1, 2, 99]}, format='json')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([
+            {'event': 1, 'status': 'ok', 'added': [], 'unchanged': [self.gamer.id]},
+            {'event': 2, 'status': 'ok', 'added': [self.gamer.id], 'unchanged': []},
+            {'event': 99, 'status': 'not_found'},
+        ], response.data)
+        self.assertEqual(2, EventGamer.objects.filter(gamer=self.gamer).count())
+
+    def test_bulk_leave(self):
+        """Leaving many events removes only the memberships that exist"""
+        response = self.client.post('/events/bulk_leave', {'events': [1, 2]}, format='json')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([
+            {'event': 1, 'status': 'ok', 'removed': [self.gamer.id], 'unchanged': []},
+            {'event': 2, 'status': 'ok', 'removed': [], 'unchanged': [self.gamer.id]},
+        ], response.data)
+        self.assertFalse(EventGamer.objects.filter(gamer=self.gamer).exists())
+
+    def test_bulk_signup_bad_ids(self):
+        """Ids that cannot be event or gamer ids are a 400"""
+        for body in [{'events': [10**20]}, {'events': [0]}, {'events': [1], 'gamers': [2**63]}, {'events': []}]:
+            with self.subTest(body=body):
+                response = self.client.post('/events/bulk_signup', body, format='json')
+                self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+
+    def test_bulk_signup_other_gamers(self):
+        """Organizers can sign other gamers up for their own events only"""
+        user = User.objects.create_user(username="friend", password="friend")
+        friend = Gamer.objects.create(user=user, bio="Friend")
+        Event.objects.create(
+            game=Game.objects.first(), description="Not mine", date="2022-05-01", time="19:00", organizer=friend
+        )
+        not_mine = Event.objects.get(description="Not mine")
+
+        response = self.client.post(
+            '/events/bulk_signup', {'events': [2, not_mine.id], 'gamers': [friend.id]}, format='json'
+        )
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('ok', response.data[0]['status'])
+        self.assertEqual('forbidden', response.data[1]['status'])
+        self.assertEqual([2], list(EventGamer.objects.filter(gamer=friend).values_list('event_id', flat=True)))
+
+        response = self.client.post('/events/bulk_signup', {'events': [2], 'gamers': [999]}, format='json')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def list_ids(self, path):
+        response = self.client.get(path)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return [event['id'] for event in response.data['results']]
+
+    def test_list_events_between_dates(self):
+        """start and end keep the events on or between those dates"""
+        self.assertEqual([2], self.list_ids('/events?start=2022-04-30'))
+        self.assertEqual([1], self.list_ids('/events?end=2022-04-29'))
+        self.assertEqual([1, 2], self.list_ids('/events?start=2022-04-29&end=2022-04-30'))
+        self.assertEqual([], self.list_ids('/events?start=2022-05-01&game=1'))
+
+    def test_list_upcoming_events(self):
+        """upcoming keeps the events that have not started yet"""
+        now = timezone.localtime()
+        game = Game.objects.first()
+        later = Event.objects.create(
+            game=game, description="Later", date=now.date() + timedelta(days=1), time="19:00", organizer=self.gamer
+        )
+        Event.objects.create(
+            game=game, description="Yesterday", date=now.date() - timedelta(days=1), time="19:00", organizer=self.gamer
+        )
+
+        self.assertEqual([later.id], self.list_ids('/events?upcoming=true'))
+
+    def test_list_events_bad_filters(self):
+        """Malformed or reversed dates are rejected"""
+        for path in ['/events?start=yesterday', '/events?start=2022-05-01&end=2022-04-01', '/events?game=mario', f'/events?game={10**20}',
+                     '/events?min_attendees=-1', '/events?ordering=loudest']:
+            with self.subTest(path=path):
+                self.assertEqual(status.HTTP_400_BAD_REQUEST, self.client.get(path).status_code)
+
+    def attendee_counts(self):
+        return dict(Event.objects.values_list('id', 'attendee_count'))
+
+    def test_attendee_count_follows_attendance(self):
+        """Every signup and leave path moves attendee_count, and repeats leave it alone"""
+        friend = Gamer.objects.create(user=User.objects.create_user(username="friend", password="friend"), bio="Friend")
+        self.assertEqual({1: 1, 2: 0}, self.attendee_counts())
+
+        self.client.post('/events/2/signup')
+        self.client.post('/events/2/signup')
+        self.assertEqual({1: 1, 2: 1}, self.attendee_counts())
+
+        self.client.post('/events/bulk_signup', {'events': [1, 2], 'gamers': [self.gamer.id, friend.id]}, format='json')
+        self.assertEqual({1: 2, 2: 2}, self.attendee_counts())
+        self.assertEqual(2, self.client.get('/events/1').data['attendee_count'])
+
+        self.client.delete('/events/1/leave')
+        self.client.delete('/events/1/leave')
+        self.assertEqual({1: 1, 2: 2}, self.attendee_counts())
+
+        self.client.post('/events/bulk_leave', {'events': [1, 2], 'gamers': [self.gamer.id, friend.id]}, format='json')
+        self.assertEqual({1: 0, 2: 0}, self.attendee_counts())
+
+    def make_gamers(self, count):
+        return [
+            Gamer.objects.create(user=User.objects.create_user(username=f"player{i}", password="player"), bio="Player")
+            for i in range(count)
+        ]
+
+    def sign_in(self, gamer):
+        token, _ = Token.objects.get_or_create(user=gamer.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def test_signup_capacity(self):
+        """An event takes as many gamers as its game is for, unless it sets its own capacity"""
+        # Event 1 is for a two player game and the test gamer attends already
+        self.assertEqual(2, self.client.get('/events/1').data['capacity'])
+        friend, late = self.make_gamers(2)
+
+        self.sign_in(friend)
+        self.assertEqual(status.HTTP_201_CREATED, self.client.post('/events/1/signup').status_code)
+        self.assertEqual(status.HTTP_201_CREATED, self.client.post('/events/1/signup').status_code)
+        self.sign_in(late)
+        response = self.client.post('/events/1/signup')
+        self.assertEqual(status.HTTP_409_CONFLICT, response.status_code)
+        self.assertEqual({1: 2, 2: 0}, self.attendee_counts())
+
+        Event.objects.filter(pk=1).update(capacity=3)
+        self.assertEqual(status.HTTP_201_CREATED, self.client.post('/events/1/signup').status_code)
+        self.assertEqual(3, self.client.get('/events/1').data['capacity'])
+
+    def test_bulk_signup_capacity(self):
+        """A batch that does not fit leaves the event alone and reports it full"""
+        gamers = self.make_gamers(4)
+        ids = [gamer.id for gamer in gamers]
+
+        response = self.client.post('/events/bulk_signup', {'events': [1, 2], 'gamers': ids}, format='json')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([
+            {'event': 1, 'status': 'full'},
+            {'event': 2, 'status': 'ok', 'added': ids, 'unchanged': []},
+        ], response.data)
+        self.assertEqual({1: 1, 2: 4}, self.attendee_counts())
+
+    def test_capacity_below_attendance(self):
+        """The capacity can be lowered to the current attendance but not under it"""
+        event = {'description': "Race", 'date': "2022-04-29", 'time': "19:00", 'game': 2}
+
+        response = self.client.put('/events/1', {**event, 'capacity': 0}, format='json')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertIn('capacity', response.data)
+
+        response = self.client.put('/events/1', {**event, 'capacity': 1}, format='json')
+        self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
+        self.assertEqual(1, Event.objects.get(pk=1).capacity)
+
+    def test_list_popular_events(self):
+        """ordering=popular lists the most attended events first, min_attendees drops the quiet ones"""
+        self.add_events(3)
+        quiet, busy, busiest = Event.objects.order_by('-id')[:3]
+        Event.objects.filter(pk=busy.pk).update(attendee_count=5)
+        Event.objects.filter(pk=busiest.pk).update(attendee_count=9)
+
+        self.assertEqual([busiest.id, busy.id, 1, quiet.id, 2], self.list_ids('/events?ordering=popular'))
+        self.assertEqual([busiest.id, busy.id], self.list_ids('/events?ordering=popular&min_attendees=2'))
+        self.assertEqual(sorted([busy.id, busiest.id]), self.list_ids('/events?min_attendees=2'))
+
+        seen = []
+        url = '/events?ordering=popular&page_size=2'
+        while url:
+            response = self.client.get(url)
+            seen.extend(event['id'] for event in response.data['results'])
+            url = response.data['next']
+        self.assertEqual([busiest.id, busy.id, 1, quiet.id, 2], seen)
+
+    def test_calendar_feed(self):
+        """The feed has the events the gamer organizes or attends, as folded and escaped iCalendar lines"""
+        user = User.objects.create_user(username="friend", password="friend")
+        friend = Gamer.objects.create(user=user, bio="Friend")
+        Event.objects.create(
+            game=Game.objects.first(), description="Not mine, not joined", date="2022-05-01", time="19:00", organizer=friend
+        )
+        Event.objects.filter(pk=2).update(organizer=friend, description="Bring snacks; drinks, and " + "x" * 80)
+
+        response = self.client.get('/events/calendar')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('text/calendar; charset=utf-8', response['Content-Type'])
+        feed = b''.join(response.streaming_content).decode()
+        lines = feed.split('\r\n')
+        self.assertEqual('BEGIN:VCALENDAR', lines[0])
+        self.assertEqual('END:VCALENDAR', lines[-2])
+        self.assertTrue(all(len(line.encode()) <= 75 for line in lines))
+        # Event 2 now belongs to the friend, and the gamer does not attend it
+        self.assertEqual(['UID:event-1@levelup'], [line for line in lines if line.startswith('UID:')])
+        self.assertIn('DTSTART:20220429T190000', lines)
+        self.assertIn('CATEGORIES:Organizer', lines)
+
+        EventGamer.objects.create(event_id=2, gamer=self.gamer)
+        feed = b''.join(self.client.get('/events/calendar').streaming_content).decode()
+        unfolded = feed.replace('\r\n ', '')
+        self.assertIn('DESCRIPTION:Bring snacks\\; drinks\\, and ' + 'x' * 80, unfolded)
+        self.assertIn('CATEGORIES:Attendee', unfolded)
+
+
+    def test_calendar_feed_url(self):
+        """Calendar apps subscribe to a secret URL that needs no token and can be replaced or turned off"""
+        response = self.client.post('/events/calendar/feed')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        url = response.data['url']
+        self.assertRegex(url, r'^http://testserver/events/calendar/[\w-]{40,}\.ics$')
+        self.client.credentials()
+
+        response = self.client.get(url, HTTP_ACCEPT='text/calendar')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('text/calendar; charset=utf-8', response['Content-Type'])
+        self.assertIn('UID:event-1@levelup', b''.join(response.streaming_content).decode())
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, self.client.post('/events/calendar/feed').status_code)
+
+        # A new URL replaces the old one
+        self.client.credentials(HTTP_AUTHORIZATION=self.authorization)
+        new_url = self.client.post('/events/calendar/feed').data['url']
+        self.assertNotEqual(url, new_url)
+        self.assertEqual(status.HTTP_404_NOT_FOUND, self.client.get(url).status_code)
+        self.assertEqual(status.HTTP_200_OK, self.client.get(new_url).status_code)
+
+        response = self.client.delete('/events/calendar/feed')
+        self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
+        self.assertEqual(status.HTTP_404_NOT_FOUND, self.client.get(new_url).status_code)
@@ -0,0 +1,77 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from levelupapi.game_type_cache import game_types
+from levelupapi.models import GameType, Gamer
+from tests.caches import CacheResetMixin
+
+
+class GameTypeTests(CacheResetMixin, APITestCase):
+
+    # Add any fixtures you want to run to build the test database
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games']
+
+    def setUp(self):
+        # Grab the first Gamer object from the database and add their token to the headers
+        self.gamer = Gamer.objects.first()
+        token = Token.objects.get(user=self.gamer.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def test_list_game_types(self):
+        """Test list game types"""
+        response = self.client.get('/gametypes')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        expected = list(GameType.objects.order_by('id').values('id', 'label'))
+        self.assertEqual(expected, response.data)
+        self.assertIn('ETag', response)
+
+    def test_get_game_type(self):
+        """Test get game type, and a 404 for a missing one"""
+        response = self.client.get('/gametypes/2')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual({'id': 2, 'label': 'Role-playing game'}, response.data)
+
+        response = self.client.get('/gametypes/99')
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_game_types_not_modified(self):
+        """A matching If-None-Match gets a 304 until a game type changes"""
+        etag = self.client.get('/gametypes')['ETag']
+
+        response = self.client.get('/gametypes', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+        self.assertEqual(b'', response.content)
+
+        GameType.objects.create(label="Card game")
+        response = self.client.get('/gametypes', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertNotEqual(etag, response['ETag'])
+        self.assertEqual("Card game", response.data[-1]['label'])
+
+    def test_games_render_cached_game_types(self):
+        """Listing games does not query the game type table"""
+        self.client.get('/gametypes')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/games')
+
+        self.assertEqual({'id': 1, 'label': 'Board game'}, response.data['results'][0]['game_type'])
+        self.assertFalse([query for query in queries if 'levelupapi_gametype' in query['sql']])
+
+    def test_game_types_reloaded_after_commit(self):
+        """Writing a game type marks the table stale again once the transaction commits
+
+        A reader on another thread may have reloaded the old rows before the commit.
+        """
+        with self.captureOnCommitCallbacks() as callbacks:
+            GameType.objects.create(label="Card game")
+        self.client.get('/gametypes')
+        version = game_types.version
+
+        for callback in callbacks:
+            callback()
+
+        self.assertGreater(game_types.version, version)
@@ -1,8 +1,13 @@
+import base64
+import json
 from rest_framework import status
 from rest_framework.test import APITestCase
 from rest_framework.authtoken.models import Token
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from levelupapi.models import Game, Gamer
 from levelupapi.views.game import CreateGameSerializer, GameSerializer
+from levelupreports.models import UserGameRow
 
 class GameTests(APITestCase):
 
@@ -75,14 +80,107 @@ class GameTests(APITestCase):
         response = self.client.get(url)
         
         # Get all the games in the database and serialize them to get the expected output
-        all_games = Game.objects.all()
+        all_games = Game.objects.order_by('id')
         expected = GameSerializer(all_games, many=True)
 
         self.assertEqual(status.HTTP_200_OK, response.status_code)
 
-        self.assertEqual(expected.data, response.data)      
+        # The list is paginated, the games are under `results`
+        self.assertEqual(expected.data, response.data['results'])
+        self.assertIsNone(response.data['next'])
+
+
+    def test_list_games_pages(self):
+        """Test following the next links through every page of games"""
+        url = '/games?page_size=1'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            self.assertLessEqual(len(response.data['results']), 1)
+            seen.extend(game['id'] for game in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(list(Game.objects.order_by('id').values_list('id', flat=True)), seen)
+
+
+    def test_list_games_query_count_is_flat(self):
+        """The gamer of every game on the page comes from the same query"""
+        with CaptureQueriesContext(connection) as small:
+            self.client.get('/games')
+        Game.objects.bulk_create([
+            Game(title=f"Game {i}", maker="Maker", gamer=self.gamer, game_type_id=1, number_of_players=2, skill_level=1)
+            for i in range(20)
+        ])
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get('/games')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(len(small), len(large))
+
+
+    def test_list_games_sparse_fields(self):
+        """?fields= returns only the fields asked for and leaves the gamer join out"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/games?fields=title,id')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        expected = list(Game.objects.order_by('id').values('id', 'title'))
+        self.assertEqual(expected, [dict(game) for game in response.data['results']])
+        page_query = queries.captured_queries[-1]['sql']
+        self.assertNotIn('levelupapi_gamer', page_query)
+        self.assertNotIn('"maker"', page_query)
+
+
+    def test_list_games_unknown_field(self):
+        """Asking for a field the games do not have is a 400"""
+        response = self.client.get('/games?fields=id,password')
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertIn('fields', response.data)
+
+
+    def test_list_games_bad_cursor(self):
+        """A cursor the server did not hand out is rejected"""
+        response = self.client.get('/games?cursor=not-a-cursor')
+
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+        # Well-formed cursors whose values do not fit the ordering columns
+        for path, position in [
+            ('/games', ["x"]),
+            ('/games', [None]),
+            ('/games', [[1]]),
+            ('/games', [2**63]),
+            ('/games', [-2**63 - 1]),
+            ('/games?q=cand', ["high", 1]),
+            ('/games?q=cand', [1.5, 10**20]),
+        ]:
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+            with self.subTest(path=path, position=position):
+                response = self.client.get(f"{path}{'&' if '?' in path else '?'}cursor={cursor}")
+                self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+                self.assertEqual('Invalid cursor', response.data['detail'])
         
         
+    def test_calendar_token_not_rendered(self):
+        """The gamer nested in a game leaves out their secret calendar feed token"""
+        self.client.post('/events/calendar/feed')
+        feed_token = Gamer.objects.get(pk=self.gamer.pk).calendar_token
+        game = Game.objects.filter(gamer=self.gamer).first()
+
+        for path in ['/games', f'/games/{game.id}', '/games?fields=id,gamer', '/sync']:
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(status.HTTP_200_OK, response.status_code)
+                self.assertNotIn(b'calendar_token', response.content)
+                self.assertNotIn(feed_token.encode(), response.content)
+        self.assertEqual(
+            {'id': self.gamer.id, 'bio': self.gamer.bio, 'user': self.gamer.user_id},
+            self.client.get(f'/games/{game.id}').data['gamer']
+        )
+
+
     def test_change_game(self):
         """test update game"""
         # Grab the first game in the database
@@ -121,4 +219,134 @@ class GameTests(APITestCase):
         # Test that it was deleted by trying to _get_ the game
         # The response should return a 404
         response = self.client.get(url)
-        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)           
\ No newline at end of file
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)           
+
+    def test_list_games_not_modified(self):
+        """A client holding the current ETag gets a 304 until a game changes"""
+        etag = self.client.get('/games')['ETag']
+
+        response = self.client.get('/games', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+
+        game = Game.objects.first()
+        game.title = "Candy Land Deluxe"
+        game.save()
+
+        response = self.client.get('/games', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertNotEqual(etag, response['ETag'])
+
+
+    def test_list_games_modified_since_after_delete(self):
+        """A list has no Last-Modified, so If-Modified-Since never hides a deleted game"""
+        response = self.client.get('/games')
+        self.assertNotIn('Last-Modified', response)
+        newest = Game.objects.order_by('-updated_at').first()
+        last_modified = self.client.get(f'/games/{newest.id}')['Last-Modified']
+        deleted = Game.objects.exclude(pk=newest.pk).order_by('id').first()
+        deleted.delete()
+
+        response = self.client.get('/games', HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertNotIn(deleted.title, [game['title'] for game in response.data['results']])
+
+
+    def test_get_game_not_modified_since(self):
+        """A detail request with a current If-Modified-Since gets a 304"""
+        game = Game.objects.first()
+        response = self.client.get(f'/games/{game.id}')
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get(f'/games/{game.id}', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+
+
+    def test_games_modified_by_gamer(self):
+        """Games embed their gamer, so editing the gamer turns the games' 304s back into 200s"""
+        game = Game.objects.filter(gamer=self.gamer).first()
+        list_etag = self.client.get('/games')['ETag']
+        detail = self.client.get(f'/games/{game.id}')
+
+        self.gamer.bio = "Board games on Tuesdays"
+        self.gamer.save()
+
+        response = self.client.get('/games', HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertNotEqual(list_etag, response['ETag'])
+        response = self.client.get(f'/games/{game.id}', HTTP_IF_NONE_MATCH=detail['ETag'])
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual("Board games on Tuesdays", response.data['gamer']['bio'])
+
+
+    def test_bulk_games(self):
+        """Bulk creates new games and updates existing ones in one request"""
+        game = Game.objects.first()
+        items = [
+            {"title": "Clue", "maker": "Milton Bradley", "skill_level": 5, "number_of_players": 6, "game_type": 1},
+            {"id": game.id, "title": "Candy Land 2", "maker": game.maker, "skill_level": 1,
+             "number_of_players": 4, "game_type": 2},
+        ]
+
+        response = self.client.post('/games/bulk', items, format='json')
+
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertEqual(1, response.data['created'])
+        self.assertEqual(1, response.data['updated'])
+        self.assertEqual(game.id, response.data['ids'][1])
+        new_game = Game.objects.get(pk=response.data['ids'][0])
+        self.assertEqual(("Clue", self.gamer.id), (new_game.title, new_game.gamer_id))
+        game.refresh_from_db()
+        self.assertEqual(("Candy Land 2", 2), (game.title, game.game_type_id))
+        # The report tables are refreshed even though bulk writes skip post_save
+        self.assertTrue(UserGameRow.objects.filter(title="Clue").exists())
+        self.assertTrue(UserGameRow.objects.filter(title="Candy Land 2").exists())
+
+
+    def test_bulk_games_query_count(self):
+        """The number of queries does not grow with the number of games sent"""
+        def post(count):
+            items = [
+                {"title": f"Game {i}", "maker": "Maker", "skill_level": 1, "number_of_players": 2, "game_type": 1}
+                for i in range(count)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post('/games/bulk', items, format='json')
+            self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+            return len(queries)
+
+        self.assertEqual(post(2), post(40))
+
+
+    def test_bulk_games_errors(self):
+        """Any invalid item rejects the whole batch and each item reports its own errors"""
+        items = [
+            {"title": "Clue", "maker": "Milton Bradley", "skill_level": 5, "number_of_players": 6, "game_type": 1},
+            {"title": "Nope", "maker": "Nobody", "skill_level": 1, "number_of_players": 2, "game_type": 99},
+            {"id": 999, "title": "Ghost", "maker": "Nobody", "skill_level": 1, "number_of_players": 2, "game_type": 1},
+            {"maker": "Nobody"},
+        ]
+
+        response = self.client.post('/games/bulk', items, format='json')
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        errors = response.data['errors']
+        self.assertEqual({}, errors[0])
+        self.assertIn('game_type', errors[1])
+        self.assertIn('id', errors[2])
+        self.assertIn('title', errors[3])
+        self.assertFalse(Game.objects.filter(title="Clue").exists())
+
+
+    def test_bulk_games_duplicate_ids(self):
+        """A game sent twice in one request is rejected instead of counted twice"""
+        game = Game.objects.first()
+        item = {"id": game.id, "title": "Candy Land 2", "maker": game.maker, "skill_level": 1,
+                "number_of_players": 4, "game_type": 1}
+
+        response = self.client.post('/games/bulk', [item, {**item, "title": "Candy Land 3"}], format='json')
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertEqual(['id', 'id'], [key for error in response.data['errors'] for key in error])
+        game.refresh_from_db()
+        self.assertNotIn(game.title, ["Candy Land 2", "Candy Land 3"])
@@ -0,0 +1,39 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+from levelupapi.attendance import capacity
+from levelupapi.models import Event, EventGamer, Game, Gamer
+from levelupreports.models import UserEventRow, UserGameRow
+
+
+class GenerateDataTests(TestCase):
+
+    def generate(self, seed):
+        call_command('generate_data', '--scale', '0.001', '--seed', str(seed), stdout=StringIO())
+
+    def test_generate_data_counts(self):
+        """--scale sizes every table, and the report tables are filled too"""
+        self.generate(seed=1)
+
+        self.assertEqual(10, Gamer.objects.count())
+        self.assertEqual(100, Game.objects.count())
+        self.assertEqual(50, Event.objects.count())
+        # 10 attendees per event, fewer where there are fewer seats
+        attendances = EventGamer.objects.count()
+        self.assertTrue(0 < attendances <= 500)
+        self.assertEqual(attendances, sum(Event.objects.values_list('attendee_count', flat=True)))
+        seats = Event.objects.annotate(seats=capacity())
+        self.assertFalse(seats.filter(attendee_count__gt=F('seats')).exists())
+        self.assertTrue(seats.filter(attendee_count__lt=10).exists())
+        self.assertEqual(100, UserGameRow.objects.count())
+        self.assertEqual(50, UserEventRow.objects.count())
+
+    def test_generate_data_seed(self):
+        """The same seed generates the same games, and running twice does not collide"""
+        self.generate(seed=7)
+        first = list(Game.objects.order_by('id').values_list('title', 'maker', 'skill_level'))
+        self.generate(seed=7)
+        second = list(Game.objects.order_by('id').values_list('title', 'maker', 'skill_level'))[len(first):]
+
+        self.assertEqual(first, second)
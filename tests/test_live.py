@@ -0,0 +1,222 @@
+import asyncio
+import json
+from unittest import mock
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from django.test import override_settings
+from levelupapi import pubsub
+from levelupapi.models import Event, Gamer
+from levelupapi.pubsub import LocalBroker, RedisBroker
+from tests.caches import CacheResetMixin
+
+
+@override_settings(ROOT_URLCONF='levelup.asgi_urls')
+class LiveTests(CacheResetMixin, APITestCase):
+    """EventView announces its changes and /events/live streams them"""
+
+    # Add any fixtures you want to run to build the test database
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'event', 'event_gamer']
+
+    def setUp(self):
+        # Grab the first Gamer object from the database and add their token to the headers
+        self.gamer = Gamer.objects.first()
+        token = Token.objects.get(user=self.gamer.user)
+        self.headers = {'Authorization': f'Token {token.key}'}
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.event = Event.objects.first()
+
+    async def open_stream(self, path, **headers):
+        response = await self.async_client.get(path, headers={**self.headers, **headers})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(b'retry: 3000\n\n', await anext(chunks))
+        return response, chunks
+
+    def test_write_paths_publish(self):
+        """Every write of EventView is announced once its transaction commits"""
+        broker = pubsub.broker()
+        start = broker.last_id
+        with self.captureOnCommitCallbacks(execute=True):
+            event = {'description': "Race", 'date': "2022-04-29", 'time': "19:00", 'game': 2}
+            event_id = self.client.post('/events', event, format='json').data['id']
+            self.client.put(f'/events/{event_id}', {**event, 'description': "Big race"}, format='json')
+            self.client.post(f'/events/{event_id}/signup')
+            self.client.delete(f'/events/{event_id}/leave')
+            # Leaving an event the gamer does not attend changes nothing
+            self.client.delete(f'/events/{event_id}/leave')
+            self.client.post('/events/bulk_signup', {'events': [event_id]}, format='json')
+            self.client.post('/events/bulk_leave', {'events': [event_id, 999]}, format='json')
+            self.client.delete(f'/events/{event_id}')
+
+        messages = [(message['type'], message['event'], message.get('gamers')) for message in broker.since(start)]
+        self.assertEqual([
+            ('created', event_id, None),
+            ('updated', event_id, None),
+            ('signup', event_id, [self.gamer.id]),
+            ('leave', event_id, [self.gamer.id]),
+            ('signup', event_id, [self.gamer.id]),
+            ('leave', event_id, [self.gamer.id]),
+            ('deleted', event_id, None),
+        ], messages)
+
+    def test_nothing_published_before_commit(self):
+        """A change is not announced while its transaction may still roll back"""
+        broker = pubsub.broker()
+        start = broker.last_id
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(f'/events/{self.event.id}/signup')
+
+        self.assertEqual([], broker.since(start))
+        self.assertEqual(1, len(callbacks))
+
+    async def test_stream(self):
+        """The stream sends the changes of the subscribed events as they happen, uncompressed"""
+        response, chunks = await self.open_stream(f'/events/live?events={self.event.id}', **{'Accept-Encoding': 'gzip'})
+        self.assertEqual('text/event-stream', response['Content-Type'])
+        self.assertEqual('no-cache', response['Cache-Control'])
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        broker = pubsub.broker()
+        broker.publish({'type': 'signup', 'event': self.event.id + 1, 'gamers': [2]})
+        broker.publish({'type': 'signup', 'event': self.event.id, 'gamers': [3]})
+        chunk = (await anext(chunks)).decode()
+
+        lines = chunk.split('\n')
+        self.assertEqual(f'id: {broker.last_id}', lines[0])
+        self.assertEqual('event: signup', lines[1])
+        self.assertEqual({'id': broker.last_id, 'type': 'signup', 'event': self.event.id, 'gamers': [3]},
+                         json.loads(lines[2].removeprefix('data: ')))
+        self.assertTrue(chunk.endswith('\n\n'))
+        await chunks.aclose()
+
+    async def test_stream_replays_missed_messages(self):
+        """A client reconnecting with Last-Event-ID is sent what was published since"""
+        broker = pubsub.broker()
+        broker.publish({'type': 'deleted', 'event': 41})
+        last_id = broker.last_id
+        broker.publish({'type': 'deleted', 'event': 42})
+
+        _, chunks = await self.open_stream('/events/live', **{'Last-Event-ID': str(last_id)})
+
+        self.assertIn(b'"event":42', await anext(chunks))
+        await chunks.aclose()
+
+    @override_settings(LIVE_HEARTBEAT_SECONDS=0.01)
+    async def test_stream_keep_alive(self):
+        """An idle stream sends comments"""
+        _, chunks = await self.open_stream('/events/live')
+
+        self.assertEqual(b': keep-alive\n\n', await anext(chunks))
+        await chunks.aclose()
+
+    async def test_stream_errors(self):
+        """The stream needs a token and a list of ids"""
+        response = await self.async_client.get('/events/live')
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+
+        response = await self.async_client.get('/events/live?events=1,two', headers=self.headers)
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertIn('events', json.loads(response.content))
+
+    async def test_stream_with_ticket(self):
+        """EventSource cannot send the token, so it opens the stream with a ticket and resumes with ?last_event_id="""
+        response = await self.async_client.post('/events/live/ticket', headers=self.headers)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        body = json.loads(response.content)
+        self.assertEqual(60, body['expires_in'])
+        broker = pubsub.broker()
+        broker.publish({'type': 'deleted', 'event': 41})
+        last_id = broker.last_id
+        broker.publish({'type': 'deleted', 'event': 42})
+
+        self.headers = {}
+        _, chunks = await self.open_stream(f'/events/live?ticket={body["ticket"]}&last_event_id={last_id}')
+
+        self.assertIn(b'"event":42', await anext(chunks))
+        await chunks.aclose()
+
+    async def test_stream_ticket_errors(self):
+        """A ticket needs the token to be made, and an expired, forged or revoked one is refused"""
+        response = await self.async_client.post('/events/live/ticket')
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+
+        ticket = json.loads((await self.async_client.post('/events/live/ticket', headers=self.headers)).content)['ticket']
+        with self.settings(LIVE_TICKET_SECONDS=-1):
+            response = await self.async_client.get(f'/events/live?ticket={ticket}')
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+        self.assertEqual('Ticket expired.', json.loads(response.content)['detail'])
+
+        response = await self.async_client.get(f'/events/live?ticket={ticket[:-2]}xx')
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+
+        await Token.objects.filter(user=await Gamer.objects.values_list('user', flat=True).afirst()).adelete()
+        response = await self.async_client.get(f'/events/live?ticket={ticket}')
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+        self.assertEqual('Invalid ticket.', json.loads(response.content)['detail'])
+
+    @override_settings(ROOT_URLCONF='levelup.urls')
+    def test_stream_needs_asgi(self):
+        """Under WSGI the stream is not served, and the path is not mistaken for an event id"""
+        response = self.client.get('/events/live')
+
+        self.assertEqual(status.HTTP_501_NOT_IMPLEMENTED, response.status_code)
+
+    async def test_replay_gap(self):
+        """A client that missed more than the broker remembers is told to reset"""
+        broker = LocalBroker(replay_size=2)
+        for event_id in range(5):
+            broker.publish({'type': 'deleted', 'event': event_id})
+
+        subscription = broker.subscribe(last_id=1)
+
+        self.assertEqual({'id': 5, 'type': pubsub.RESET}, await subscription.get())
+        subscription.close()
+
+    async def test_slow_subscriber(self):
+        """A subscription that falls too far behind is closed after the messages it holds"""
+        broker = LocalBroker(queue_size=2)
+        subscription = broker.subscribe()
+        for event_id in range(3):
+            broker.publish({'type': 'deleted', 'event': event_id})
+        await asyncio.sleep(0)
+
+        self.assertEqual([0, 1], [(await subscription.get())['event'], (await subscription.get())['event']])
+        self.assertIsNone(await subscription.get())
+        self.assertTrue(subscription.closed)
+        # Reconnecting with the last id it got picks up where it left off
+        resumed = broker.subscribe(last_id=2)
+        self.assertEqual(2, (await resumed.get())['event'])
+        resumed.close()
+
+    async def test_redis_broker(self):
+        """RedisBroker numbers messages in Redis and hands what the channel carries to its subscriptions"""
+        class Channel:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc_info):
+                pass
+
+            async def subscribe(self, name):
+                self.name = name
+
+            async def listen(self):
+                yield {'type': 'subscribe', 'data': 1}
+                yield {'type': 'message', 'data': json.dumps({'id': 7, 'type': 'deleted', 'event': 3})}
+
+        redis = mock.Mock()
+        redis.Redis.from_url.return_value.incr.return_value = 7
+        redis.asyncio.Redis.from_url.return_value.pubsub.return_value = Channel()
+        redis.asyncio.Redis.from_url.return_value.aclose = mock.AsyncMock()
+        with mock.patch.object(pubsub, 'redis', redis):
+            broker = RedisBroker()
+            broker.publish({'type': 'deleted', 'event': 3})
+            subscription = broker.subscribe()
+
+            self.assertEqual({'id': 7, 'type': 'deleted', 'event': 3}, await subscription.get())
+            # The channel closed, so the subscription closes too and its client reconnects
+            self.assertIsNone(await subscription.get())
+        redis.Redis.from_url.return_value.publish.assert_called_once_with(
+            RedisBroker.CHANNEL, json.dumps({'id': 7, 'type': 'deleted', 'event': 3})
+        )
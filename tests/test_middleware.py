@@ -0,0 +1,51 @@
+import json
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from django.test import override_settings
+from levelupapi.middleware import statement_shape
+from levelupapi.models import Gamer
+
+
+class QueryCountMiddlewareTests(APITestCase):
+
+    # Add any fixtures you want to run to build the test database
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'event', 'event_gamer']
+
+    def setUp(self):
+        # Grab the first Gamer object from the database and add their token to the headers
+        self.gamer = Gamer.objects.first()
+        token = Token.objects.get(user=self.gamer.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def test_server_timing_header(self):
+        """Every response reports its query count and database time"""
+        response = self.client.get('/events')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", total;dur=[\d.]+$')
+
+    def test_log_line(self):
+        """Each request logs one JSON line with its totals"""
+        with self.assertLogs('levelupapi.sql', level='INFO') as logs:
+            self.client.get('/events')
+
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(('GET', '/events', 200), (line['method'], line['path'], line['status']))
+        self.assertGreater(line['queries'], 0)
+
+    @override_settings(SQL_WARN_QUERIES=1, SQL_WARN_REPEATS=None)
+    def test_warn_on_query_count(self):
+        """Requests over the query threshold log a warning"""
+        with self.assertLogs('levelupapi.sql', level='WARNING') as logs:
+            self.client.get('/events')
+
+        self.assertIn('more than 1 queries', logs.records[0].getMessage())
+
+    def test_statement_shape(self):
+        """Statements that differ only in literals and parameter counts share a shape"""
+        self.assertEqual(
+            statement_shape('SELECT * FROM t WHERE id IN (%s, %s, %s) AND x = 5'),
+            statement_shape('SELECT *  FROM t\n WHERE id IN (%s, %s) AND x = 7'),
+        )
+        self.assertEqual("SELECT * FROM t WHERE name = ?", statement_shape("SELECT * FROM t WHERE name = 'bob'"))
@@ -0,0 +1,110 @@
+import re
+from django.db import connection
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from levelupapi.models import Event, Game, Gamer
+from levelupapi.pagination import KeysetPagination
+from levelupapi.views.event import calendar_events, event_queryset, filter_events
+from levelupapi.views.game import filter_games, game_queryset
+
+
+class QueryPlanTests(TestCase):
+    """Fail when a hot query stops using an index
+
+    Each test runs EXPLAIN QUERY PLAN on a query the API runs on every request,
+    built by the same functions the views build it with, and checks that no step
+    reads a whole table or sorts in a temporary b-tree.
+    """
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'event', 'event_gamer']
+
+    factory = APIRequestFactory()
+
+    def assert_uses_index(self, queryset, *indexes, sorts=False):
+        plan = queryset.explain()
+        # A "SCAN table" step without an index is a full table scan
+        full_scans = [line for line in plan.splitlines() if re.search(r'SCAN \w+$', line.strip())]
+        self.assertEqual([], full_scans, plan)
+        if not sorts:
+            self.assertNotIn('USE TEMP B-TREE', plan)
+        for index in indexes:
+            self.assertIn(index, plan)
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('The expected plans are written for SQLite')
+        self.gamer = Gamer.objects.first()
+
+    def page(self, path, filter_rows, build, cursor=None):
+        """The page query the list view behind `path` runs, after `cursor` when given"""
+        _, ranked, ordering = filter_rows(Request(self.factory.get(path)))
+        paginator = KeysetPagination(ordering=ordering)
+        if cursor is not None:
+            path += f"{'&' if '?' in path else '?'}cursor={paginator.encode_cursor(cursor)}"
+        queryset = paginator.page_queryset(build(ranked, ordering), Request(self.factory.get(path)))
+        self.assertEqual(paginator.limit + 1, queryset.query.high_mark)
+        return queryset
+
+    def events_page(self, path, cursor=None):
+        """The page query of GET /events"""
+        return self.page(
+            path,
+            lambda request: filter_events(Event.objects.all(), request),
+            lambda events, ordering: event_queryset(self.gamer, events, None, ordering),
+            cursor
+        )
+
+    def games_page(self, path, cursor=None):
+        """The page query of GET /games"""
+        return self.page(
+            path,
+            lambda request: filter_games(Game.objects.all(), request),
+            lambda games, ordering: game_queryset(games, None, ordering),
+            cursor
+        )
+
+    def test_events_page(self):
+        """The first events page walks the (date, time, id) index, and joins the game, organizer and joined flag by key
+
+        The joined flag looks one (event, gamer) pair up in the unique index.
+        SQLite builds the unique constraint into the table, so the index gets an autoindex name.
+        """
+        self.assert_uses_index(
+            self.events_page('/events'),
+            'event_date_time_idx',
+            'SEARCH levelupapi_game USING INTEGER PRIMARY KEY',
+            'SEARCH auth_user USING INTEGER PRIMARY KEY',
+            '(event_id=? AND gamer_id=?)'
+        )
+
+    def test_events_next_page(self):
+        """A later events page seeks to the cursor instead of walking from the start"""
+        events = self.events_page('/events', cursor=['2022-04-30', '19:00:00', 2])
+        self.assert_uses_index(events, 'event_date_time_idx (date>?)', '(event_id=? AND gamer_id=?)')
+
+    def test_events_from_date(self):
+        """The start and upcoming filters seek into the (date, time, id) index"""
+        self.assert_uses_index(self.events_page('/events?start=2022-04-30'), 'event_date_time_idx (date>?)')
+        self.assert_uses_index(self.events_page('/events?upcoming=true'), 'event_date_time_idx (date>?)')
+
+    def test_events_for_game(self):
+        """Filtering events by game uses the (game, date, time) index"""
+        self.assert_uses_index(self.events_page('/events?game=1'), 'event_game_date_time_idx (game_id=?)')
+
+    def test_popular_events_page(self):
+        """ordering=popular reads the (attendee_count, id) index backwards from the cursor"""
+        events = self.events_page('/events?ordering=popular&min_attendees=2', cursor=[10, 500])
+        self.assert_uses_index(events, 'event_attendee_count_idx (attendee_count>? AND attendee_count<?)')
+
+    def test_events_of_gamer(self):
+        """The calendar feed finds the events a gamer attends in the (gamer, event) index
+
+        The gamer's events are few, so they are sorted after they are found.
+        """
+        self.assert_uses_index(calendar_events(self.gamer), 'eventgamer_gamer_event_idx (gamer_id=?)', sorts=True)
+
+    def test_games_for_type(self):
+        """Filtering games by type pages through the (game_type, id) index"""
+        games = self.games_page('/games?type=1', cursor=[1])
+        self.assert_uses_index(games, 'game_type_id_idx (game_type_id=? AND id>?)', 'SEARCH levelupapi_gamer USING INTEGER PRIMARY KEY')
@@ -0,0 +1,47 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from levelupapi.models import Event, EventGamer
+
+
+class ReconcileAttendeeCountsTests(TestCase):
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'event', 'event_gamer']
+
+    def reconcile(self, *args):
+        out = StringIO()
+        call_command('reconcile_attendee_counts', *args, stdout=out)
+        return out.getvalue()
+
+    def test_corrects_drifted_counts(self):
+        """Events whose attendee_count is off get the number of memberships, and bump updated_at"""
+        Event.objects.filter(pk=1).update(attendee_count=7)
+        Event.objects.filter(pk=2).update(attendee_count=3)
+        before = Event.objects.get(pk=1).updated_at
+
+        self.assertIn('Corrected the attendee count of 2 events', self.reconcile())
+
+        self.assertEqual({1: 1, 2: 0}, dict(Event.objects.values_list('id', 'attendee_count')))
+        self.assertGreater(Event.objects.get(pk=1).updated_at, before)
+        self.assertIn('of 0 events', self.reconcile())
+
+    def test_dry_run(self):
+        """--dry-run lists the events that are off and changes nothing"""
+        Event.objects.filter(pk=2).update(attendee_count=3)
+
+        output = self.reconcile('--dry-run')
+
+        self.assertIn('Event 2: attendee_count is 3, 0 attend', output)
+        self.assertIn('1 events are off', output)
+        self.assertEqual(3, Event.objects.get(pk=2).attendee_count)
+
+    def test_fixtures_are_counted(self):
+        """Loading events and memberships from fixtures counts the memberships, whatever the order"""
+        self.assertEqual({1: 1, 2: 0}, dict(Event.objects.values_list('id', 'attendee_count')))
+
+        call_command('loaddata', 'event_gamer', 'event', verbosity=0)
+        self.assertEqual({1: 1, 2: 0}, dict(Event.objects.values_list('id', 'attendee_count')))
+
+        EventGamer.objects.all().delete()
+        call_command('loaddata', 'event', verbosity=0)
+        self.assertEqual({1: 0, 2: 0}, dict(Event.objects.values_list('id', 'attendee_count')))
@@ -0,0 +1,60 @@
+import json
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from unittest import mock
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from django.utils.translation import gettext_lazy
+from levelupapi import renderers
+from levelupapi.models import Gamer
+from levelupapi.renderers import FastJSONRenderer
+
+
+class RendererTests(APITestCase):
+
+    # Add any fixtures you want to run to build the test database
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'event', 'event_gamer']
+
+    def setUp(self):
+        # Grab the first Gamer object from the database and add their token to the headers
+        self.gamer = Gamer.objects.first()
+        token = Token.objects.get(user=self.gamer.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def test_same_bytes_as_drf(self):
+        """The lists render to exactly the bytes DRF's renderer produces"""
+        for path in ['/events', '/games', '/gametypes']:
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(status.HTTP_200_OK, response.status_code)
+                self.assertEqual(JSONRenderer().render(response.data), response.content)
+
+    def test_native_types(self):
+        """Dates, times, decimals, lazy strings and non-string keys are encoded"""
+        data = {
+            'date': date(2022, 4, 29),
+            'time': time(19, 30),
+            'at': datetime(2022, 4, 29, 19, 30, tzinfo=timezone.utc),
+            'price': Decimal('1.50'),
+            1: 'one',
+            'text': 'line\u2028break',
+            'label': gettext_lazy('Board game'),
+        }
+        rendered = FastJSONRenderer().render(data)
+
+        self.assertEqual({
+            'date': '2022-04-29', 'time': '19:30:00', 'at': '2022-04-29T19:30:00Z',
+            'price': 1.5, '1': 'one', 'text': 'line\u2028break', 'label': 'Board game',
+        }, json.loads(rendered))
+        self.assertIn(b'line\\u2028break', rendered)
+
+    def test_indent_and_fallback(self):
+        """Pretty printing, and a missing orjson, use DRF's renderer"""
+        data = {'a': [1, 2]}
+        indented = FastJSONRenderer().render(data, 'application/json; indent=2')
+        self.assertEqual(JSONRenderer().render(data, 'application/json; indent=2'), indented)
+
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(JSONRenderer().render(data), FastJSONRenderer().render(data))
@@ -0,0 +1,99 @@
+import json
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from levelupapi.models import Event, Game, Gamer
+from levelupreports.models import UserEventRow, UserGameRow
+
+
+class ReportTests(TestCase):
+
+    # Add any fixtures you want to run to build the test database
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'event']
+
+    def setUp(self):
+        # Create a user whose id differs from their gamer id, so a join on the wrong column shows up
+        User.objects.create_user(username="spare", password="spare")
+        user = User.objects.create_user(username="second", password="second", first_name="Sam", last_name="Second")
+        self.second_gamer = Gamer.objects.create(user=user, bio="Second")
+        game = Game.objects.create(
+            game_type_id=1, title="Uno", maker="Mattel", gamer=self.second_gamer, number_of_players=4, skill_level=1
+        )
+        Event.objects.create(game=game, description="Uno night", date="2022-05-01", time="19:00", organizer=self.second_gamer)
+
+    def test_games_by_user(self):
+        """Games are grouped under the gamer that added them, with the gamer's own name"""
+        response = self.client.get('/reports/usergames')
+
+        self.assertEqual(200, response.status_code)
+        groups = {group['gamer_id']: group for group in response.context['usergame_list']}
+        self.assertEqual({1, self.second_gamer.id}, set(groups))
+        self.assertEqual("Carrie Belk", groups[1]['full_name'])
+        self.assertEqual(2, len(groups[1]['games']))
+        self.assertEqual("Sam Second", groups[self.second_gamer.id]['full_name'])
+        self.assertEqual(["Uno"], [game['title'] for game in groups[self.second_gamer.id]['games']])
+
+    def test_events_by_user(self):
+        """Events are grouped under their organizer, with the organizer's own name"""
+        response = self.client.get('/reports/userevents')
+
+        self.assertEqual(200, response.status_code)
+        groups = {group['gamer_id']: group for group in response.context['userevent_list']}
+        self.assertEqual(2, len(groups[1]['events']))
+        self.assertEqual("Sam Second", groups[self.second_gamer.id]['full_name'])
+        self.assertEqual(["Uno night"], [event['description'] for event in groups[self.second_gamer.id]['events']])
+
+    def test_games_by_user_csv(self):
+        """?format=csv streams one flat line per game after a header"""
+        response = self.client.get('/reports/usergames?format=csv')
+
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.streaming)
+        self.assertEqual('text/csv', response['Content-Type'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            'gamer_id,full_name,id,title,maker,skill_level,number_of_players,game_type_id', lines[0]
+        )
+        self.assertEqual(4, len(lines))
+        self.assertIn(f'{self.second_gamer.id},Sam Second,', lines[-1])
+
+    def test_events_by_user_ndjson(self):
+        """?format=ndjson streams one JSON document per event"""
+        response = self.client.get('/reports/userevents?format=ndjson')
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('application/x-ndjson', response['Content-Type'])
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(3, len(rows))
+        self.assertEqual({'gamer_id', 'full_name', 'id', 'date', 'time', 'game_name', 'description'}, set(rows[0]))
+
+    def test_report_tables_follow_changes(self):
+        """Saving and deleting games, events and users updates the report tables"""
+        user = self.second_gamer.user
+        user.first_name = "Samantha"
+        user.save()
+        Game.objects.filter(title="Candy Land").delete()
+
+        games = self.client.get('/reports/usergames').context['usergame_list']
+        events = self.client.get('/reports/userevents').context['userevent_list']
+
+        self.assertEqual(["Mario Cart"], [game['title'] for game in games[0]['games']])
+        self.assertEqual("Samantha Second", games[1]['full_name'])
+        self.assertEqual(1, len(events[0]['events']))
+        self.assertEqual("Samantha Second", events[1]['full_name'])
+
+    def test_rebuild_reports_check(self):
+        """rebuild_reports --check fails on drift, and a rebuild repairs it"""
+        call_command('rebuild_reports', '--check', stdout=StringIO())
+
+        UserGameRow.objects.filter(title="Uno").update(title="Dos")
+        UserEventRow.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_reports', '--check', stdout=StringIO())
+
+        out = StringIO()
+        call_command('rebuild_reports', stdout=out)
+        self.assertIn('games: 0 missing, 0 stale', out.getvalue())
+        self.assertIn('events: 0 missing, 0 stale', out.getvalue())
@@ -0,0 +1,125 @@
+import json
+import unittest
+from unittest import mock
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITransactionTestCase
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from levelupapi.authentication import token_cache
+from levelupapi.middleware import ReplicaMiddleware
+from levelupapi.models import Game, Gamer
+from levelupapi.routers import ReplicaRouter, read_database, replica_allowed
+from tests.caches import CacheResetMixin
+
+
+REPLICA = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': 'replica.sqlite3'}
+
+
+@mock.patch.dict(settings.DATABASES, replica=REPLICA)
+class ReplicaRouterTests(SimpleTestCase):
+    """Which database each request reads from, without running any queries"""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        cache.clear()
+
+    def serve(self, method, authorization=None, response_status=200):
+        """Pass a request through ReplicaMiddleware and return the alias a game read would use"""
+        seen = []
+
+        def view(request):
+            seen.append(ReplicaRouter().db_for_read(Game))
+            return HttpResponse(status=response_status)
+
+        headers = {'HTTP_AUTHORIZATION': authorization} if authorization else {}
+        request = getattr(self.factory, method)('/games', **headers)
+        ReplicaMiddleware(view)(request)
+        return seen[0]
+
+    def test_safe_requests_read_replica(self):
+        """GET requests read from the replica, writes and code outside requests use the primary"""
+        self.assertEqual('replica', self.serve('get', 'Token a'))
+        self.assertEqual('default', self.serve('post', 'Token a'))
+        self.assertEqual('default', read_database())
+
+    def test_read_your_writes(self):
+        """A client that wrote reads from the primary for a while, other clients do not"""
+        self.serve('post', 'Token a')
+
+        self.assertEqual('default', self.serve('get', 'Token a'))
+        self.assertEqual('replica', self.serve('get', 'Token b'))
+
+    def test_failed_write_does_not_pin(self):
+        """A rejected write changed nothing, so the client keeps reading from the replica"""
+        self.serve('post', 'Token a', response_status=400)
+
+        self.assertEqual('replica', self.serve('get', 'Token a'))
+
+    def test_pin_expires(self):
+        """The pin lasts REPLICA_PIN_SECONDS"""
+        with self.settings(REPLICA_PIN_SECONDS=0):
+            self.serve('post', 'Token a')
+
+        self.assertEqual('replica', self.serve('get', 'Token a'))
+
+    def test_auth_models_read_primary(self):
+        """Tokens are always read from the primary, so a new token works straight away"""
+        allowed = replica_allowed.set(True)
+        try:
+            self.assertEqual('default', ReplicaRouter().db_for_read(Token))
+            self.assertEqual('replica', ReplicaRouter().db_for_read(Game))
+            self.assertEqual('default', ReplicaRouter().db_for_write(Game))
+        finally:
+            replica_allowed.reset(allowed)
+
+    def test_without_replica(self):
+        """Everything reads from the primary when no replica is configured"""
+        with mock.patch.dict(settings.DATABASES):
+            del settings.DATABASES['replica']
+            self.assertEqual('default', self.serve('get', 'Token a'))
+
+
+@unittest.skipUnless('replica' in settings.DATABASES, 'set LEVELUP_REPLICA_NAME to test against two SQLite files')
+class TwoDatabaseTests(CacheResetMixin, APITransactionTestCase):
+    """Run the API against two separate databases, with no replication between them"""
+
+    databases = '__all__'
+    # Loaded into both databases, as if the replica had caught up before the test
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games']
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        gamer = Gamer.objects.first()
+        token = Token.objects.get(user=gamer.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def create_game(self):
+        data = {
+            "game_type": 1,
+            "skill_level": 5,
+            "title": "Clue",
+            "maker": "Milton Bradley",
+            "number_of_players": 6,
+        }
+        return json.loads(self.client.post('/games', data, format='json').content)['id']
+
+    def test_reads_own_write(self):
+        """A client sees its new game at once, it reads from the primary after writing"""
+        game_id = self.create_game()
+
+        self.assertEqual(status.HTTP_200_OK, self.client.get(f'/games/{game_id}').status_code)
+
+    def test_reads_replica(self):
+        """Once the pin is over the client reads from the replica, which nothing copied the game to"""
+        with self.settings(REPLICA_PIN_SECONDS=0):
+            game_id = self.create_game()
+
+        self.assertEqual(status.HTTP_404_NOT_FOUND, self.client.get(f'/games/{game_id}').status_code)
+        self.assertTrue(Game.objects.using('default').filter(pk=game_id).exists())
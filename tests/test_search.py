@@ -0,0 +1,91 @@
+import json
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from levelupapi.models import Game, Gamer
+from levelupapi.search import match_query
+from tests.caches import CacheResetMixin
+
+
+class SearchTests(CacheResetMixin, APITestCase):
+
+    # Add any fixtures you want to run to build the test database
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'event', 'event_gamer']
+
+    def setUp(self):
+        # Grab the first Gamer object from the database and add their token to the headers
+        self.gamer = Gamer.objects.first()
+        token = Token.objects.get(user=self.gamer.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def search(self, path):
+        response = self.client.get(path)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return json.loads(response.content)
+
+    def titles(self, path):
+        return [game['title'] for game in self.search(path)['results']]
+
+    def test_games_by_title_and_maker(self):
+        """Games match on any prefix of a word in their title or maker"""
+        self.assertEqual(['Candy Land'], self.titles('/games?q=cand'))
+        self.assertEqual(['Mario Cart'], self.titles('/games?q=nintendo'))
+        self.assertEqual([], self.titles('/games?q=cand nintendo'))
+
+    def test_games_ranked(self):
+        """The closest match comes first"""
+        Game.objects.create(
+            title="Dragon Dragon Dragon", maker="Asmodee", gamer=self.gamer, game_type_id=1, number_of_players=2, skill_level=1
+        )
+        Game.objects.create(
+            title="Castle", maker="Dragon Works", gamer=self.gamer, game_type_id=1, number_of_players=2, skill_level=1
+        )
+
+        self.assertEqual(['Dragon Dragon Dragon', 'Castle'], self.titles('/games?q=dragon'))
+
+    def test_search_pages(self):
+        """Search results page with cursors, without repeats"""
+        for number in range(5):
+            Game.objects.create(
+                title=f"Quest {number}", maker="Asmodee", gamer=self.gamer, game_type_id=1, number_of_players=2, skill_level=1
+            )
+
+        first = self.search('/games?q=quest&page_size=3')
+        second = self.search(first['next'])
+
+        ids = [game['id'] for game in first['results'] + second['results']]
+        self.assertEqual(5, len(set(ids)))
+        self.assertIsNone(second['next'])
+
+    def test_index_follows_writes(self):
+        """The triggers keep the index in step with updates, deletes and bulk writes"""
+        game = Game.objects.get(pk=1)
+        game.title = "Gumdrop Mountain"
+        game.save()
+        Game.objects.filter(pk=2).delete()
+        Game.objects.bulk_create([
+            Game(title="Gumball", maker="Hasbro", gamer=self.gamer, game_type_id=1, number_of_players=2, skill_level=1)
+        ])
+
+        self.assertEqual([], self.titles('/games?q=candy'))
+        self.assertEqual([], self.titles('/games?q=mario'))
+        self.assertCountEqual(['Gumdrop Mountain', 'Gumball'], self.titles('/games?q=gum'))
+
+    def test_games_filtered_and_searched(self):
+        """?q= combines with ?type="""
+        self.assertEqual(['Candy Land'], self.titles('/games?q=cand&type=1'))
+        self.assertEqual([], self.titles('/games?q=cand&type=2'))
+
+    def test_events_by_description(self):
+        """Events match on their description"""
+        results = self.search('/events?q=rainbow road')['results']
+
+        self.assertEqual(["Get ready for a race down rainbow road!"], [event['description'] for event in results])
+
+    def test_query_syntax_is_not_passed_through(self):
+        """Quotes and FTS5 operators in the search text are treated as words or ignored"""
+        self.assertEqual([], self.titles('/games?q="'))
+        # AND is a word to look for, not an operator, and no game has a word starting with "and"
+        self.assertEqual([], self.titles('/games?q=candy AND'))
+        self.assertEqual('"candy"* "NOT"*', match_query('candy" NOT'))
+        self.assertIsNone(match_query('*"()'))
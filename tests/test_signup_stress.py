@@ -0,0 +1,142 @@
+import threading
+import time
+import unittest
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITransactionTestCase
+from levelupapi.models import Event, EventGamer, Game, Gamer
+
+# Gamers signing up at once, and how many signups each thread sends
+THREADS = 16
+SIGNUPS_PER_THREAD = 5
+CAPACITY = 25
+# Concurrent signups may not get slower than this share of the signups/s of one thread.
+# SQLite has one writer at a time, so concurrency cannot speed signups up, but it must not make them collapse either.
+MIN_THROUGHPUT_SHARE = 0.5
+# Seconds SQLite waits for the write lock before it fails with "database is locked", Django's default
+LOCK_TIMEOUT = 5
+
+
+@unittest.skipUnless(settings.STRESS_TESTS, 'set LEVELUP_STRESS_TESTS=1 to run the signup stress tests against a test database file')
+class SignupStressTests(APITransactionTestCase):
+    """Many threads sign up for one event at the same time, like when a popular event opens
+
+    A transaction test case, so every thread commits for real and the database does the locking.
+    """
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games']
+
+    def setUp(self):
+        organizer = Gamer.objects.first()
+        users = User.objects.bulk_create([
+            User(username=f"gamer{i}") for i in range(THREADS * SIGNUPS_PER_THREAD)
+        ])
+        self.gamers = Gamer.objects.bulk_create([Gamer(user=user, bio="Stress") for user in users])
+        self.tokens = {token.user_id: token.key for token in Token.objects.bulk_create([Token(key=Token.generate_key(), user=user) for user in users])}
+        self.event = Event.objects.create(
+            game=Game.objects.first(), description="Launch party", date="2022-05-01", time="19:00",
+            organizer=organizer, capacity=CAPACITY
+        )
+
+    def hammer(self, send, gamers=None, threads=THREADS):
+        """Run `send(client, gamer)` for every gamer, `threads` at a time
+
+        Returns the (gamer, status code, seconds) of every call, and the seconds they all took.
+        """
+        gamers = self.gamers if gamers is None else gamers
+        results = []
+        lock = threading.Lock()
+
+        def worker(mine):
+            timed = []
+            try:
+                for gamer in mine:
+                    client = APIClient()
+                    client.credentials(HTTP_AUTHORIZATION=f"Token {self.tokens[gamer.user_id]}")
+                    start = time.perf_counter()
+                    code = send(client, gamer).status_code
+                    timed.append((gamer, code, time.perf_counter() - start))
+            finally:
+                connections.close_all()
+                with lock:
+                    results.extend(timed)
+
+        workers = [threading.Thread(target=worker, args=(gamers[i::threads],)) for i in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return results, time.perf_counter() - start
+
+    def signup(self, event):
+        return lambda client, gamer: client.post(f'/events/{event.id}/signup')
+
+    def assert_consistent(self, event=None):
+        event = self.event if event is None else event
+        event.refresh_from_db()
+        attending = EventGamer.objects.filter(event=event).count()
+        self.assertEqual(attending, event.attendee_count)
+        self.assertLessEqual(attending, event.capacity)
+        return attending
+
+    def test_no_overbooking(self):
+        """Exactly capacity signups succeed, the rest are told the event is full, and nobody waits out the lock"""
+        results, _ = self.hammer(self.signup(self.event))
+        statuses = [code for _, code, _ in results]
+
+        self.assertEqual(THREADS * SIGNUPS_PER_THREAD, len(statuses))
+        self.assertEqual(CAPACITY, statuses.count(status.HTTP_201_CREATED))
+        self.assertEqual(len(statuses) - CAPACITY, statuses.count(status.HTTP_409_CONFLICT))
+        self.assertEqual(CAPACITY, self.assert_consistent())
+        # Every writer got the lock well before SQLite would have failed it with "database is locked"
+        self.assertLess(max(seconds for _, _, seconds in results), LOCK_TIMEOUT / 2)
+
+    def test_retried_signups(self):
+        """A gamer whose client retries the signup on another thread gets the same answer twice and one seat"""
+        # Every gamer twice, the second time from the other end of the list so the two land on different threads
+        results, _ = self.hammer(self.signup(self.event), self.gamers + self.gamers[::-1])
+
+        answers = {}
+        for gamer, code, _ in results:
+            answers.setdefault(gamer.id, set()).add(code)
+        self.assertEqual([1] * len(self.gamers), [len(codes) for codes in answers.values()])
+        seated = [gamer_id for gamer_id, codes in answers.items() if codes == {status.HTTP_201_CREATED}]
+        self.assertEqual(CAPACITY, len(seated))
+        self.assertEqual(
+            sorted(seated), sorted(EventGamer.objects.filter(event=self.event).values_list('gamer_id', flat=True))
+        )
+        self.assertEqual(CAPACITY, self.assert_consistent())
+
+    def test_throughput_holds(self):
+        """Signups from many threads at once go through about as fast as from one thread"""
+        def throughput(threads):
+            event = Event.objects.create(
+                game=self.event.game, description="Open house", date="2022-05-01", time="19:00",
+                organizer=self.event.organizer, capacity=len(self.gamers)
+            )
+            results, elapsed = self.hammer(self.signup(event), threads=threads)
+            self.assertEqual({status.HTTP_201_CREATED}, {code for _, code, _ in results})
+            self.assertEqual(len(self.gamers), self.assert_consistent(event))
+            return len(results) / elapsed
+
+        serial = throughput(1)
+        concurrent = throughput(THREADS)
+
+        self.assertGreaterEqual(concurrent, serial * MIN_THROUGHPUT_SHARE, f'{concurrent:.0f}/s against {serial:.0f}/s')
+
+    def test_signups_and_leaves(self):
+        """Gamers joining, leaving and joining again in batches never push the event over capacity"""
+        def send(client, gamer):
+            client.post('/events/bulk_signup', {'events': [self.event.id]}, format='json')
+            client.delete(f'/events/{self.event.id}/leave')
+            return client.post(f'/events/{self.event.id}/signup')
+
+        results, _ = self.hammer(send)
+        statuses = [code for _, code, _ in results]
+
+        self.assertNotIn(status.HTTP_500_INTERNAL_SERVER_ERROR, statuses)
+        self.assertEqual(statuses.count(status.HTTP_201_CREATED), self.assert_consistent())
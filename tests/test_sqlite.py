@@ -0,0 +1,22 @@
+from django.db import connections
+from django.test import TestCase, override_settings
+
+
+class SQLitePragmaTests(TestCase):
+
+    def pragma(self, name):
+        # A fresh connection, so the connection_created hook runs under the overridden settings
+        connection = connections.create_connection('default')
+        try:
+            with connection.cursor() as db_cursor:
+                db_cursor.execute(f'PRAGMA {name}')
+                return db_cursor.fetchone()[0]
+        finally:
+            connection.close()
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -4096, 'busy_timeout': 1234})
+    def test_pragmas_applied(self):
+        """Every new connection runs the configured pragmas"""
+        self.assertEqual(-4096, self.pragma('cache_size'))
+        self.assertEqual(1234, self.pragma('busy_timeout'))
+
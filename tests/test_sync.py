@@ -0,0 +1,149 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from levelupapi import changelog
+from levelupapi.models import Change, Event, EventGamer, Game, Gamer
+from tests.caches import CacheResetMixin
+
+
+class SyncTests(CacheResetMixin, APITestCase):
+    """The change log follows every write, and GET /sync returns what changed after a cursor"""
+
+    # Add any fixtures you want to run to build the test database
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'event', 'event_gamer']
+
+    def setUp(self):
+        # Grab the first Gamer object from the database and add their token to the headers
+        self.gamer = Gamer.objects.first()
+        token = Token.objects.get(user=self.gamer.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def sync_all(self, since=0, limit=None):
+        """Follow the cursor until nothing is left, returning every batch"""
+        batches = []
+        while True:
+            path = f'/sync?since={since}' + (f'&limit={limit}' if limit else '')
+            response = self.client.get(path)
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            batches.append(response.data)
+            since = response.data['cursor']
+            if not response.data['more']:
+                return batches
+
+    def test_first_sync(self):
+        """A sync from 0 returns everything, rendered like the list endpoints"""
+        batch = self.sync_all()[0]
+
+        self.assertFalse(batch['reset'])
+        self.assertEqual(sorted(Game.objects.values_list('id', flat=True)), [game['id'] for game in batch['games']['upserts']])
+        self.assertEqual(self.client.get('/events').data['results'], batch['events']['upserts'])
+        self.assertEqual(
+            [{'id': row.id, 'event': row.event_id, 'gamer': row.gamer_id} for row in EventGamer.objects.order_by('id')],
+            batch['attendance']['upserts']
+        )
+        self.assertEqual([], batch['games']['deleted'])
+
+    def test_changes_since(self):
+        """After the first sync only what was written since comes back, deletions as ids"""
+        cursor = self.sync_all()[-1]['cursor']
+        event = Event.objects.first()
+        game = Game.objects.exclude(pk=event.game_id).first()
+        game.title = "Renamed"
+        game.save()
+        self.client.delete(f'/events/{event.id}/leave')
+        self.client.post(f'/events/{event.id}/signup')
+        other = Event.objects.create(game=game, description="Gone soon", date="2022-05-01", time="19:00", organizer=self.gamer)
+        other_id = other.id
+        other.delete()
+
+        batch = self.sync_all(cursor)[0]
+
+        self.assertEqual([(game.id, "Renamed")], [(row['id'], row['title']) for row in batch['games']['upserts']])
+        # The event changed with its attendance, and is sent once however often it changed
+        self.assertEqual([event.id], [row['id'] for row in batch['events']['upserts']])
+        self.assertEqual([other_id], batch['events']['deleted'])
+        membership = EventGamer.objects.get(event=event, gamer=self.gamer)
+        self.assertEqual([membership.id], [row['id'] for row in batch['attendance']['upserts']])
+        self.assertEqual(1, len(batch['attendance']['deleted']))
+        # Nothing changed since
+        self.assertEqual([], self.sync_all(batch['cursor'])[0]['events']['upserts'])
+
+    def test_bounded_batches(self):
+        """?limit= caps the changes per response, and following the cursor returns each object once"""
+        Event.objects.bulk_create([
+            Event(game_id=1, description=f"Event {i}", date="2022-05-01", time="19:00", organizer=self.gamer)
+            for i in range(7)
+        ])
+
+        batches = self.sync_all(limit=3)
+
+        self.assertTrue(all(batch['more'] for batch in batches[:-1]))
+        changed = [row['id'] for batch in batches for row in batch['events']['upserts']]
+        self.assertEqual(sorted(Event.objects.values_list('id', flat=True)), sorted(changed))
+        self.assertEqual(len(changed), len(set(changed)))
+
+    def test_log_compacts_itself(self):
+        """Writing an object again replaces its row in the log"""
+        event = Event.objects.first()
+        before = Change.objects.count()
+        for i in range(5):
+            self.client.put(f'/events/{event.id}', {
+                'description': f"Take {i}", 'date': "2022-04-29", 'time': "19:00", 'game': event.game_id
+            }, format='json')
+
+        self.assertEqual(before, Change.objects.count())
+        change = Change.objects.get(model=Change.EVENT, object_id=event.id)
+        self.assertEqual(Change.objects.latest('id'), change)
+
+    def test_unlogged_writes(self):
+        """Taking the write lock of a batch sets no timestamp and is not logged"""
+        latest = Change.objects.latest('id').id
+        Event.objects.update(attendee_count=F('attendee_count'))
+
+        self.assertEqual(latest, Change.objects.latest('id').id)
+
+    def test_compaction(self):
+        """compact_changes drops old tombstones, and a client behind them starts over"""
+        cursor = self.sync_all()[-1]['cursor']
+        old = Event.objects.create(game_id=1, description="Old", date="2022-05-01", time="19:00", organizer=self.gamer).id
+        Event.objects.filter(pk=old).delete()
+        Change.objects.filter(model=Change.EVENT, object_id=old).update(changed_at=timezone.now() - timedelta(days=40))
+        fresh = Event.objects.create(game_id=1, description="New", date="2022-05-01", time="19:00", organizer=self.gamer).id
+        Event.objects.filter(pk=fresh).delete()
+
+        out = StringIO()
+        call_command('compact_changes', '--days=30', stdout=out)
+
+        self.assertEqual('Dropped 1 tombstones older than 30 days\n', out.getvalue())
+        self.assertFalse(Change.objects.filter(model=Change.EVENT, object_id=old).exists())
+        self.assertTrue(Change.objects.filter(model=Change.EVENT, object_id=fresh).exists())
+        batch = self.client.get(f'/sync?since={cursor}').data
+        self.assertTrue(batch['reset'])
+        self.assertIn(Event.objects.first().id, [row['id'] for row in batch['events']['upserts']])
+        # Compacting again changes nothing
+        self.assertEqual(0, changelog.compact(timedelta(days=30)))
+
+    def test_query_count_is_flat(self):
+        """A batch costs the same handful of queries however many objects it covers"""
+        Event.objects.bulk_create([
+            Event(game_id=1, description=f"Event {i}", date="2022-05-01", time="19:00", organizer=self.gamer)
+            for i in range(40)
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/sync')
+
+        self.assertLessEqual(len(queries), 8)
+
+    def test_bad_parameters(self):
+        """The cursor and the limit are checked"""
+        for path in ['/sync?since=-1', '/sync?since=abc', f'/sync?since={2**63}', f'/sync?since={10**20}',
+                     '/sync?limit=0', '/sync?limit=100000']:
+            with self.subTest(path=path):
+                self.assertEqual(status.HTTP_400_BAD_REQUEST, self.client.get(path).status_code)